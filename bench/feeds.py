@@ -0,0 +1,215 @@
+"""Measure how feed generation scales with the number of episodes.
+
+Seeds a throwaway SQLite database with one podcast per size, then drives
+the snapcast endpoints through the Flask test client. Run from the
+repository root:
+
+    python -m bench.feeds --sizes 10 1000 10000 100000 --out before.json
+    python -m bench.feeds --out after.json --compare before.json
+"""
+import json
+import os
+import platform
+import tempfile
+import tracemalloc
+from argparse import ArgumentParser
+from datetime import datetime, timedelta, timezone
+from time import perf_counter
+from typing import Callable
+from uuid import UUID, uuid4
+
+import sqlalchemy
+from flask import Flask
+from sqlalchemy import insert
+
+from vulpes import create_app
+from vulpes.blueprints.snapcast.feed import load_feed
+from vulpes.blueprints.snapcast.models import Category, Episode, Podcast
+from vulpes.nitre import db
+
+
+def make_app(directory: str) -> Flask:
+    """Create an app backed by an empty database in `directory`."""
+    app = create_app({
+        "SQLALCHEMY_DATABASE_URI":
+            "sqlite:///" + os.path.join(directory, "bench.sqlite"),
+    })
+    # Big enough to hold every feed, so warm runs are really warm.
+    app.config["SNAPCAST"] = {
+        **app.config["SNAPCAST"],
+        "FEED_CACHE_BYTES": 1 << 32,
+    }
+    with app.app_context():
+        db.create_all()
+    return app
+
+
+def seed(app: Flask, episodes: int) -> tuple[UUID, UUID]:
+    """Add a podcast with the given number of episodes.
+
+    Returns the podcast's uuid and auth token.
+    """
+    with app.app_context():
+        cast = Podcast(
+            title=f"Benchmark {episodes}",
+            link="https://example.com",
+            description="A podcast that only exists to be measured.",
+            image="https://example.com/cover.png",
+            author="June",
+            feed_url="https://example.com/feed.xml",
+        )
+        db.session.add(cast)
+        db.session.flush()
+        db.session.add(Category(podcast_id=cast.id, cat="Technology"))
+
+        start = datetime(2000, 1, 1, tzinfo=timezone.utc)
+        rows = [{
+            "uuid": uuid4(),
+            "podcast_uuid": cast.uuid,
+            "title": f"Episode {n}: <Something> & something else",
+            "subtitle": "A short subtitle.",
+            "description": "Show notes. " * 20,
+            "media_url": f"https://example.com/media/{n}.mp3",
+            "media_size": 20_000_000 + n,
+            "media_type": "audio/mpeg",
+            "media_duration": timedelta(seconds=3600 + n),
+            "pub_date": start + timedelta(hours=n),
+            "episode_type": "full",
+            "season": n // 100 + 1,
+            "episode": n + 1,
+        } for n in range(episodes)]
+        for at in range(0, episodes, 10_000):
+            db.session.execute(insert(Episode), rows[at:at + 10_000])
+        podcast_uuid, token = cast.uuid, cast.auth_token
+        db.session.commit()
+        return podcast_uuid, token
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    """Nearest-rank percentile of a list of samples."""
+    ordered = sorted(samples)
+    rank = max(0, min(len(ordered) - 1,
+                      round(pct / 100 * len(ordered) + 0.5) - 1))
+    return ordered[rank]
+
+
+def measure(func: Callable[[], bytes | str], rounds: int) -> dict:
+    """Time `func` over several rounds, then trace one more for memory."""
+    timings = []
+    for _ in range(rounds):
+        start = perf_counter()
+        output = func()
+        timings.append(perf_counter() - start)
+
+    # tracemalloc slows everything down, so it gets a round to itself.
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "rounds": rounds,
+        "p50_ms": percentile(timings, 50) * 1000,
+        "p90_ms": percentile(timings, 90) * 1000,
+        "p99_ms": percentile(timings, 99) * 1000,
+        "max_ms": max(timings) * 1000,
+        "peak_bytes": peak,
+        "output_bytes": len(output),
+    }
+
+
+def scenarios(app: Flask,
+              podcast_uuid: UUID,
+              token: UUID,
+) -> dict[str, Callable]:
+    """Everything worth measuring for one podcast."""
+    client = app.test_client()
+    feed_url = f"/snapcast/{podcast_uuid}/feed.xml"
+    auth = {"Authorization": f"Bearer {token}"}
+
+    def build(engine):
+        def run():
+            with app.app_context():
+                return load_feed(podcast_uuid).build(engine=engine)
+        return run
+
+    def feed_cold():
+        app.extensions["feed_cache"].clear()
+        return feed_warm()
+
+    def feed_warm():
+        response = client.get(feed_url)
+        assert response.status_code == 200, response.status
+        return response.data
+
+    def episodes():
+        response = client.get(f"/snapcast/{podcast_uuid}/episodes",
+                              headers=auth)
+        assert response.status_code == 200, response.status
+        return response.data
+
+    feed_warm()  # Sets the cache up.
+    return {
+        "PodcastFeed.build[etree]": build("etree"),
+        "PodcastFeed.build[markup]": build("markup"),
+        "feed.xml (cold)": feed_cold,
+        "feed.xml (warm)": feed_warm,
+        "get_all_episodes": episodes,
+    }
+
+
+def compare(results: list[dict], baseline_path: str) -> None:
+    """Print how each result moved against an earlier run."""
+    with open(baseline_path) as f:
+        baseline = {(r["episodes"], r["scenario"]): r
+                    for r in json.load(f)["results"]}
+    print(f"\nAgainst {baseline_path}:")
+    for result in results:
+        old = baseline.get((result["episodes"], result["scenario"]))
+        if old is None:
+            continue
+        print(f"{result['episodes']:>7} {result['scenario']:<26}"
+              f" p50 {result['p50_ms'] / old['p50_ms']:6.2f}x"
+              f"  peak {result['peak_bytes'] / old['peak_bytes']:6.2f}x"
+              f"  size {result['output_bytes'] / old['output_bytes']:6.2f}x")
+
+
+def main() -> None:
+    """Seed, measure, report and save."""
+    parser = ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+",
+                        default=[10, 1_000, 10_000, 100_000])
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--out", default="bench_feeds.json")
+    parser.add_argument("--compare", metavar="BASELINE_JSON")
+    args = parser.parse_args()
+
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        app = make_app(directory)
+        for size in args.sizes:
+            for name, func in scenarios(app, *seed(app, size)).items():
+                result = {"episodes": size, "scenario": name,
+                          **measure(func, args.rounds)}
+                results.append(result)
+                print(f"{size:>7} {name:<26}"
+                      f" p50 {result['p50_ms']:9.1f} ms"
+                      f"  p99 {result['p99_ms']:9.1f} ms"
+                      f"  peak {result['peak_bytes'] / 2**20:8.1f} MiB"
+                      f"  size {result['output_bytes'] / 2**20:8.2f} MiB")
+
+    with open(args.out, "w") as f:
+        json.dump({
+            "created": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "sqlalchemy": sqlalchemy.__version__,
+            "results": results,
+        }, f, indent=2)
+    print(f"\nSaved to {args.out}")
+
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""Compare picking file names at random with the sequence-backed allocator.
+
+Fills `peanut_file` with names picked the old way, then adds more files
+with each approach and counts the time and statements each one takes.
+Run from the repository root:
+
+    python -m bench.names [--existing 2000000] [--names 10000]
+"""
+import random
+import string
+import tempfile
+from argparse import ArgumentParser
+from datetime import datetime, timezone
+from time import perf_counter
+
+from flask import Flask, current_app
+from sqlalchemy import event, insert, select
+
+from bench.feeds import make_app
+from vulpes.blueprints.mane.models import PeanutFile
+from vulpes.blueprints.mane.util import add_file
+from vulpes.nitre import db
+
+
+def seed(app: Flask, count: int) -> None:
+    """Add `count` files with random names, like the ones already stored."""
+    length = app.config["FOX"]["FILE_NAME_LENGTH"]
+    names = set()
+    while len(names) < count:
+        names.add("".join(random.choices(string.ascii_lowercase, k=length))
+                  + ".png")
+    now = datetime.now(timezone.utc)
+    names = list(names)
+    with app.app_context():
+        for start in range(0, count, 100_000):
+            db.session.execute(insert(PeanutFile.__table__), [
+                {"filename": name, "size": 1, "tstamp": now}
+                for name in names[start:start + 100_000]
+            ])
+        db.session.commit()
+
+
+def old_randomname(ext: str) -> str:
+    """Pick a name the way randomname used to."""
+    length = current_app.config["FOX"]["FILE_NAME_LENGTH"]
+    while True:
+        name = "".join(random.choices(string.ascii_lowercase, k=length))
+        name += "." + ext
+        taken = db.session.execute(
+            select(PeanutFile)
+            .where(PeanutFile.filename == name),
+        ).fetchone()
+        if taken is None:
+            return name
+
+
+def old_add_file(ext: str, **columns) -> PeanutFile:
+    """Add a file's row under a name from `old_randomname`."""
+    file = PeanutFile(filename=old_randomname(ext), **columns)
+    db.session.add(file)
+    return file
+
+
+def run(app: Flask, names: int) -> None:
+    """Add `names` files with each approach, committing each, and report."""
+    statements = 0
+
+    with app.app_context():
+        @event.listens_for(db.engine, "before_cursor_execute")
+        def count(conn, cursor, statement, parameters, context,
+                  executemany):
+            nonlocal statements
+            statements += 1
+
+        for label, add in (("random + SELECT", old_add_file),
+                           ("allocator", add_file)):
+            statements = 0
+            start = perf_counter()
+            for _ in range(names):
+                add("png", size=1, tstamp=datetime.now(timezone.utc))
+                db.session.commit()
+            elapsed = perf_counter() - start
+            print(f"{label:>15}: {names / elapsed:>8,.0f} files/s"
+                  f"  {statements / names:.2f} statements/file")
+
+        event.remove(db.engine, "before_cursor_execute", count)
+
+
+def main() -> None:
+    """Seed, run and report."""
+    parser = ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--existing", type=int, default=2_000_000)
+    parser.add_argument("--names", type=int, default=10_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        app = make_app(directory)
+        start = perf_counter()
+        seed(app, args.existing)
+        print(f"Seeded {args.existing:,} files "
+              f"in {perf_counter() - start:.1f} s.")
+        run(app, args.names)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""Check that the hot queries use indexes instead of scanning whole tables.
+
+Drives the snapcast endpoints and mane's name picking against a seeded
+SQLite database, records every statement they send, and runs
+``EXPLAIN QUERY PLAN`` on each. Exits non-zero if any statement scans a
+whole table. Run from the repository root:
+
+    python -m bench.plans
+"""
+import re
+import sys
+import tempfile
+from datetime import datetime, timezone
+from uuid import UUID
+
+from flask import Flask
+from sqlalchemy import event, select, update
+
+from bench.feeds import make_app, seed
+from vulpes.blueprints.mane.util import find_duplicate, randomname
+from vulpes.blueprints.snapcast.feed import load_changes
+from vulpes.blueprints.snapcast.models import Episode, Podcast
+from vulpes.nitre import db
+
+# "SCAN episode" reads every row. "SCAN episode USING INDEX ..." walks an
+# index in order, which is what ORDER BY ... LIMIT wants.
+full_scan = re.compile(r"^SCAN (\w+)$")
+
+
+def record(app: Flask, podcast_uuid: UUID, token: UUID) -> list[tuple]:
+    """Exercise the hot paths, and return every statement they sent."""
+    statements = []
+
+    with app.app_context():
+        @event.listens_for(db.engine, "before_cursor_execute")
+        def remember(conn, cursor, statement, parameters, context,
+                     executemany):
+            if executemany:
+                parameters = parameters[0]
+            statements.append((statement, parameters))
+
+        # Every request should go as far as the db.
+        app.config["SNAPCAST"] = {**app.config["SNAPCAST"],
+                                  "AUTH_TOKEN_TTL": 0,
+                                  "FEED_CACHE_ENTRIES": 0}
+        client = app.test_client()
+        auth = {"Authorization": f"Bearer {token}"}
+        base = f"/snapcast/{podcast_uuid}"
+        episode, other = db.session.scalars(
+            select(Episode.uuid)
+            .where(Episode.podcast_uuid == podcast_uuid)
+            .limit(2)).all()
+
+        requests = [
+            ("GET", "/feed.xml", {}),
+            ("GET", "/episode/-1", {}),
+            ("GET", "/episode/1", {}),
+            ("GET", f"/episode/{episode}", {}),
+            ("GET", "/episodes?limit=5", {}),
+            ("GET", "/episodes?limit=5&after=" + _cursor(client, base, auth),
+             {}),
+            ("PATCH", f"/episode/{episode}", {"json": {"title": "Patched"}}),
+            ("POST", "/publish", {"json": {
+                "title": "New", "url": "https://example.com/new.mp3",
+                "size": 1}}),
+            ("POST", "/publish/batch", {"json": [{
+                "title": "Newer", "url": "https://example.com/newer.mp3",
+                "size": 1}]}),
+            ("PATCH", "/episodes", {"json": [
+                {"uuid": str(other), "changes": {"season": 2}}]}),
+            ("DELETE", f"/episode/{episode}", {}),
+            ("DELETE", "/episodes", {"json": [str(other)]}),
+            ("GET", "/changes?since=1", {}),
+            ("GET", "/search?q=episode&limit=5", {}),
+        ]
+        for method, path, kwargs in requests:
+            response = client.open(base + path, method=method,
+                                   headers=auth, **kwargs)
+            assert response.status_code < 400, (path, response.status)
+
+        # Windowed feeds, archive pages and deltas go their own ways. Small
+        # pages, so that closed and open ones are both there.
+        db.session.execute(
+            update(Podcast)
+            .where(Podcast.uuid == podcast_uuid)
+            .values(feed_window=5))
+        db.session.commit()
+        app.config["SNAPCAST"]["ARCHIVE_PAGE_SIZE"] = 10
+        # Publishing closes the pages that are full.
+        client.post(base + "/publish", headers=auth, json={
+            "title": "Newest", "url": "https://example.com/newest.mp3",
+            "size": 1})
+        client.get(base + "/feed.xml")
+        client.get(base + "/archive/1.xml")
+        client.get(base + "/archive/10.xml")
+        load_changes(podcast_uuid, datetime.now(timezone.utc))
+
+        randomname("txt")
+        find_duplicate("0" * 64)
+
+        event.remove(db.engine, "before_cursor_execute", remember)
+    return statements
+
+
+def _cursor(client, base: str, auth: dict) -> str:
+    link = client.get(base + "/episodes?limit=5", headers=auth)
+    return link.headers["Link"].split("after=")[1].split(">")[0]
+
+
+def check(app: Flask, statements: list[tuple]) -> list[str]:
+    """Explain each statement, and describe the ones that scan tables."""
+    problems = []
+    seen = set()
+    with app.app_context(), db.engine.connect() as conn:
+        for statement, parameters in statements:
+            if (statement in seen
+                    or not statement.lstrip().startswith(
+                        ("SELECT", "UPDATE", "DELETE"))):
+                continue
+            seen.add(statement)
+            plan = conn.exec_driver_sql(
+                "EXPLAIN QUERY PLAN " + statement, parameters).all()
+            scans = [row[3] for row in plan if full_scan.match(row[3])]
+            if scans:
+                problems.append(f"{', '.join(scans)}:\n    "
+                                + " ".join(statement.split()))
+    return problems
+
+
+def main() -> None:
+    """Seed, record, explain and report."""
+    with tempfile.TemporaryDirectory() as directory:
+        app = make_app(directory)
+        statements = record(app, *seed(app, 100))
+        problems = check(app, statements)
+
+    print(f"Explained {len({s for s, _ in statements})} statements.")
+    for problem in problems:
+        print(problem)
+    sys.exit(1 if problems else 0)
+
+
+if __name__ == "__main__":
+    main()
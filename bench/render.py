@@ -0,0 +1,61 @@
+"""Compare feed item rendering engines.
+
+Run from the repository root:
+
+    python -m bench.render [items] [rounds]
+"""
+import sys
+from datetime import datetime, timedelta, timezone
+from time import perf_counter
+from uuid import uuid4
+
+from vulpes.blueprints.snapcast.jxml import FeedItem, PodcastFeed
+
+
+def make_feed(items: int) -> PodcastFeed:
+    """Build a feed with a realistic-looking spread of episode fields."""
+    feed = PodcastFeed(
+        "Benchmark & Friends",
+        "A podcast that only exists to be rendered.",
+        "https://example.com",
+        image="https://example.com/cover.png",
+        author="June",
+        categories=[{"cat": "Technology", "sub": None}],
+        last_build_date=datetime.now(timezone.utc),
+        feed_url="https://example.com/feed.xml",
+    )
+    start = datetime(2015, 1, 1, tzinfo=timezone.utc)
+    for n in range(items):
+        feed.episodes.append(FeedItem(
+            f"Episode {n}: <Something> & something else",
+            f"https://example.com/media/{n}.mp3",
+            20_000_000 + n,
+            "audio/mpeg",
+            start + timedelta(days=n),
+            uuid4(),
+            media_duration=timedelta(seconds=3600 + n),
+            episode_type="full",
+            season=n // 50 + 1,
+            episode=n + 1,
+            subtitle="A short subtitle.",
+            description="Show notes. " * 20,
+            link=f"https://example.com/episodes/{n}",
+        ))
+    return feed
+
+
+def run(items: int = 1000, rounds: int = 5) -> None:
+    """Render a fresh feed per round with each engine, and report."""
+    for engine in ("etree", "markup"):
+        best = float("inf")
+        for _ in range(rounds):
+            feed = make_feed(items)
+            start = perf_counter()
+            feed.build(engine=engine)
+            best = min(best, perf_counter() - start)
+        print(f"{engine:>6}: {items / best:>10,.0f} items/s "
+              f"({best * 1000:.1f} ms for {items} items)")
+
+
+if __name__ == "__main__":
+    run(*(int(arg) for arg in sys.argv[1:3]))
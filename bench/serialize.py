@@ -0,0 +1,68 @@
+"""Compare serializing episodes from ORM objects and from Core rows.
+
+Run from the repository root:
+
+    python -m bench.serialize [episodes] [rounds]
+"""
+import sys
+import tempfile
+from time import perf_counter
+
+from sqlalchemy import select
+
+from bench.feeds import make_app, seed
+from vulpes.blueprints.snapcast.models import Episode
+from vulpes.nitre import db
+
+
+def run(episodes: int = 10_000, rounds: int = 5) -> None:
+    """Serialize the same podcast's episodes each way, and report."""
+    with tempfile.TemporaryDirectory() as directory:
+        app = make_app(directory)
+        podcast_uuid, _ = seed(app, episodes)
+        with app.app_context():
+            objects = select(Episode).where(
+                Episode.podcast_uuid == podcast_uuid)
+            rows = select(*Episode.__table__.columns).where(
+                Episode.podcast_uuid == podcast_uuid)
+
+            def orm_as_dict():
+                db.session.expunge_all()
+                return [e.as_dict() for e in db.session.scalars(objects)]
+
+            def core_serialize():
+                return list(Episode.serialize(db.session.execute(rows)))
+
+            loaded = db.session.scalars(objects).all()
+            fetched = db.session.execute(rows).all()
+            assert orm_as_dict() == core_serialize()
+
+            for name, func in (
+                ("as_dict, loaded", lambda: [e.as_dict() for e in loaded]),
+                ("serialize, fetched", lambda: list(Episode.serialize(
+                    _Rows(rows, fetched)))),
+                ("query + as_dict", orm_as_dict),
+                ("query + serialize", core_serialize),
+            ):
+                best = float("inf")
+                for _ in range(rounds):
+                    start = perf_counter()
+                    func()
+                    best = min(best, perf_counter() - start)
+                print(f"{name:>18}: {episodes / best:>10,.0f} rows/s "
+                      f"({best * 1000:.1f} ms for {episodes} rows)")
+
+
+class _Rows(list):
+    """Already fetched rows, posing as the Result they came from."""
+
+    def __init__(self, query, rows):
+        super().__init__(rows)
+        self._keys = [col.name for col in query.selected_columns]
+
+    def keys(self):
+        return self._keys
+
+
+if __name__ == "__main__":
+    run(*(int(arg) for arg in sys.argv[1:3]))
@@ -0,0 +1,134 @@
+"""Compare SQLite profiles under concurrent feed reads and episode writes.
+
+Runs the same mix of reader and writer threads against the snapcast
+endpoints, once with SQLite's defaults and once with the `[SQLITE]`
+tuning profile, each on a fresh database. Run from the repository root:
+
+    python -m bench.sqlite_concurrency [--readers 8] [--writers 2]
+"""
+import os
+import tempfile
+import tomllib
+from argparse import ArgumentParser
+from threading import Barrier, Event, Thread
+from time import perf_counter, sleep
+
+from flask import Flask
+
+from bench.feeds import percentile, seed
+from vulpes import create_app
+from vulpes.nitre import db
+
+
+def make_app(directory: str, tuned: bool) -> Flask:
+    """Create an app on an empty database, with or without the profile."""
+    with open("instance/dev.config.toml", "rb") as f:
+        profile = tomllib.load(f)["SQLITE"]
+    app = create_app({
+        "SQLALCHEMY_DATABASE_URI":
+            "sqlite:///" + os.path.join(directory, "bench.sqlite"),
+        "SQLITE": {**profile, "TUNED": tuned},
+    })
+    # Every read should go to the db, not the feed cache.
+    app.config["SNAPCAST"] = {**app.config["SNAPCAST"],
+                              "FEED_CACHE_ENTRIES": 0}
+    with app.app_context():
+        db.create_all()
+    return app
+
+
+def run(app: Flask,
+        readers: int,
+        writers: int,
+        seconds: float,
+        episodes: int,
+) -> dict:
+    """Hammer one podcast's feed and publish endpoint at the same time."""
+    podcast_uuid, token = seed(app, episodes)
+    feed_url = f"/snapcast/{podcast_uuid}/feed.xml"
+    publish_url = f"/snapcast/{podcast_uuid}/publish"
+    auth = {"Authorization": f"Bearer {token}"}
+
+    timings = {"read": [], "write": []}
+    failures = {"read": 0, "write": 0}
+    start = Barrier(readers + writers + 1)
+    stop = Event()
+
+    def reader():
+        client = app.test_client()
+        start.wait()
+        while not stop.is_set():
+            began = perf_counter()
+            with client.get(feed_url) as response:
+                ok = response.status_code == 200 and response.get_data()
+            if ok:
+                timings["read"].append(perf_counter() - began)
+            else:
+                failures["read"] += 1
+
+    def writer():
+        client = app.test_client()
+        start.wait()
+        n = 0
+        while not stop.is_set():
+            n += 1
+            began = perf_counter()
+            response = client.post(publish_url, headers=auth, json={
+                "title": f"Written {n}",
+                "url": f"https://example.com/written/{n}.mp3",
+                "size": n,
+            })
+            if response.status_code == 200:
+                timings["write"].append(perf_counter() - began)
+            else:
+                failures["write"] += 1
+
+    threads = ([Thread(target=reader) for _ in range(readers)]
+               + [Thread(target=writer) for _ in range(writers)])
+    for thread in threads:
+        thread.start()
+    start.wait()
+    sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    result = {}
+    for kind, samples in timings.items():
+        result[kind] = {
+            "per_second": len(samples) / seconds,
+            "p50_ms": percentile(samples, 50) * 1000 if samples else None,
+            "p99_ms": percentile(samples, 99) * 1000 if samples else None,
+            "failed": failures[kind],
+        }
+    return result
+
+
+def main() -> None:
+    """Run both profiles, and report."""
+    parser = ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--writers", type=int, default=2)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--episodes", type=int, default=500)
+    args = parser.parse_args()
+
+    for tuned in (False, True):
+        with tempfile.TemporaryDirectory() as directory:
+            app = make_app(directory, tuned)
+            result = run(app, args.readers, args.writers, args.seconds,
+                         args.episodes)
+            with app.app_context():
+                db.engine.dispose()
+
+        print("tuned" if tuned else "default")
+        for kind, stats in result.items():
+            p50 = stats["p50_ms"] or 0
+            p99 = stats["p99_ms"] or 0
+            print(f"  {kind:>5}: {stats['per_second']:8.1f}/s"
+                  f"  p50 {p50:8.1f} ms  p99 {p99:8.1f} ms"
+                  f"  failed {stats['failed']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,27 @@
+"""add episode last modified
+
+Revision ID: 2648cfe49dfb
+Revises: 90e11d71c0a8
+Create Date: 2026-10-18 06:15:57.747610
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '2648cfe49dfb'
+down_revision: Union[str, None] = '90e11d71c0a8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Left empty on existing rows. Feeds fall back on pub_date for those.
+    op.add_column("episode", sa.Column("last_modified", sa.DateTime))
+
+
+def downgrade() -> None:
+    op.drop_column("episode", "last_modified")
@@ -0,0 +1,32 @@
+"""add name sequence
+
+Revision ID: 52927efb7b4e
+Revises: 7a5501634e34
+Create Date: 2026-10-18 06:35:17.784490
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '52927efb7b4e'
+down_revision: Union[str, None] = '7a5501634e34'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "name_sequence",
+        sa.Column("length", sa.Integer(), autoincrement=False,
+                  nullable=False),
+        sa.Column("next", sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint("length"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("name_sequence")
@@ -0,0 +1,55 @@
+"""add episode search
+
+Revision ID: 7a5501634e34
+Revises: cb57aa458370
+Create Date: 2026-10-18 06:28:53.300556
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7a5501634e34'
+down_revision: Union[str, None] = 'cb57aa458370'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # An external content table, kept up to date by triggers. A copy of
+    # snapcast.search.episode_fts_ddl as it was.
+    op.execute("""CREATE VIRTUAL TABLE episode_fts USING fts5(
+        title, subtitle, description,
+        content='episode', content_rowid='id'
+    )""")
+    op.execute("""CREATE TRIGGER episode_fts_insert
+    AFTER INSERT ON episode BEGIN
+        INSERT INTO episode_fts (rowid, title, subtitle, description)
+        VALUES (new.id, new.title, new.subtitle, new.description);
+    END""")
+    op.execute("""CREATE TRIGGER episode_fts_delete
+    AFTER DELETE ON episode BEGIN
+        INSERT INTO episode_fts
+            (episode_fts, rowid, title, subtitle, description)
+        VALUES ('delete', old.id, old.title, old.subtitle, old.description);
+    END""")
+    op.execute("""CREATE TRIGGER episode_fts_update
+    AFTER UPDATE OF title, subtitle, description ON episode BEGIN
+        INSERT INTO episode_fts
+            (episode_fts, rowid, title, subtitle, description)
+        VALUES ('delete', old.id, old.title, old.subtitle, old.description);
+        INSERT INTO episode_fts (rowid, title, subtitle, description)
+        VALUES (new.id, new.title, new.subtitle, new.description);
+    END""")
+    # Index everything that's already there.
+    op.execute("INSERT INTO episode_fts (episode_fts) VALUES ('rebuild')")
+
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER episode_fts_update")
+    op.execute("DROP TRIGGER episode_fts_delete")
+    op.execute("DROP TRIGGER episode_fts_insert")
+    op.execute("DROP TABLE episode_fts")
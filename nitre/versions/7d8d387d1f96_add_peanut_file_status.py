@@ -0,0 +1,32 @@
+"""add peanut file status
+
+Revision ID: 7d8d387d1f96
+Revises: 52927efb7b4e
+Create Date: 2026-10-18 06:39:53.249024
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7d8d387d1f96'
+down_revision: Union[str, None] = '52927efb7b4e'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Everything uploaded so far went to S3 before its link was returned.
+    op.add_column("peanut_file", sa.Column(
+        "status",
+        sa.Enum("pending", "stored", "failed", native_enum=False, length=7),
+        nullable=False,
+        server_default="stored",
+    ))
+
+
+def downgrade() -> None:
+    op.drop_column("peanut_file", "status")
@@ -0,0 +1,51 @@
+"""add presigned file status
+
+Revision ID: 82cb1044795f
+Revises: a392f31f3990
+Create Date: 2026-10-18 07:08:27.952847
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '82cb1044795f'
+down_revision: Union[str, None] = 'a392f31f3990'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table("peanut_file") as batch:
+        batch.alter_column(
+            "status",
+            type_=sa.Enum("pending", "presigned", "stored", "failed",
+                          native_enum=False, length=9),
+            existing_type=sa.Enum("pending", "stored", "failed",
+                                  native_enum=False, length=7),
+            existing_nullable=False,
+            existing_server_default="stored",
+        )
+    # Presigned uploads from before this stay pending, as they can't be
+    # told apart from streamed uploads still on their way.
+    op.create_index("ix_peanut_file_status_tstamp", "peanut_file",
+                    ["status", "tstamp"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_peanut_file_status_tstamp", "peanut_file")
+    op.execute("UPDATE peanut_file SET status = 'pending'"
+               " WHERE status = 'presigned'")
+    with op.batch_alter_table("peanut_file") as batch:
+        batch.alter_column(
+            "status",
+            type_=sa.Enum("pending", "stored", "failed",
+                          native_enum=False, length=7),
+            existing_type=sa.Enum("pending", "presigned", "stored",
+                                  "failed", native_enum=False, length=9),
+            existing_nullable=False,
+            existing_server_default="stored",
+        )
@@ -0,0 +1,26 @@
+"""add feed window
+
+Revision ID: 90e11d71c0a8
+Revises: 56964ef7b70c
+Create Date: 2026-10-18 06:14:42.714790
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '90e11d71c0a8'
+down_revision: Union[str, None] = '56964ef7b70c'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("podcast", sa.Column("feed_window", sa.Integer))
+
+
+def downgrade() -> None:
+    op.drop_column("podcast", "feed_window")
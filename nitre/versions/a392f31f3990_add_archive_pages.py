@@ -0,0 +1,34 @@
+"""add archive pages
+
+Revision ID: a392f31f3990
+Revises: c141bb75ebc3
+Create Date: 2026-10-18 06:54:37.462727
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a392f31f3990'
+down_revision: Union[str, None] = 'c141bb75ebc3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Starts empty. Pages are closed as their podcasts next change.
+    op.create_table(
+        "archive_page",
+        sa.Column("podcast_uuid", sa.Uuid, nullable=False),
+        sa.Column("page", sa.Integer, autoincrement=False, nullable=False),
+        sa.Column("last_pub_date", sa.DateTime, nullable=False),
+        sa.Column("last_id", sa.Integer, nullable=False),
+        sa.PrimaryKeyConstraint("podcast_uuid", "page"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("archive_page")
@@ -0,0 +1,29 @@
+"""add peanut file sha256
+
+Revision ID: c141bb75ebc3
+Revises: 7d8d387d1f96
+Create Date: 2026-10-18 06:42:38.210762
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c141bb75ebc3'
+down_revision: Union[str, None] = '7d8d387d1f96'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Existing files are hashed by `flask mane hash-files`.
+    op.add_column("peanut_file", sa.Column("sha256", sa.String))
+    op.create_index("ix_peanut_file_sha256", "peanut_file", ["sha256"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_peanut_file_sha256", "peanut_file")
+    op.drop_column("peanut_file", "sha256")
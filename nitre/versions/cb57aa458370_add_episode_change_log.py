@@ -0,0 +1,48 @@
+"""add episode change log
+
+Revision ID: cb57aa458370
+Revises: ea0cc8f21ada
+Create Date: 2026-10-18 06:26:25.671037
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'cb57aa458370'
+down_revision: Union[str, None] = 'ea0cc8f21ada'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "episode_change",
+        sa.Column("seq", sa.Integer, primary_key=True),
+        sa.Column("podcast_uuid", sa.Uuid, nullable=False),
+        sa.Column("episode_uuid", sa.Uuid, nullable=False),
+        sa.Column("op", sa.Enum("insert", "update", "delete",
+                                native_enum=False, length=6),
+                  nullable=False),
+        sa.Column("changed_at", sa.DateTime, nullable=False),
+        sqlite_autoincrement=True,
+    )
+    op.create_index("ix_episode_change_podcast_uuid_seq", "episode_change",
+                    ["podcast_uuid", "seq"])
+
+    # Every episode so far counts as inserted, so syncing from nothing
+    # gets everything.
+    op.execute(
+        "INSERT INTO episode_change"
+        " (podcast_uuid, episode_uuid, op, changed_at)"
+        " SELECT podcast_uuid, uuid, 'insert', pub_date"
+        " FROM episode WHERE podcast_uuid IS NOT NULL ORDER BY id"
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_episode_change_podcast_uuid_seq", "episode_change")
+    op.drop_table("episode_change")
@@ -0,0 +1,60 @@
+"""add lookup indexes
+
+Revision ID: ea0cc8f21ada
+Revises: 2648cfe49dfb
+Create Date: 2026-10-18 06:23:59.903478
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'ea0cc8f21ada'
+down_revision: Union[str, None] = '2648cfe49dfb'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _duplicates(table: str, column: str) -> list:
+    return op.get_bind().exec_driver_sql(
+        f"SELECT {column} FROM {table} WHERE {column} IS NOT NULL"
+        f" GROUP BY {column} HAVING count(*) > 1 LIMIT 5"
+    ).scalars().all()
+
+
+def upgrade() -> None:
+    # Two podcasts or episodes sharing a uuid can't be told apart safely,
+    # so that's for a person to sort out.
+    for table in ("podcast", "episode"):
+        duplicates = _duplicates(table, "uuid")
+        if duplicates:
+            raise RuntimeError(
+                f"Can't make {table}.uuid unique, as some are used more"
+                f" than once, like {', '.join(map(str, duplicates))}."
+                f" Fix those rows and run this again.")
+
+    # Files that share a name share one S3 object too, the last one
+    # uploaded under it. Only the newest row describes that.
+    op.execute(
+        "DELETE FROM peanut_file WHERE filename IS NOT NULL AND id NOT IN"
+        " (SELECT max(id) FROM peanut_file GROUP BY filename)"
+    )
+
+    op.create_index("ix_podcast_uuid", "podcast", ["uuid"], unique=True)
+    op.create_index("ix_episode_uuid", "episode", ["uuid"], unique=True)
+    op.create_index("ix_episode_podcast_uuid_pub_date", "episode",
+                    ["podcast_uuid", "pub_date"])
+    op.create_index("ix_category_podcast_id", "category", ["podcast_id"])
+    op.create_index("ix_peanut_file_filename", "peanut_file", ["filename"],
+                    unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index("ix_peanut_file_filename", "peanut_file")
+    op.drop_index("ix_category_podcast_id", "category")
+    op.drop_index("ix_episode_podcast_uuid_pub_date", "episode")
+    op.drop_index("ix_episode_uuid", "episode")
+    op.drop_index("ix_podcast_uuid", "podcast")
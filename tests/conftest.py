@@ -0,0 +1,98 @@
+from datetime import datetime, timedelta, timezone
+from uuid import UUID
+
+import boto3
+import pytest
+from moto import mock_aws
+from sqlalchemy import event
+
+from vulpes import create_app
+from vulpes.blueprints.snapcast.models import Category, Episode, Podcast
+from vulpes.nitre import db
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = create_app({
+        "TESTING": True,
+        "SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path / 'test.sqlite'}",
+    })
+    # Keeps the upload spool out of the real instance folder.
+    app.instance_path = str(tmp_path)
+    with app.app_context():
+        db.create_all()
+    yield app
+    with app.app_context():
+        db.engine.dispose()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def make_podcast(app):
+    """Add a podcast with `episodes` a day apart, and get its uuid and token.
+
+    Episode `n` has the uuid ``UUID(int=1000 + n)``.
+    """
+    def make_podcast(episodes: int = 5, categories: int = 2, **kwargs):
+        with app.app_context():
+            podcast = Podcast(**{
+                "title": "A podcast",
+                "link": "https://example.com",
+                "description": "About things.",
+                **kwargs,
+            })
+            db.session.add(podcast)
+            db.session.flush()
+            for n in range(categories):
+                db.session.add(Category(podcast_id=podcast.id,
+                                        cat=f"Category {n}"))
+            start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+            for n in range(episodes):
+                db.session.add(Episode(
+                    podcast_uuid=podcast.uuid,
+                    uuid=UUID(int=1000 + n),
+                    title=f"Episode {n}",
+                    media_url=f"https://example.com/{n}.mp3",
+                    media_size=1000 + n,
+                    media_type="audio/mpeg",
+                    pub_date=start + timedelta(days=n),
+                ))
+            db.session.commit()
+            return podcast.uuid, podcast.auth_token
+    return make_podcast
+
+
+@pytest.fixture
+def podcast(make_podcast):
+    return make_podcast()
+
+
+@pytest.fixture
+def statements(app):
+    """Collect the SQL the app runs, from when the test asks for this on."""
+    seen = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        seen.append(statement)
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, "before_cursor_execute", record)
+    yield seen
+    event.remove(engine, "before_cursor_execute", record)
+
+
+@pytest.fixture
+def s3(app, monkeypatch):
+    """Put a fake S3 behind the app, with its bucket already made."""
+    monkeypatch.setenv("AWS_DEFAULT_REGION", "us-east-1")
+    app.config["S3"].update(ACCESS_KEY="testing", SECRET_KEY="testing")
+    with mock_aws():
+        client = boto3.client("s3", aws_access_key_id="testing",
+                              aws_secret_access_key="testing")
+        client.create_bucket(Bucket="f.peanut.one")
+        yield client
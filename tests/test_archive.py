@@ -0,0 +1,158 @@
+"""Archive pages of windowed feeds keep their episodes as the feed moves."""
+from datetime import datetime, timezone
+from uuid import UUID
+from xml.etree import ElementTree
+
+import pytest
+from sqlalchemy import func, select, update
+
+from vulpes.blueprints.snapcast.feed import close_archive_pages
+from vulpes.blueprints.snapcast.models import ArchivePage, Podcast
+from vulpes.nitre import db
+
+
+@pytest.fixture
+def windowed(app, client, make_podcast):
+    """Add a podcast of 25 episodes, 5 in the feed and 5 to a page."""
+    app.config["SNAPCAST"] = {**app.config["SNAPCAST"],
+                              "ARCHIVE_PAGE_SIZE": 5}
+    podcast_uuid, token = make_podcast(episodes=25, feed_window=5)
+    # As the change that added them would have.
+    with app.app_context():
+        close_archive_pages(podcast_uuid)
+        db.session.commit()
+    return podcast_uuid, {"Authorization": f"Bearer {token}"}
+
+
+def episodes(response) -> list[int]:
+    """Get the numbers of the episodes in a feed, from their guids."""
+    assert response.status_code == 200
+    return [UUID(guid.text).int - 1000
+            for guid in ElementTree.fromstring(response.data).iter("guid")]
+
+
+def links(response) -> dict[str, str]:
+    return {link.get("rel"): link.get("href")
+            for link in ElementTree.fromstring(response.data)
+            .iter("{http://www.w3.org/2005/Atom}link")}
+
+
+def page(client, podcast_uuid: UUID, n: int):
+    response = client.get(f"/snapcast/{podcast_uuid}/archive/{n}.xml")
+    response.get_data()
+    return response
+
+
+def etag(client, podcast_uuid: UUID, n: int) -> str:
+    """Get an archive page's ETag, which it only has once it's cached."""
+    page(client, podcast_uuid, n)
+    return page(client, podcast_uuid, n).headers["ETag"]
+
+
+def publish(client, podcast_uuid: UUID, auth: dict, **kwargs):
+    response = client.post(f"/snapcast/{podcast_uuid}/publish", headers=auth,
+                           json={"title": "New",
+                                 "url": "https://example.com/new.mp3",
+                                 "size": 1, **kwargs})
+    assert response.status_code < 400, response.data
+    return response
+
+
+def test_pages(client, windowed):
+    podcast_uuid, _ = windowed
+    feed = client.get(f"/snapcast/{podcast_uuid}/feed.xml")
+    assert links(feed)["prev-archive"].endswith("/archive/4.xml")
+
+    assert episodes(page(client, podcast_uuid, 1)) == [0, 1, 2, 3, 4]
+    assert episodes(page(client, podcast_uuid, 4)) == [15, 16, 17, 18, 19]
+    # Nothing's been archived since page 4 closed.
+    assert episodes(page(client, podcast_uuid, 5)) == []
+    assert page(client, podcast_uuid, 6).status_code == 404
+
+
+def test_reading_closes_no_pages(app, client, make_podcast):
+    podcast_uuid, _ = make_podcast(episodes=25, feed_window=5)
+    app.config["SNAPCAST"] = {**app.config["SNAPCAST"],
+                              "ARCHIVE_PAGE_SIZE": 5}
+    # Until it next changes, everything archived is on the open page.
+    assert len(episodes(page(client, podcast_uuid, 1))) == 20
+    client.get(f"/snapcast/{podcast_uuid}/feed.xml").get_data()
+    with app.app_context():
+        assert db.session.scalar(
+            select(func.count()).select_from(ArchivePage)) == 0
+
+
+def test_newest_page_links_on_once_theres_more(client, windowed):
+    podcast_uuid, auth = windowed
+    assert "next-archive" not in links(page(client, podcast_uuid, 4))
+    assert links(page(client, podcast_uuid, 3))["next-archive"].endswith(
+        "/archive/4.xml")
+
+    publish(client, podcast_uuid, auth)
+    assert links(page(client, podcast_uuid, 4))["next-archive"].endswith(
+        "/archive/5.xml")
+
+
+def test_closed_pages_are_cacheable_not_immutable(client, windowed):
+    podcast_uuid, _ = windowed
+    response = page(client, podcast_uuid, 1)
+    assert response.cache_control.public
+    assert response.cache_control.max_age == 86400
+    assert not response.cache_control.immutable
+
+
+def test_publishing_leaves_closed_pages_alone(client, windowed):
+    podcast_uuid, auth = windowed
+    before = etag(client, podcast_uuid, 2)
+
+    publish(client, podcast_uuid, auth)
+    revalidated = client.get(f"/snapcast/{podcast_uuid}/archive/2.xml",
+                             headers={"If-None-Match": before})
+    assert revalidated.status_code == 304
+    assert revalidated.headers["ETag"] == before
+
+    # The one that left the window is on the open page.
+    assert episodes(page(client, podcast_uuid, 5)) == [20]
+
+
+def test_deleting_only_changes_its_page(client, windowed):
+    podcast_uuid, auth = windowed
+    etags = {n: etag(client, podcast_uuid, n) for n in (1, 2, 3)}
+
+    response = client.delete(
+        f"/snapcast/{podcast_uuid}/episode/{UUID(int=1007)}", headers=auth)
+    assert response.status_code < 400
+
+    assert episodes(page(client, podcast_uuid, 1)) == [0, 1, 2, 3, 4]
+    assert episodes(page(client, podcast_uuid, 2)) == [5, 6, 8, 9]
+    assert episodes(page(client, podcast_uuid, 3)) == [10, 11, 12, 13, 14]
+    assert etag(client, podcast_uuid, 2) != etags[2]
+    assert etag(client, podcast_uuid, 1) == etags[1]
+    assert etag(client, podcast_uuid, 3) == etags[3]
+
+
+def test_backdating_only_changes_its_page(client, windowed):
+    podcast_uuid, auth = windowed
+    etags = {n: etag(client, podcast_uuid, n) for n in (1, 2)}
+
+    timestamp = datetime(2024, 1, 2, 12, tzinfo=timezone.utc).timestamp()
+    publish(client, podcast_uuid, auth, timestamp=timestamp)
+
+    assert len(episodes(page(client, podcast_uuid, 1))) == 6
+    assert etag(client, podcast_uuid, 1) != etags[1]
+    assert etag(client, podcast_uuid, 2) == etags[2]
+
+
+def test_changing_the_window_keeps_pages(app, client, windowed):
+    podcast_uuid, _ = windowed
+    before = page(client, podcast_uuid, 3)
+    with app.app_context():
+        db.session.execute(
+            update(Podcast)
+            .where(Podcast.uuid == podcast_uuid)
+            .values(feed_window=2))
+        db.session.commit()
+
+    assert page(client, podcast_uuid, 3).data == before.data
+    # 20, 21 and 22 are archived now, but that's not enough to close 5.
+    assert episodes(page(client, podcast_uuid, 5)) == [20, 21, 22]
@@ -0,0 +1,144 @@
+"""The in-process caches for rendered feeds and auth tokens."""
+from datetime import datetime, timezone
+from uuid import UUID
+
+import pytest
+
+from vulpes.blueprints.snapcast import cache as cache_module
+from vulpes.blueprints.snapcast.cache import FeedCache, TokenCache
+
+A, B, C = (UUID(int=n) for n in range(3))
+V1 = datetime(2024, 1, 1, tzinfo=timezone.utc)
+V2 = datetime(2024, 1, 2, tzinfo=timezone.utc)
+
+
+def test_feed_hits_and_misses():
+    cache = FeedCache()
+    assert cache.get(A, V1) is None
+    stored = cache.put(A, V1, b"<rss/>")
+    assert cache.get(A, V1) is stored
+    assert stored.body == b"<rss/>"
+    # Another version, page or podcast is a different feed.
+    assert cache.get(A, V2) is None
+    assert cache.get(A, V1, page=1) is None
+    assert cache.get(B, V1) is None
+    # A newer version replaces the old one.
+    cache.put(A, V2, b"<rss></rss>")
+    assert cache.get(A, V1) is None
+    assert cache.get(A, V2).body == b"<rss></rss>"
+
+
+def test_feed_evicts_least_recently_used():
+    cache = FeedCache(max_entries=2)
+    cache.put(A, V1, b"a")
+    cache.put(B, V1, b"b")
+    cache.get(A, V1)
+    cache.put(C, V1, b"c")
+    assert cache.get(B, V1) is None
+    assert cache.get(A, V1) is not None
+    assert cache.get(C, V1) is not None
+
+
+def test_feed_bounded_by_bytes():
+    size = FeedCache().put(A, V1, b"x" * 100).size
+    cache = FeedCache(max_bytes=size * 2)
+    cache.put(A, V1, b"x" * 100)
+    cache.put(B, V1, b"x" * 100)
+    cache.put(C, V1, b"x" * 100)
+    assert cache.get(A, V1) is None
+    assert cache.get(B, V1) is not None
+    # Too big to store at all.
+    assert cache.put(A, V1, b"x" * (size * 2 + 1)) is None
+    assert cache.get(B, V1) is not None
+
+
+def test_feed_disabled():
+    cache = FeedCache(max_entries=0)
+    assert cache.put(A, V1, b"a") is None
+    assert cache.get(A, V1) is None
+
+
+def test_feed_invalidate_keeps_closed_pages():
+    cache = FeedCache()
+    cache.put(A, V1, b"feed")
+    cache.put(A, V1, b"open", page=3)
+    cache.put(A, V1, b"closed", page=1, closed=True)
+    cache.put(B, V1, b"other")
+    cache.invalidate(A)
+    assert cache.get(A, V1) is None
+    assert cache.get(A, V1, page=3) is None
+    assert cache.get(A, V1, page=1) is not None
+    assert cache.get(B, V1) is not None
+
+
+def test_publish_invalidates(client, podcast, statements):
+    podcast_uuid, token = podcast
+    url = f"/snapcast/{podcast_uuid}/feed.xml"
+    client.get(url).get_data()
+    statements.clear()
+    client.get(url).get_data()
+    # Just the version check.
+    assert len(statements) == 1
+
+    response = client.post(
+        f"/snapcast/{podcast_uuid}/publish",
+        headers={"Authorization": f"Bearer {token}"},
+        json={"title": "Brand new", "url": "https://example.com/new.mp3",
+              "size": 1})
+    assert response.status_code == 200
+    statements.clear()
+    assert b"Brand new" in client.get(url).get_data()
+    assert len(statements) > 1
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Stop the token cache's clock, and let the test move it."""
+    now = [1000.0]
+    monkeypatch.setattr(cache_module, "monotonic", lambda: now[0])
+    return now
+
+
+def test_token_expires(clock):
+    cache = TokenCache(ttl=10)
+    cache.put(A, "token")
+    clock[0] += 9.9
+    assert cache.get(A) == "token"
+    clock[0] += 0.1
+    assert cache.get(A) is None
+
+
+def test_token_ttl_zero_disables():
+    cache = TokenCache(ttl=0)
+    cache.put(A, "token")
+    assert cache.get(A) is None
+
+
+def test_token_evicts_expired_then_oldest(clock):
+    cache = TokenCache(ttl=10, max_entries=2)
+    cache.put(A, "a")
+    clock[0] += 5
+    cache.put(B, "b")
+    cache.put(C, "c")
+    # Nothing had expired, so the oldest went.
+    assert cache.get(A) is None
+    assert (cache.get(B), cache.get(C)) == ("b", "c")
+
+    clock[0] += 6  # B has expired, C hasn't.
+    cache.put(A, "a")
+    assert cache.get(B) is None
+    assert (cache.get(A), cache.get(C)) == ("a", "c")
+
+
+def test_rotating_invalidates(client, podcast):
+    podcast_uuid, token = podcast
+    url = f"/snapcast/{podcast_uuid}/token"
+    response = client.post(url, headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 200
+    new = response.json["auth_token"]
+
+    # The old token was cached by the request that rotated it.
+    assert client.post(url, headers={
+        "Authorization": f"Bearer {token}"}).status_code == 401
+    assert client.post(url, headers={
+        "Authorization": f"Bearer {new}"}).status_code == 200
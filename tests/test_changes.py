@@ -0,0 +1,115 @@
+"""The change log, written by every write path and read by `seq`."""
+import pytest
+
+
+@pytest.fixture
+def api(client, podcast):
+    podcast_uuid, token = podcast
+    auth = {"Authorization": f"Bearer {token}"}
+
+    def call(method: str, path: str, **kwargs):
+        response = client.open(f"/snapcast/{podcast_uuid}{path}",
+                               method=method, headers=auth, **kwargs)
+        assert response.status_code < 400, response.data
+        return response
+    return call
+
+
+def changes(api, since: int = 0, limit: int = 1000) -> dict:
+    return api("GET", f"/changes?since={since}&limit={limit}").json
+
+
+def ops(api, since: int) -> list[tuple[str, str]]:
+    return sorted((change["op"], change["episode_uuid"])
+                  for change in changes(api, since)["changes"])
+
+
+def publish(api, n: int) -> str:
+    """Publish one episode, the plain way, and get its uuid."""
+    api("POST", "/publish", json=new(n))
+    return next(change["episode_uuid"]
+                for change in reversed(changes(api)["changes"])
+                if change["episode"]["title"] == f"New {n}")
+
+
+def new(n: int) -> dict:
+    return {"title": f"New {n}", "url": f"https://example.com/new{n}.mp3",
+            "size": 1}
+
+
+def test_every_write_path_logs(api):
+    seq = changes(api)["last_seq"]
+    assert seq == 0
+
+    uuid = publish(api, 0)
+    assert ops(api, seq) == [("insert", uuid)]
+    seq = changes(api, seq)["last_seq"]
+
+    batch = api("POST", "/publish/batch",
+                json=[new(1), new(2)]).json["episodes"]
+    assert ops(api, seq) == sorted(("insert", uuid) for uuid in batch)
+    seq = changes(api, seq)["last_seq"]
+
+    api("PATCH", f"/episode/{uuid}", json={"title": "Renamed"})
+    assert ops(api, seq) == [("update", uuid)]
+    seq = changes(api, seq)["last_seq"]
+
+    api("PATCH", "/episodes", json=[
+        {"uuid": uuid, "changes": {"season": 2}} for uuid in batch])
+    assert ops(api, seq) == sorted(("update", uuid) for uuid in batch)
+    seq = changes(api, seq)["last_seq"]
+
+    api("DELETE", f"/episode/{uuid}")
+    assert ops(api, seq) == [("delete", uuid)]
+    seq = changes(api, seq)["last_seq"]
+
+    api("DELETE", "/episodes", json=batch)
+    assert ops(api, seq) == sorted(("delete", uuid) for uuid in batch)
+    seq = changes(api, seq)["last_seq"]
+
+    # Nothing since.
+    assert changes(api, seq) == {"changes": [], "last_seq": seq}
+
+
+def test_changes_carry_the_episode(api):
+    uuid = publish(api, 0)
+    api("PATCH", f"/episode/{uuid}", json={"title": "Renamed"})
+    first, second = changes(api)["changes"]
+    # As it is now, for both.
+    assert first["episode"]["title"] == second["episode"]["title"] \
+        == "Renamed"
+
+    api("DELETE", f"/episode/{uuid}")
+    assert all(change["episode"] is None
+               for change in changes(api)["changes"])
+
+
+def test_paging_by_seq(api):
+    for n in range(5):
+        api("POST", "/publish", json=new(n))
+    everything = changes(api)["changes"]
+    seqs = [change["seq"] for change in everything]
+    assert seqs == sorted(seqs)
+
+    response = api("GET", "/changes?limit=2")
+    assert [c["seq"] for c in response.json["changes"]] == seqs[:2]
+    assert response.json["last_seq"] == seqs[1]
+    link = response.headers["Link"]
+    assert f"since={seqs[1]}" in link and 'rel="next"' in link
+
+    page = changes(api, since=seqs[1], limit=2)
+    assert [c["seq"] for c in page["changes"]] == seqs[2:4]
+
+    # The last, short page has no next.
+    response = api("GET", f"/changes?since={seqs[3]}&limit=2")
+    assert [c["seq"] for c in response.json["changes"]] == seqs[4:]
+    assert "Link" not in response.headers
+
+
+def test_other_podcasts_changes(api, client, make_podcast):
+    other_uuid, token = make_podcast(episodes=0)
+    response = client.post(f"/snapcast/{other_uuid}/publish",
+                           headers={"Authorization": f"Bearer {token}"},
+                           json=new(0))
+    assert response.status_code < 400
+    assert changes(api)["changes"] == []
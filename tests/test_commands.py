@@ -0,0 +1,38 @@
+"""The ``flask mane`` command line tools."""
+from hashlib import sha256
+
+from sqlalchemy import select
+
+from vulpes.blueprints.mane.models import PeanutFile
+from vulpes.nitre import db
+
+
+def test_hash_files(app, s3):
+    with app.app_context():
+        for n in range(5):
+            db.session.add(PeanutFile(filename=f"{n}.txt", size=1))
+        db.session.add(PeanutFile(filename="gone.txt", size=1))
+        db.session.add(PeanutFile(filename="hashed.txt", size=1,
+                                  sha256="already"))
+        db.session.add(PeanutFile(filename="pending.txt", size=1,
+                                  status="pending"))
+        db.session.commit()
+    for n in range(5):
+        s3.put_object(Bucket="f.peanut.one", Key=f"{n}.txt",
+                      Body=str(n).encode())
+
+    result = app.test_cli_runner().invoke(
+        args=["mane", "hash-files", "--batch", "2", "--workers", "2"])
+    assert result.exit_code == 0, result.output
+    assert "gone.txt isn't in S3" in result.output
+    assert "Hashed 5 files, 1 missing." in result.output
+    with app.app_context():
+        hashes = dict(db.session.execute(
+            select(PeanutFile.filename, PeanutFile.sha256)).all())
+    assert hashes == {
+        **{f"{n}.txt": sha256(str(n).encode()).hexdigest()
+           for n in range(5)},
+        "gone.txt": None,
+        "hashed.txt": "already",
+        "pending.txt": None,
+    }
@@ -0,0 +1,74 @@
+"""Deleting many episodes at once, all or nothing."""
+from uuid import UUID
+
+import pytest
+from sqlalchemy import select
+
+from vulpes.blueprints.snapcast.models import Episode
+from vulpes.nitre import db
+
+
+@pytest.fixture
+def delete(client, podcast):
+    podcast_uuid, token = podcast
+    auth = {"Authorization": f"Bearer {token}"}
+
+    def delete(json):
+        return client.delete(f"/snapcast/{podcast_uuid}/episodes",
+                             json=json, headers=auth)
+    return delete
+
+
+def remaining(app) -> list[int]:
+    with app.app_context():
+        return [uuid.int - 1000 for uuid in db.session.scalars(
+            select(Episode.uuid).order_by(Episode.id))]
+
+
+def test_delete_many(app, delete):
+    response = delete([str(UUID(int=1001)), str(UUID(int=1003))])
+    assert response.status_code == 200
+    assert response.json == {"rows": 2}
+    assert remaining(app) == [0, 2, 4]
+
+
+def test_unknown_uuids_delete_nothing(app, delete):
+    response = delete([str(UUID(int=1001)), str(UUID(int=7)),
+                       str(UUID(int=5))])
+    assert response.status_code == 422
+    assert response.json == {"errors": [
+        {"uuid": str(UUID(int=5)), "error": "No such episode."},
+        {"uuid": str(UUID(int=7)), "error": "No such episode."},
+    ]}
+    assert remaining(app) == [0, 1, 2, 3, 4]
+
+
+def test_other_podcasts_episodes_are_unknown(app, client, make_podcast,
+                                              delete):
+    other_uuid, token = make_podcast(episodes=0)
+    with app.app_context():
+        db.session.add(Episode(
+            podcast_uuid=other_uuid, uuid=UUID(int=9), title="Theirs",
+            media_url="https://example.com/9.mp3", media_size=1,
+            media_type="audio/mpeg",
+            pub_date=db.session.scalar(select(Episode.pub_date))))
+        db.session.commit()
+
+    response = delete([str(UUID(int=1000)), str(UUID(int=9))])
+    assert response.status_code == 422
+    assert [e["uuid"] for e in response.json["errors"]] == [
+        str(UUID(int=9))]
+    assert len(remaining(app)) == 6
+
+
+@pytest.mark.parametrize("body", [
+    str(UUID(int=1000)), ["not a uuid"], [1000], [None]])
+def test_bad_bodies(app, delete, body):
+    assert delete(body).status_code == 400
+    assert remaining(app) == [0, 1, 2, 3, 4]
+
+
+def test_nothing_to_delete(delete):
+    response = delete([])
+    assert response.status_code == 200
+    assert response.json == {"rows": 0}
@@ -0,0 +1,130 @@
+"""RFC 3229 feed deltas, for clients that send `A-IM: feed`."""
+from datetime import datetime, timezone
+from uuid import UUID
+from xml.etree import ElementTree
+
+import pytest
+from sqlalchemy import select, update
+
+from vulpes.blueprints.snapcast.models import Episode, Podcast
+from vulpes.nitre import db
+
+
+def at(day: int, hour: int = 0) -> datetime:
+    return datetime(2024, 3, day, hour, tzinfo=timezone.utc)
+
+
+@pytest.fixture
+def versions(app, client, make_podcast):
+    """Add a podcast and get the ETags of two versions of its feed.
+
+    The first is uncompressed and the second gzipped. Episode 3 was
+    edited between them, and episode 4 is published after.
+    """
+    podcast_uuid, token = make_podcast()
+    url = f"/snapcast/{podcast_uuid}/feed.xml"
+
+    def build(when: datetime, encoding: str = "identity") -> str:
+        with app.app_context():
+            db.session.execute(
+                update(Podcast)
+                .where(Podcast.uuid == podcast_uuid)
+                .values(last_build_date=when))
+            db.session.commit()
+        headers = {"Accept-Encoding": encoding}
+        client.get(url, headers=headers).get_data()
+        return client.get(url, headers=headers).headers["ETag"]
+
+    with app.app_context():
+        db.session.execute(update(Episode).values(last_modified=at(1)))
+        db.session.execute(
+            update(Episode)
+            .where(Episode.uuid == UUID(int=1003))
+            .values(last_modified=at(2, 12)))
+        db.session.execute(
+            update(Episode)
+            .where(Episode.uuid == UUID(int=1004))
+            .values(last_modified=at(4)))
+        db.session.commit()
+    first = build(at(2))
+    second = build(at(3), "gzip")
+    build(at(4))
+    return podcast_uuid, first, second
+
+
+def delta(client, podcast_uuid: UUID, *etags: str, **headers):
+    return client.get(f"/snapcast/{podcast_uuid}/feed.xml", headers={
+        "A-IM": "feed", "If-None-Match": ", ".join(etags), **headers})
+
+
+def episodes(response) -> list[int]:
+    return [UUID(guid.text).int - 1000
+            for guid in ElementTree.fromstring(response.data).iter("guid")]
+
+
+def test_delta_from_the_newest_version(client, versions):
+    podcast_uuid, first, second = versions
+    for etags in ((first, second), (second, first)):
+        response = delta(client, podcast_uuid, *etags)
+        assert response.status_code == 226
+        assert response.headers["IM"] == "feed"
+        assert episodes(response) == [4]
+
+    response = delta(client, podcast_uuid, first)
+    assert episodes(response) == [3, 4]
+
+
+def test_delta_has_the_identity_etag(client, versions):
+    podcast_uuid, first, _ = versions
+    current = client.get(f"/snapcast/{podcast_uuid}/feed.xml")
+    response = delta(client, podcast_uuid, first,
+                     **{"Accept-Encoding": "gzip"})
+    assert response.status_code == 226
+    assert response.content_encoding is None
+    assert response.headers["ETag"] == current.headers["ETag"]
+    assert not response.headers["ETag"].endswith('-gzip"')
+
+
+def test_delta_without_a_cached_feed(app, client, versions):
+    podcast_uuid, first, _ = versions
+    with app.app_context():
+        token = db.session.scalar(
+            select(Podcast.auth_token)
+            .where(Podcast.uuid == podcast_uuid))
+    response = client.post(
+        f"/snapcast/{podcast_uuid}/publish",
+        headers={"Authorization": f"Bearer {token}"},
+        json={"title": "New", "url": "https://example.com/new.mp3",
+              "size": 1})
+    assert response.status_code < 400
+
+    # Publishing emptied the cache, and there's no need to fill it.
+    response = delta(client, podcast_uuid, first)
+    assert response.status_code == 226
+    assert episodes(response)[:2] == [3, 4]
+    assert len(episodes(response)) == 3
+    assert "ETag" not in response.headers
+
+
+def test_up_to_date(client, versions):
+    podcast_uuid, *_ = versions
+    current = client.get(f"/snapcast/{podcast_uuid}/feed.xml")
+    response = delta(client, podcast_uuid, current.headers["ETag"])
+    assert response.status_code == 304
+
+
+def test_full_feed_without_a_im(client, versions):
+    podcast_uuid, first, _ = versions
+    response = client.get(f"/snapcast/{podcast_uuid}/feed.xml",
+                          headers={"If-None-Match": first})
+    assert response.status_code == 200
+    assert episodes(response) == [0, 1, 2, 3, 4]
+
+
+def test_varies_on_a_im(client, podcast):
+    podcast_uuid, _ = podcast
+    url = f"/snapcast/{podcast_uuid}/feed.xml"
+    for method in ("GET", "GET", "HEAD"):  # Rendered, cached, head.
+        response = client.open(url, method=method)
+        response.get_data()
+        assert "A-IM" in response.vary
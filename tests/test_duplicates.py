@@ -0,0 +1,43 @@
+"""Uploading bytes we already have hands back the file we have."""
+import io
+from hashlib import sha256
+
+from sqlalchemy import select
+
+from vulpes.blueprints.mane.models import PeanutFile
+from vulpes.blueprints.mane.util import find_duplicate
+from vulpes.nitre import db
+
+
+def upload(client, data: bytes, filename: str = "a file.txt") -> str:
+    response = client.post("/upload", data={
+        "file": (io.BytesIO(data), filename)})
+    assert response.status_code == 200
+    return response.get_data(as_text=True)
+
+
+def names(app) -> list[str]:
+    with app.app_context():
+        return db.session.scalars(
+            select(PeanutFile.filename).order_by(PeanutFile.id)).all()
+
+
+def test_repeat_once_stored(app, client, s3):
+    first = upload(client, b"hello")
+    # Wait for the worker to store it.
+    app.extensions["mane_uploads"].shutdown()
+    [name] = names(app)
+    assert name in first
+    assert upload(client, b"hello", "another name.txt") == first
+    assert names(app) == [name]
+
+
+def test_only_stored_files_count(app):
+    # A pending one might still fail.
+    with app.app_context():
+        for status in ("pending", "presigned", "failed"):
+            db.session.add(PeanutFile(
+                filename=f"{status}.txt", status=status,
+                sha256=sha256(b"hello").hexdigest()))
+        db.session.commit()
+        assert find_duplicate(sha256(b"hello").hexdigest()) is None
@@ -0,0 +1,77 @@
+"""Conditional requests and compressed variants of a cached feed."""
+import gzip
+from types import SimpleNamespace
+
+import pytest
+
+from vulpes.blueprints.snapcast import cache
+
+
+@pytest.fixture
+def feed(client, podcast, monkeypatch):
+    """Get a podcast's feed once it's cached, with brotli standing in."""
+    monkeypatch.setattr(cache, "brotli", SimpleNamespace(
+        MODE_TEXT=1, compress=lambda body, mode, quality: b"br:" + body))
+    url = f"/snapcast/{podcast[0]}/feed.xml"
+    client.get(url).get_data()
+
+    def feed(method: str = "GET", **headers):
+        response = client.open(url, method=method, headers=headers)
+        response.get_data()
+        return response
+    return feed
+
+
+def test_not_modified(feed):
+    etag = feed().headers["ETag"]
+    response = feed(**{"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.headers["ETag"] == etag
+    assert feed(**{"If-None-Match": '"something-else"'}).status_code == 200
+
+
+@pytest.mark.parametrize(("accept", "encoding"), [
+    ("gzip, br", "br"),
+    ("gzip", "gzip"),
+    ("br;q=0.5, gzip", "gzip"),
+    ("identity", None),
+])
+def test_encodings(feed, accept, encoding):
+    plain = feed(**{"Accept-Encoding": "identity"})
+    response = feed(**{"Accept-Encoding": accept})
+    assert response.content_encoding == encoding
+    assert "Accept-Encoding" in response.vary
+    if encoding is None:
+        assert response.headers["ETag"] == plain.headers["ETag"]
+        return
+    assert response.headers["ETag"] == (
+        plain.headers["ETag"][:-1] + f'-{encoding}"')
+    body = response.get_data()
+    assert (gzip.decompress(body) if encoding == "gzip"
+            else body.removeprefix(b"br:")) == plain.get_data()
+
+
+def test_etags_are_per_encoding(feed):
+    plain = feed(**{"Accept-Encoding": "identity"}).headers["ETag"]
+    # The client has the plain feed, but now wants it gzipped.
+    response = feed(**{"Accept-Encoding": "gzip", "If-None-Match": plain})
+    assert response.status_code == 200
+    assert response.content_encoding == "gzip"
+
+
+def test_head(feed):
+    for accept in ("identity", "gzip"):
+        got = feed(**{"Accept-Encoding": accept})
+        head = feed("HEAD", **{"Accept-Encoding": accept})
+        assert head.headers["ETag"] == got.headers["ETag"]
+        assert head.content_encoding == got.content_encoding
+        assert head.last_modified == got.last_modified
+        assert {"Accept-Encoding", "A-IM"} <= set(head.vary)
+
+
+def test_head_before_rendering(client, make_podcast):
+    podcast_uuid, _ = make_podcast()
+    response = client.head(f"/snapcast/{podcast_uuid}/feed.xml")
+    assert response.status_code == 200
+    assert "ETag" not in response.headers
+    assert response.last_modified is not None
@@ -0,0 +1,50 @@
+"""Listing a podcast's episodes, whole or a page at a time."""
+import json
+from datetime import datetime
+
+import pytest
+
+
+@pytest.fixture
+def listing(client, make_podcast):
+    podcast_uuid, token = make_podcast(episodes=5)
+    auth = {"Authorization": f"Bearer {token}"}
+
+    def get(query: str = "", accept: str = "application/json"):
+        return client.get(f"/snapcast/{podcast_uuid}/episodes{query}",
+                          headers={**auth, "Accept": accept})
+    return get
+
+
+def ndjson(response) -> list[dict]:
+    assert response.mimetype == "application/x-ndjson"
+    return [json.loads(line) for line in response.get_data(as_text=True)
+            .splitlines()]
+
+
+def test_dates_are_iso(listing):
+    episodes = listing().json
+    as_lines = ndjson(listing(accept="application/x-ndjson"))
+    assert episodes == as_lines
+    assert [e["pub_date"] for e in episodes] == [
+        f"2024-01-0{n}T00:00:00+00:00" for n in range(1, 6)]
+    for episode in episodes:
+        datetime.fromisoformat(episode["last_modified"])
+
+
+def test_fields(listing):
+    assert listing("?fields=title,pub_date").json[0] == {
+        "title": "Episode 0", "pub_date": "2024-01-01T00:00:00+00:00"}
+    assert listing("?fields=title,nope").status_code == 400
+
+
+def test_pages(listing):
+    seen = []
+    response = listing("?limit=2&fields=title")
+    while True:
+        seen += [e["title"] for e in response.json]
+        if "Link" not in response.headers:
+            break
+        url = response.headers["Link"].split(">")[0][1:]
+        response = listing("?" + url.split("?", 1)[1])
+    assert seen == [f"Episode {n}" for n in range(5)]
@@ -0,0 +1,39 @@
+"""Loading feeds from the database."""
+from uuid import UUID
+
+from vulpes.blueprints.snapcast.feed import load_feed
+from vulpes.nitre import db
+
+
+def test_three_queries(app, make_podcast, statements):
+    podcast_uuid, _ = make_podcast(episodes=50, categories=3)
+    statements.clear()
+    with app.test_request_context():
+        feed = load_feed(podcast_uuid)
+        assert len(statements) == 3
+        # Plain rows, not ORM objects.
+        assert not db.session.identity_map
+
+    assert len(feed.episodes) == 50
+    assert len(feed.categories) == 3
+    assert [item.title for item in feed.episodes[:2]] == [
+        "Episode 0", "Episode 1"]
+
+
+def test_served_uncached(app, client, make_podcast, statements):
+    podcast_uuid, _ = make_podcast(episodes=50, categories=3)
+    app.config["SNAPCAST"] = {**app.config["SNAPCAST"],
+                              "FEED_CACHE_ENTRIES": 0}
+    statements.clear()
+    response = client.get(f"/snapcast/{podcast_uuid}/feed.xml")
+    assert response.status_code == 200
+    response.get_data()
+    # Checking the podcast's version for the cache, then the feed itself.
+    assert len(statements) == 4
+    assert "last_build_date" in statements[0]
+
+
+def test_missing_podcast(app, statements):
+    with app.test_request_context():
+        assert load_feed(UUID(int=1)) is None
+    assert len(statements) == 1
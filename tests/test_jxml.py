@@ -0,0 +1,155 @@
+"""The markup engine has to write exactly what the ETree engine writes."""
+from datetime import datetime, timedelta, timezone
+from uuid import UUID
+
+import pytest
+
+from vulpes.blueprints.snapcast.jxml import (
+    FeedItem,
+    PodcastFeed,
+    xml_declaration,
+)
+
+awkward = 'Fish & "chips" <b>bold</b> it\'s \r\n\tdone — ünïcödé 🎙'
+
+
+def make_item(n: int = 0, **kwargs) -> FeedItem:
+    return FeedItem(**{
+        "title": f"Episode {n}",
+        "media_url": f"https://example.com/{n}.mp3",
+        "media_size": 1000 + n,
+        "media_type": "audio/mpeg",
+        "pub_date": datetime(2024, 1, 1, tzinfo=timezone.utc)
+        + timedelta(days=n),
+        "uuid": UUID(int=n),
+        **kwargs,
+    })
+
+
+def make_feed(items=(), **kwargs) -> PodcastFeed:
+    feed = PodcastFeed(**{
+        "title": "A podcast",
+        "description": "About things.",
+        "link": "https://example.com",
+        "last_build_date": datetime(2024, 2, 1, 12, 30,
+                                    tzinfo=timezone.utc),
+        **kwargs,
+    })
+    feed.episodes = list(items)
+    return feed
+
+
+def assert_same(feed: PodcastFeed) -> str:
+    etree = feed.build(engine="etree")
+    assert feed.build(engine="markup") == etree
+    assert (list(feed.stream(engine="markup"))
+            == list(feed.stream(engine="etree")))
+    return etree
+
+
+def test_bare_feed():
+    assert assert_same(make_feed()).startswith(xml_declaration + "<rss ")
+
+
+def test_every_field():
+    feed = make_feed(
+        [make_item(
+            1,
+            media_duration=timedelta(seconds=3723),
+            episode_type="full",
+            season=2,
+            episode=7,
+            subtitle="Short",
+            description="Long",
+            link="https://example.com/1",
+            image="https://example.com/1.jpg",
+            transcript="https://example.com/1.vtt",
+            transcript_type="text/vtt",
+        )],
+        image="https://example.com/cover.png",
+        is_serial=True,
+        author="June",
+        explicit=True,
+        categories=[{"cat": "Arts", "sub": "Design"},
+                    {"cat": "Comedy", "sub": None}],
+        feed_url="https://example.com/feed.xml",
+        copyright="2024 June",
+        language="de",
+        itunes_block=True,
+        new_feed_url="https://example.org/feed.xml",
+        complete=True,
+        archive=True,
+        links={"prev-archive": "https://example.com/archive/1.xml",
+               "current": "https://example.com/feed.xml"},
+    )
+    assert_same(feed)
+
+
+@pytest.mark.parametrize("text", [
+    awkward,
+    "",
+    " ",
+    "]]>",
+    "&amp; already escaped",
+    "<![CDATA[not really]]>",
+    "\x7f control",
+])
+def test_special_text(text: str):
+    feed = make_feed(
+        [make_item(1, subtitle=text, description=text, link=text),
+         make_item(2, title=text, episode_type=text)],
+        author=text,
+        copyright=text,
+        categories=[{"cat": text, "sub": text}],
+    )
+    feed.title = text
+    feed.description = text
+    assert_same(feed)
+
+
+@pytest.mark.parametrize("value", [awkward, "", 'a"b', "a'b", "a\tb\nc\rd"])
+def test_special_attributes(value: str):
+    feed = make_feed(
+        [make_item(1, image=value, transcript=value, transcript_type=value)],
+        image=value,
+        feed_url=value,
+        categories=[{"cat": value, "sub": value}],
+        links={"next": value},
+    )
+    feed.episodes[0].media_url = value
+    feed.episodes[0].media_type = value
+    assert_same(feed)
+
+
+def test_empty_and_missing_fields():
+    feed = make_feed(
+        [make_item(1, subtitle="", description=None),
+         make_item(2, subtitle=None, description=""),
+         make_item(3, season=0, episode=0,
+                   media_duration=timedelta(0))],
+        author="",
+        copyright=None,
+        language=None,
+        categories=[{"cat": "", "sub": None}],
+    )
+    feed.episodes[0].uuid = None
+    assert_same(feed)
+
+
+@pytest.mark.parametrize("pub_date", [
+    datetime(2024, 6, 30, 23, 59, 59, tzinfo=timezone.utc),
+    datetime(2024, 6, 30, 23, 59, 59,
+             tzinfo=timezone(timedelta(hours=-5, minutes=-30))),
+    datetime(2024, 6, 30, 23, 59, 59, 999999,
+             tzinfo=timezone(timedelta(hours=14))),
+])
+def test_dates(pub_date: datetime):
+    item = make_item(1)
+    item.pub_date = pub_date
+    assert_same(make_feed([item], last_build_date=pub_date))
+
+
+def test_pretty_markup_goes_through_etree():
+    feed = make_feed([make_item(1), make_item(2)])
+    assert (feed.build(pretty=True, engine="markup")
+            == feed.build(pretty=True, engine="etree"))
@@ -0,0 +1,66 @@
+"""Migrations that have to cope with the data already there."""
+from pathlib import Path
+from uuid import UUID
+
+import pytest
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import inspect, text
+
+from vulpes.nitre import db
+
+root = Path(__file__).parents[1]
+
+
+@pytest.fixture
+def before_indexes(app):
+    """Take the db back to just before ea0cc8f21ada added its indexes.
+
+    Returns a function that migrates it forward to just that revision.
+    """
+    with app.app_context(), db.engine.begin() as conn:
+        for index in ("ix_podcast_uuid", "ix_episode_uuid",
+                      "ix_episode_podcast_uuid_pub_date",
+                      "ix_category_podcast_id", "ix_peanut_file_filename"):
+            conn.execute(text(f"DROP INDEX {index}"))
+
+    config = Config(root / "alembic.ini")
+    config.set_main_option("path_separator", "os")
+    config.set_main_option("script_location", str(root / "nitre"))
+    config.set_main_option("sqlalchemy.url",
+                           app.config["SQLALCHEMY_DATABASE_URI"])
+    command.stamp(config, "2648cfe49dfb")
+    return lambda: command.upgrade(config, "ea0cc8f21ada")
+
+
+def insert_files(app, *names):
+    with app.app_context():
+        for name in names:
+            db.session.execute(
+                text("INSERT INTO peanut_file (filename, origin_name)"
+                     " VALUES (:name, :origin)"),
+                {"name": name, "origin": f"upload {name}"})
+        db.session.commit()
+
+
+def test_duplicate_files_keep_the_newest(app, before_indexes):
+    insert_files(app, "abc.png", "abc.png", "def.png", None, None,
+                 "abc.png")
+    before_indexes()
+    with app.app_context():
+        rows = db.session.execute(text(
+            "SELECT id, filename FROM peanut_file ORDER BY id")).all()
+        indexes = {index["name"]: index["unique"]
+                   for index in inspect(db.engine).get_indexes("peanut_file")}
+    assert rows == [(3, "def.png"), (4, None), (5, None), (6, "abc.png")]
+    assert indexes["ix_peanut_file_filename"]
+
+
+def test_duplicate_uuids_stop_it(app, make_podcast, before_indexes):
+    make_podcast(episodes=2)
+    with app.app_context():
+        db.session.execute(text("UPDATE episode SET uuid = :uuid"),
+                           {"uuid": UUID(int=7).hex})
+        db.session.commit()
+    with pytest.raises(RuntimeError, match="episode.uuid unique"):
+        before_indexes()
@@ -0,0 +1,49 @@
+"""Handing out file names from the sequence."""
+import sqlite3
+from datetime import datetime, timezone
+from threading import Timer
+
+import pytest
+from sqlalchemy import event
+
+from vulpes.blueprints.mane import names
+from vulpes.blueprints.mane.models import PeanutFile
+from vulpes.blueprints.mane.util import add_file, get_name_allocator
+from vulpes.nitre import db
+
+
+def test_names_differ(app):
+    with app.app_context():
+        taken = set()
+        for _ in range(50):
+            taken.add(add_file("png", size=1).filename)
+            db.session.commit()
+    assert len(taken) == 50
+
+
+def test_add_file_first(app):
+    with app.app_context():
+        db.session.add(PeanutFile(filename="custom.png", size=1,
+                                  tstamp=datetime.now(timezone.utc)))
+        db.session.flush()
+        with pytest.raises(RuntimeError):
+            add_file("png", size=1)
+        db.session.rollback()
+
+
+def test_claim_waits_out_a_writer(app, monkeypatch):
+    monkeypatch.setattr(names, "_claim_backoff", 0.05)
+    with app.app_context():
+        @event.listens_for(db.engine, "connect")
+        def impatient(dbapi_connection, connection_record):
+            dbapi_connection.execute("PRAGMA busy_timeout = 10")
+
+        db.engine.dispose()
+        # Another process writing for longer than the busy timeout.
+        writer = sqlite3.connect(db.engine.url.database,
+                                 isolation_level=None,
+                                 check_same_thread=False)
+        writer.execute("BEGIN IMMEDIATE")
+        Timer(0.2, writer.execute, ("COMMIT",)).start()
+        assert get_name_allocator().allocate()
+        writer.close()
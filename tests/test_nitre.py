@@ -0,0 +1,34 @@
+"""The [SQLITE] tuning profile, applied to every new connection."""
+from sqlalchemy import text
+
+from vulpes import create_app
+from vulpes.nitre import db
+
+
+def pragmas(app) -> dict:
+    with app.app_context(), db.engine.connect() as conn:
+        return {name: conn.execute(text(f"PRAGMA {name}")).scalar()
+                for name in ("journal_mode", "synchronous", "busy_timeout",
+                             "cache_size")}
+
+
+def test_file_db_is_tuned(app):
+    assert pragmas(app) == {
+        "journal_mode": "wal",
+        "synchronous": 1,  # NORMAL
+        "busy_timeout": 5000,
+        "cache_size": -65536,
+    }
+
+
+def test_untuned(tmp_path):
+    app = create_app({
+        "TESTING": True,
+        "SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path / 'test.sqlite'}",
+        "SQLITE": {"TUNED": False},
+    })
+    try:
+        assert pragmas(app)["journal_mode"] == "delete"
+    finally:
+        with app.app_context():
+            db.engine.dispose()
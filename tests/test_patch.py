@@ -0,0 +1,58 @@
+"""Patching episodes, one at a time or in a batch."""
+from uuid import UUID
+
+import pytest
+from sqlalchemy import select
+
+from vulpes.blueprints.snapcast.models import Episode
+from vulpes.nitre import db
+
+
+@pytest.fixture
+def patch(client, podcast):
+    podcast_uuid, token = podcast
+    auth = {"Authorization": f"Bearer {token}"}
+
+    def patch(path: str, json):
+        return client.patch(f"/snapcast/{podcast_uuid}/{path}", json=json,
+                            headers=auth)
+    return patch
+
+
+def episode(app, n: int) -> Episode:
+    with app.app_context():
+        return db.session.scalar(
+            select(Episode).where(Episode.uuid == UUID(int=1000 + n)))
+
+
+def test_patch_one(app, patch):
+    response = patch(f"episode/{UUID(int=1000)}", {"title": "Renamed"})
+    assert response.json == {"rows": 1}
+    assert episode(app, 0).title == "Renamed"
+
+
+@pytest.mark.parametrize("column", ["id", "uuid", "podcast_uuid"])
+def test_identity_is_fixed(app, patch, column):
+    before = episode(app, 0)
+    value = 99 if column == "id" else str(UUID(int=99))
+    response = patch(f"episode/{UUID(int=1000)}",
+                     {column: value, "title": "Renamed"})
+    assert response.status_code == 400
+    assert column in response.get_data(as_text=True)
+    after = episode(app, 0)
+    assert (after.id, after.uuid, after.podcast_uuid, after.title) == (
+        before.id, before.uuid, before.podcast_uuid, before.title)
+
+
+@pytest.mark.parametrize("body", [[], "title", 1])
+def test_patch_one_wants_an_object(patch, body):
+    assert patch(f"episode/{UUID(int=1000)}", body).status_code == 400
+
+
+@pytest.mark.parametrize("column", ["id", "uuid", "podcast_uuid"])
+def test_batch_identity_is_fixed(patch, column):
+    value = 99 if column == "id" else str(UUID(int=99))
+    response = patch("episodes", [{"uuid": str(UUID(int=1000)),
+                                   "changes": {column: value}}])
+    assert response.status_code == 422
+    assert column in response.get_data(as_text=True)
@@ -0,0 +1,10 @@
+"""The hot queries have to use indexes, not scan whole tables."""
+from bench.feeds import make_app, seed
+from bench.plans import check, record
+
+
+def test_no_table_scans(tmp_path):
+    app = make_app(str(tmp_path))
+    statements = record(app, *seed(app, 100))
+    assert len(statements) > 30
+    assert check(app, statements) == []
@@ -0,0 +1,99 @@
+"""Presigned uploads, which go straight to S3 and are confirmed after."""
+from datetime import datetime, timedelta, timezone
+
+import pytest
+import requests
+from sqlalchemy import select, update
+
+from vulpes.blueprints.mane import util, views
+from vulpes.blueprints.mane.models import PeanutFile
+from vulpes.nitre import db
+
+
+@pytest.fixture
+def presign(client, s3):
+    def presign(filename: str = "a file.txt") -> dict:
+        response = client.post("/uploadbot/presign",
+                               data={"filename": filename})
+        assert response.status_code == 200
+        return response.json
+    return presign
+
+
+def file(app, name: str) -> PeanutFile | None:
+    with app.app_context():
+        return db.session.scalar(
+            select(PeanutFile).where(PeanutFile.filename == name))
+
+
+def name_of(form: dict) -> str:
+    return form["link"].rsplit("/", 1)[1]
+
+
+def test_presign_then_confirm(app, client, presign, s3):
+    form = presign()
+    name = name_of(form)
+    assert file(app, name).status == "presigned"
+
+    response = requests.post(form["url"], data=form["fields"],
+                             files={"file": b"hello"})
+    assert response.ok
+    response = client.post(form["confirm"])
+    assert response.get_data(as_text=True) == form["link"]
+    stored = file(app, name)
+    assert (stored.status, stored.size) == ("stored", 5)
+    # Confirming again changes nothing.
+    assert client.post(form["confirm"]).status_code == 200
+
+
+def test_confirm_missing(app, client, presign):
+    form = presign()
+    assert client.post(form["confirm"]).status_code == 409
+    assert file(app, name_of(form)).status == "presigned"
+
+
+def test_confirm_too_big(app, client, presign, s3, monkeypatch):
+    monkeypatch.setattr(views, "PRESIGNED_MAX_SIZE", 4)
+    form = presign()
+    name = name_of(form)
+    s3.put_object(Bucket="f.peanut.one", Key=name, Body=b"hello")
+
+    assert client.post(form["confirm"]).status_code == 413
+    assert file(app, name) is None
+    assert s3.list_objects_v2(Bucket="f.peanut.one")["KeyCount"] == 0
+
+
+def test_reap_expired(app, presign, s3):
+    arrived, missing, waiting = (name_of(presign()) for _ in range(3))
+    s3.put_object(Bucket="f.peanut.one", Key=arrived, Body=b"hello")
+    expired = datetime.now(timezone.utc) - timedelta(
+        seconds=app.config["S3"]["PRESIGN_EXPIRES"] + 1)
+    with app.app_context():
+        db.session.execute(
+            update(PeanutFile)
+            .where(PeanutFile.filename.in_([arrived, missing]))
+            .values(tstamp=expired))
+        db.session.commit()
+
+    # Presigning doesn't reap anything itself.
+    presign()
+    assert file(app, missing).status == "presigned"
+
+    result = app.test_cli_runner().invoke(
+        args=["mane", "reap-presigned", "--batch", "1"])
+    assert result.exit_code == 0, result.output
+    assert "Settled 2 presigned uploads." in result.output
+    assert (file(app, arrived).status, file(app, arrived).size) == (
+        "stored", 5)
+    assert file(app, missing) is None
+    assert file(app, waiting).status == "presigned"
+
+
+def test_reap_too_big(app, presign, s3, monkeypatch):
+    monkeypatch.setattr(util, "PRESIGNED_MAX_SIZE", 4)
+    name = name_of(presign())
+    s3.put_object(Bucket="f.peanut.one", Key=name, Body=b"hello")
+    with app.app_context():
+        util.reap_presigned(s3, -1)
+    assert file(app, name) is None
+    assert s3.list_objects_v2(Bucket="f.peanut.one")["KeyCount"] == 0
@@ -0,0 +1,89 @@
+"""Publishing many episodes at once, as a JSON array or NDJSON."""
+import json
+from uuid import UUID
+
+import pytest
+from sqlalchemy import func, select
+
+from vulpes.blueprints.snapcast.models import Episode
+from vulpes.nitre import db
+
+
+def episode(n: int) -> dict:
+    return {"title": f"New {n}", "url": f"https://example.com/new{n}.mp3",
+            "size": n}
+
+
+@pytest.fixture
+def publish(client, podcast):
+    podcast_uuid, token = podcast
+    auth = {"Authorization": f"Bearer {token}"}
+
+    def publish(body, ndjson: bool = False):
+        if ndjson:
+            return client.post(
+                f"/snapcast/{podcast_uuid}/publish/batch", headers=auth,
+                data=body, content_type="application/x-ndjson")
+        return client.post(f"/snapcast/{podcast_uuid}/publish/batch",
+                           headers=auth, json=body)
+    return publish
+
+
+def count(app) -> int:
+    with app.app_context():
+        return db.session.scalar(select(func.count()).select_from(Episode))
+
+
+@pytest.mark.parametrize("ndjson", [False, True])
+def test_publish(app, publish, ndjson):
+    batch = [episode(n) for n in range(3)]
+    body = "\n".join(map(json.dumps, batch)) + "\n\n" if ndjson else batch
+    response = publish(body, ndjson)
+    assert response.status_code == 200
+    uuids = [UUID(uuid) for uuid in response.json["episodes"]]
+    assert len(uuids) == 3
+
+    with app.app_context():
+        titles = db.session.scalars(
+            select(Episode.title)
+            .where(Episode.uuid.in_(uuids))
+            .order_by(Episode.id)).all()
+    assert titles == ["New 0", "New 1", "New 2"]
+
+
+def test_every_failure_by_index(app, publish):
+    response = publish([
+        episode(0),
+        {**episode(1), "url": 5, "timestamp": 10**20},
+        "an episode",
+        {**episode(3), "url": "https://example.com/new?3.mp3"},
+        {**episode(4), "title": {"en": "New"}},
+        episode(5),
+    ])
+    assert response.status_code == 422
+    assert response.json["errors"] == [
+        {"index": 1, "error": "timestamp is out of range"},
+        {"index": 1, "error": "url must be a string"},
+        {"index": 2, "error": "Record must be a JSON object."},
+        {"index": 3, "error": "url must be one of .m4a, .mp3, .mov, .mp4, "
+                              ".m4v, or .pdf"},
+        {"index": 4, "error": "title must be a string"},
+    ]
+    # None of it went in.
+    assert count(app) == 5
+
+
+def test_ndjson_failures(app, publish):
+    body = "\n".join([json.dumps(episode(0)), "{not json",
+                      json.dumps({"title": "No url", "size": 1})])
+    response = publish(body, ndjson=True)
+    assert response.status_code == 422
+    errors = response.json["errors"]
+    assert [error["index"] for error in errors] == [1, 2]
+    assert errors[0]["error"].startswith("Invalid JSON")
+    assert errors[1]["error"] == "url missing."
+    assert count(app) == 5
+
+
+def test_must_be_an_array(publish):
+    assert publish(episode(0)).status_code == 400
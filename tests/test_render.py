@@ -0,0 +1,96 @@
+"""Requests for the same feed share one render from the pool."""
+from datetime import datetime, timezone
+from threading import Event, Thread
+from time import sleep
+from uuid import UUID
+
+import pytest
+from sqlalchemy import select
+
+from vulpes.blueprints.snapcast import views
+from vulpes.blueprints.snapcast.cache import RenderedFeed
+from vulpes.blueprints.snapcast.models import Podcast
+from vulpes.blueprints.snapcast.render import FeedRenderer
+from vulpes.nitre import db
+
+
+def test_join_and_finish():
+    renderer = FeedRenderer(1)
+    version = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    key = (UUID(int=1), version, None)
+    assert renderer.join(key) is None
+    running = renderer.join(key)
+    assert not running.done()
+
+    rendered = RenderedFeed(version, b"<rss/>")
+    renderer.finish(key, rendered)
+    assert running.result() is rendered
+    # Done with, so the next one leads again.
+    assert renderer.join(key) is None
+
+
+@pytest.fixture
+def pooled(app, monkeypatch):
+    """Count loads and renders, and hold renders until `release` is set."""
+    app.config["SNAPCAST"] = {**app.config["SNAPCAST"],
+                              "RENDER_WORKERS": 1,
+                              "RENDER_OFFLOAD_EPISODES": 1}
+    counts = {"load": 0, "render": 0}
+    release = Event()
+
+    load_feed = views.load_feed
+
+    def counted_load(*args):
+        counts["load"] += 1
+        return load_feed(*args)
+
+    def held_render(self, feed, pretty=False, engine="etree"):
+        counts["render"] += 1
+        release.wait(5)
+        return feed.build(pretty=pretty, engine=engine).encode()
+
+    monkeypatch.setattr(views, "load_feed", counted_load)
+    monkeypatch.setattr(FeedRenderer, "render", held_render)
+    return counts, release
+
+
+def test_waiters_share_the_leaders_feed(app, podcast, pooled):
+    counts, release = pooled
+    podcast_uuid, _ = podcast
+    responses = []
+
+    def fetch():
+        with app.test_client() as client:
+            response = client.get(f"/snapcast/{podcast_uuid}/feed.xml")
+            responses.append((response.status_code, response.get_data(),
+                              response.headers.get("ETag")))
+
+    threads = [Thread(target=fetch) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    sleep(0.5)  # Long enough for them all to be waiting on the first.
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert counts == {"load": 1, "render": 1}
+    assert len(responses) == 4
+    assert len(set(responses)) == 2  # The leader's goes out without ETag.
+    assert all(status == 200 for status, _, _ in responses)
+    assert len({body for _, body, _ in responses}) == 1
+
+
+def test_leader_finishes_on_a_miss(app, client, podcast, pooled):
+    _, release = pooled
+    release.set()
+    podcast_uuid, _ = podcast
+    # Not windowed, so no archive pages.
+    response = client.get(f"/snapcast/{podcast_uuid}/archive/1.xml")
+    assert response.status_code == 404
+    with app.app_context():
+        last_build_date = db.session.scalar(
+            select(Podcast.last_build_date)
+            .where(Podcast.uuid == podcast_uuid))
+    # Finished with, so it's there to lead again.
+    assert app.extensions["feed_renderer"].join(
+        (podcast_uuid, last_build_date, 1)) is None
@@ -0,0 +1,54 @@
+"""Searching a podcast's episodes."""
+from datetime import datetime, timezone
+from urllib.parse import urlsplit
+from uuid import UUID
+
+import pytest
+
+from vulpes.blueprints.snapcast.models import Episode
+from vulpes.nitre import db
+
+
+@pytest.fixture
+def search(app, client, make_podcast):
+    """Search one podcast, with another podcast's episodes matching too."""
+    podcast_uuid, _ = make_podcast(episodes=5)
+    other_uuid, _ = make_podcast(episodes=0)
+    with app.app_context():
+        for n in range(5):
+            db.session.add(Episode(
+                podcast_uuid=other_uuid,
+                uuid=UUID(int=2000 + n),
+                title=f"Episode {n}",
+                media_url=f"https://example.com/other/{n}.mp3",
+                media_size=1,
+                media_type="audio/mpeg",
+                pub_date=datetime(2024, 1, 1, tzinfo=timezone.utc),
+            ))
+        db.session.commit()
+
+    def search(query: str):
+        return client.get(f"/snapcast/{podcast_uuid}/search{query}")
+    return search
+
+
+def test_only_this_podcast(search):
+    results = search("?q=episode").json
+    assert sorted(r["uuid"] for r in results) == [
+        str(UUID(int=1000 + n)) for n in range(5)]
+
+
+def test_pages_break_ties(search):
+    # Every title matches the same way, so every rank is the same.
+    seen = []
+    url = "?q=episode&limit=2"
+    while url:
+        response = search(url)
+        seen += [r["uuid"] for r in response.json]
+        link = response.headers.get("Link")
+        url = link and "?" + urlsplit(link[1:link.index(">")]).query
+    assert sorted(seen) == [str(UUID(int=1000 + n)) for n in range(5)]
+
+
+def test_nothing_to_search_for(search):
+    assert search("?q=*").status_code == 400
@@ -0,0 +1,74 @@
+"""Streaming a bot's upload to S3 as a multipart upload."""
+import os
+from hashlib import sha256
+
+import pytest
+from sqlalchemy import select
+
+from vulpes.blueprints.mane.models import PeanutFile
+from vulpes.nitre import db
+
+BOUNDARY = "XyZzyBoundary"
+TAIL = f"\r\n--{BOUNDARY}--\r\n".encode()
+
+
+@pytest.fixture
+def upload(app, client, s3):
+    """POST a form with `data` as its file, and the closing boundary."""
+    app.config["S3"].update(PART_SIZE=5 * 1024 ** 2, PARTS_IN_FLIGHT=2)
+
+    def upload(data: bytes, tail: bytes = TAIL):
+        body = (
+            f"--{BOUNDARY}\r\n"
+            'Content-Disposition: form-data; name="note"\r\n\r\n'
+            f"hi\r\n--{BOUNDARY}\r\n"
+            'Content-Disposition: form-data; name="file"; '
+            'filename="a file.bin"\r\n'
+            "Content-Type: application/x-test\r\n\r\n"
+        ).encode() + data + tail
+        return client.post(
+            "/uploadbot", data=body,
+            content_type=f"multipart/form-data; boundary={BOUNDARY}")
+    return upload
+
+
+def files(app) -> list[PeanutFile]:
+    with app.app_context():
+        return db.session.scalars(select(PeanutFile)).all()
+
+
+def leftover_uploads(s3) -> list:
+    return s3.list_multipart_uploads(Bucket="f.peanut.one").get(
+        "Uploads", [])
+
+
+def test_complete(app, upload, s3):
+    data = os.urandom(11 * 1024 ** 2 + 7)
+    response = upload(data)
+    assert response.status_code == 200
+    name = response.get_data(as_text=True).rsplit("/", 1)[1]
+
+    stored = s3.get_object(Bucket="f.peanut.one", Key=name)
+    assert stored["Body"].read() == data
+    assert stored["ContentType"] == "application/x-test"
+    [file] = files(app)
+    assert (file.filename, file.size, file.sha256, file.status) == (
+        name, len(data), sha256(data).hexdigest(), "stored")
+    assert leftover_uploads(s3) == []
+
+
+def test_aborted(app, upload, s3):
+    # The body ends before the form does.
+    response = upload(os.urandom(6 * 1024 ** 2), tail=b"")
+    assert response.status_code == 400
+    assert files(app) == []
+    assert leftover_uploads(s3) == []
+    assert s3.list_objects_v2(Bucket="f.peanut.one")["KeyCount"] == 0
+
+
+def test_duplicate(app, upload, s3):
+    data = os.urandom(1024)
+    first = upload(data).get_data(as_text=True)
+    assert upload(data).get_data(as_text=True) == first
+    assert len(files(app)) == 1
+    assert leftover_uploads(s3) == []
@@ -0,0 +1,98 @@
+"""The queue that sends spooled uploads on to S3."""
+import io
+import os
+import time
+
+import pytest
+from sqlalchemy import select
+
+from vulpes.blueprints.mane import util
+from vulpes.blueprints.mane.models import PeanutFile
+from vulpes.blueprints.mane.uploads import UploadQueue
+from vulpes.nitre import db
+
+
+@pytest.fixture
+def queue(app, s3, tmp_path):
+    queue = UploadQueue(app, s3, str(tmp_path / "spool"), workers=1,
+                        attempts=1, backoff=0)
+    yield queue
+    queue.shutdown()
+
+
+def spool(queue: UploadQueue, filename: str, age: float = 0) -> str:
+    path = os.path.join(queue.spool, filename)
+    with open(path, "wb") as file:
+        file.write(b"hello")
+    then = time.time() - age
+    os.utime(path, (then, then))
+    return path
+
+
+def test_started_by_mane(app, client, podcast):
+    client.get(f"/snapcast/{podcast[0]}/feed.xml").get_data()
+    assert "mane_uploads" not in app.extensions
+    client.get("/")
+    assert "mane_uploads" in app.extensions
+    app.extensions["mane_uploads"].shutdown()
+
+
+def test_shut_down_at_exit(app, client, monkeypatch):
+    registered = []
+    monkeypatch.setattr(util.atexit, "register", registered.append)
+    client.get("/")
+    client.get("/")
+    uploads = app.extensions["mane_uploads"]
+    assert registered == [uploads.shutdown]
+    uploads.shutdown()
+
+
+def test_old_instance_config(app, client, s3):
+    """An instance config.toml from before mane's newer settings."""
+    app.config["S3"] = {"ACCESS_KEY": "testing", "SECRET_KEY": "testing",
+                        "BUCKET_NAME": ""}
+    app.config["FOX"] = {"FILE_NAME_LENGTH": 6}
+    try:
+        response = client.post("/uploadbot/presign",
+                               data={"filename": "a.txt"})
+        assert response.status_code == 200
+        response = client.post("/uploadbot", data={
+            "file": (io.BytesIO(b"hello"), "b.txt")})
+        assert response.status_code == 200
+    finally:
+        app.extensions["mane_uploads"].shutdown()
+
+
+def test_resume(app, queue, s3):
+    with app.app_context():
+        db.session.add_all([
+            PeanutFile(filename="pending.txt", size=5, status="pending"),
+            PeanutFile(filename="stored.txt", size=5, status="stored"),
+            PeanutFile(filename="failed.txt", size=5, status="failed"),
+        ])
+        db.session.commit()
+    for name in ("pending.txt", "stored.txt", "failed.txt"):
+        spool(queue, name, age=3600)
+    # Left by a run that died, and only just made by another process.
+    spool(queue, ".incoming-old", age=3600)
+    spool(queue, ".incoming-new")
+
+    assert queue.resume() == 1
+    queue.shutdown()
+    body = s3.get_object(Bucket="f.peanut.one", Key="pending.txt")["Body"]
+    assert body.read() == b"hello"
+    assert sorted(os.listdir(queue.spool)) == [".incoming-new",
+                                               "failed.txt"]
+    with app.app_context():
+        assert db.session.scalar(
+            select(PeanutFile.status)
+            .where(PeanutFile.filename == "pending.txt")) == "stored"
+
+
+def test_spooling_is_locked(queue):
+    spooled, _ = queue.spool_file(io.BytesIO(b"hello"))
+    # Resuming now can't take it, however old it looks.
+    os.utime(spooled.name, (0, 0))
+    assert queue.resume() == 0
+    assert os.path.exists(spooled.name)
+    queue.discard(spooled)
@@ -0,0 +1,101 @@
+"""Compiled Pull specs have to behave like running each Pull in turn."""
+import pytest
+
+from vulpes.blueprints.snapcast.validate import (
+    Pull,
+    ValidationError,
+    compile_pulls,
+    episode_extractors,
+    non_negative,
+    positive,
+    validate_episode,
+)
+
+full = {
+    "title": "Episode",
+    "subtitle": "Sub",
+    "description": "Notes",
+    "timestamp": 1_600_000_000,
+    "url": "https://example.com/1.mp3",
+    "size": 100,
+    "duration": 3600,
+    "link": "https://example.com/1",
+    "image": "https://example.com/1.jpg",
+    "episode_type": "full",
+    "episode": 1,
+    "season": 2,
+    "transcript": "https://example.com/1.vtt",
+}
+
+
+def interpreted(source: dict) -> dict:
+    return {pull.to: pull.run(source) for pull in episode_extractors}
+
+
+@pytest.mark.parametrize("source", [
+    full,
+    {"title": "Bare", "url": "https://example.com/1.mp3", "size": 0},
+    {**full, "subtitle": None, "episode": None},
+])
+def test_same_as_interpreted(source):
+    assert validate_episode(source) == interpreted(source)
+
+
+def test_every_error_at_once():
+    with pytest.raises(ValidationError) as raised:
+        validate_episode({**full, "title": None, "size": -1,
+                          "episode_type": "trailer park", "season": 0})
+    errors = raised.value.errors
+    assert [type(e) for e in errors] == [ValueError, TypeError, TypeError,
+                                         TypeError]
+    assert str(errors[0]) == "title missing."
+    assert raised.value.status == 400
+
+    with pytest.raises(ValidationError) as raised:
+        validate_episode({**full, "size": -1})
+    assert raised.value.status == 422
+    assert str(raised.value) == "size must not be negative"
+
+
+def test_defaults_and_alongside():
+    validate = compile_pulls([
+        Pull("a", positive, alongside=["b"]),
+        Pull("b", non_negative, alongside=["a"]),
+        Pull("c", default=5),
+    ])
+    assert validate({"a": 1, "b": 0}) == {"a": 1, "b": 0, "c": 5}
+    assert validate({}) == {"a": None, "b": None, "c": 5}
+    with pytest.raises(ValidationError) as raised:
+        validate({"a": 1})
+    assert str(raised.value) == ("a can only be specified together with "
+                                 "b.")
+
+
+def test_keys_are_not_code():
+    key = "x'] = 1\nraise SystemExit\n#"
+    validate = compile_pulls([Pull(key, positive, to="y", required=True)])
+    assert validate({key: 3}) == {"y": 3}
+    with pytest.raises(ValidationError, match="must be positive"):
+        validate({key: -3})
+
+
+@pytest.mark.parametrize(("changes", "error"), [
+    ({"url": 5}, "url must be a string"),
+    ({"image": 3}, "image must be a string"),
+    ({"transcript": ["a.vtt"]}, "transcript must be a string"),
+    ({"size": "big"}, "size must be a number"),
+    ({"season": True}, "season must be a number"),
+    ({"timestamp": 10**20}, "timestamp is out of range"),
+    ({"timestamp": float("nan")}, "timestamp is out of range"),
+    ({"duration": 10**20}, "duration is out of range"),
+])
+def test_bad_types_are_field_errors(changes, error):
+    with pytest.raises(ValidationError) as raised:
+        validate_episode({**full, **changes})
+    assert str(raised.value) == error
+    assert raised.value.status == 422
+
+    pull = next(pull for pull in episode_extractors
+                if pull.from_ in changes)
+    with pytest.raises(TypeError, match=error):
+        pull.run({**full, **changes})
@@ -5,7 +5,7 @@ import tomllib
 from flask import Flask, render_template
 from werkzeug.middleware.proxy_fix import ProxyFix
 
-from .nitre import db
+from .nitre import db, init_db  # noqa: F401 - blueprints import db from here.
 
 
 def create_app(test_config=None):
@@ -37,7 +37,7 @@ def create_app(test_config=None):
     if app.config["SERVER_NAME"] == "peanut.one":
         app.url_map.default_subdomain = "www"
 
-    db.init_app(app)
+    init_db(app)
 
     from .blueprints import mane, snapcast, twitch
     app.register_blueprint(mane.bp)
@@ -1 +1,2 @@
+from . import commands  # noqa: F401 - registers the CLI commands.
 from .views import bp  # noqa: F401
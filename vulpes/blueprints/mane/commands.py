@@ -0,0 +1,88 @@
+"""Command line tools for mane, run with ``flask mane <command>``."""
+from concurrent.futures import ThreadPoolExecutor
+from hashlib import sha256
+from typing import Optional
+
+import click
+from botocore.exceptions import ClientError
+from flask import current_app
+from sqlalchemy import select
+
+from .models import PeanutFile
+from .util import get_amazon, reap_presigned
+from .views import bp
+from ... import db
+
+
+@bp.cli.command("hash-files")
+@click.option("--batch", default=100, show_default=True,
+              help="Files to hash between commits.")
+@click.option("--workers", default=8, show_default=True,
+              help="Files to download and hash at once.")
+def hash_files(batch: int, workers: int):
+    """Hash the stored files that were uploaded before hashing started.
+
+    Each one is read back from S3 a chunk at a time, so files of any size
+    are fine.
+    """
+    s3 = get_amazon()
+
+    def hash_object(filename: str) -> Optional[str]:
+        try:
+            body = s3.get_object(Bucket="f.peanut.one", Key=filename)["Body"]
+        except ClientError as e:
+            if e.response["Error"]["Code"] in ("404", "NoSuchKey"):
+                return None
+            raise
+        digest = sha256()
+        for chunk in body.iter_chunks(1024 * 1024):
+            digest.update(chunk)
+        return digest.hexdigest()
+
+    hashed = missing = 0
+    last_id = 0
+    with ThreadPoolExecutor(workers) as pool:
+        while True:
+            files = db.session.scalars(
+                select(PeanutFile)
+                .where(PeanutFile.sha256.is_(None),
+                       PeanutFile.status == "stored",
+                       PeanutFile.id > last_id)
+                .order_by(PeanutFile.id)
+                .limit(batch),
+            ).all()
+            if not files:
+                break
+            last_id = files[-1].id
+            names = [file.filename for file in files]
+            for file, digest in zip(files, pool.map(hash_object, names),
+                                    strict=True):
+                if digest is None:
+                    click.echo(f"{file.filename} isn't in S3, skipping.")
+                    missing += 1
+                else:
+                    file.sha256 = digest
+                    hashed += 1
+            db.session.commit()
+
+    click.echo(f"Hashed {hashed} files, {missing} missing.")
+
+
+@bp.cli.command("reap-presigned")
+@click.option("--batch", default=100, show_default=True,
+              help="Uploads to settle between commits.")
+def reap_presigned_uploads(batch: int):
+    """Settle the presigned uploads whose forms expired unconfirmed.
+
+    Run it every so often, from cron or the like. Until it's run, their
+    names stay taken.
+    """
+    s3 = get_amazon()
+    expires = current_app.config["S3"].get("PRESIGN_EXPIRES", 3600)
+    settled = 0
+    while True:
+        reaped = reap_presigned(s3, expires, batch)
+        settled += reaped
+        if reaped < batch:
+            break
+    click.echo(f"Settled {settled} presigned uploads.")
@@ -1,6 +1,7 @@
 from datetime import datetime
-from typing import Optional
+from typing import Literal, Optional
 
+from sqlalchemy import Index
 from sqlalchemy.orm import Mapped, mapped_column
 
 from ...nitre import TZDateTime, db
@@ -10,13 +11,34 @@ class PeanutFile(db.Model):
     """ORM Mapping for the database's `peanut_file` table."""
 
     __tablename__ = "peanut_file"
+    __table_args__ = (
+        # Finding presigned uploads that were never confirmed.
+        Index("ix_peanut_file_status_tstamp", "status", "tstamp"),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True)
-    filename: Mapped[Optional[str]]
+    filename: Mapped[Optional[str]] = mapped_column(unique=True, index=True)
     size: Mapped[Optional[int]]
     origin_name: Mapped[Optional[str]]
     tstamp: Mapped[Optional[datetime]] = mapped_column(TZDateTime)
+    status: Mapped[Literal["pending", "presigned", "stored", "failed"]] = (
+        mapped_column(default="stored", server_default="stored"))
+    sha256: Mapped[Optional[str]] = mapped_column(index=True)
 
     def __init__(self, **kwargs):
         for attr, value in kwargs.items():
             setattr(self, attr, value)
+
+
+class NameSequence(db.Model):
+    """ORM Mapping for the database's `name_sequence` table.
+
+    One row per file name length, holding the next number not yet handed
+    out to a `NameAllocator`.
+    """
+
+    __tablename__ = "name_sequence"
+
+    length: Mapped[int] = mapped_column(primary_key=True,
+                                        autoincrement=False)
+    next: Mapped[int]
@@ -0,0 +1,114 @@
+"""Short file names that can't collide, handed out without any lookups.
+
+Each length of name has a sequence in the `name_sequence` table. A
+process claims a block of numbers from it at a time, and turns each
+number into a name with `encode`, a bijection, so different numbers
+always give different names.
+"""
+import os
+import string
+import time
+from threading import Lock
+
+from sqlalchemy import insert, update
+from sqlalchemy.exc import IntegrityError, OperationalError
+
+from .models import NameSequence
+from ... import db
+
+alphabet = string.ascii_lowercase
+
+# These decide which name each number gets. Changing them would start
+# handing out names that are already taken. The multiplier has to stay
+# coprime to 26 for the mapping to be one-to-one.
+_multiplier = 0x5DEECE66D
+_offset = 0x9E3779B97F4A7C15
+
+# How many more times to try a claim while other writers hold the db past
+# SQLite's busy timeout, and how long to wait before the first retry.
+_claim_retries = 5
+_claim_backoff = 0.1
+
+
+def encode(number: int, length: int) -> str:
+    """Turn a number below ``26 ** length`` into its name.
+
+    Two rounds of an affine map, with the digits reversed in between, so
+    that consecutive numbers give names that look nothing alike.
+    """
+    base = len(alphabet)
+    space = base ** length
+    if not 0 <= number < space:
+        raise ValueError(f"No name of length {length} for {number}.")
+    for _ in range(2):
+        number = (number * _multiplier + _offset) % space
+        reversed_number = 0
+        for _ in range(length):
+            number, digit = divmod(number, base)
+            reversed_number = reversed_number * base + digit
+        number = reversed_number
+    letters = []
+    for _ in range(length):
+        number, digit = divmod(number, base)
+        letters.append(alphabet[digit])
+    return "".join(letters)
+
+
+class NameAllocator:
+    """Hand out the names of one length, a block of numbers at a time.
+
+    Blocks are claimed in their own transaction, so a block belongs to
+    one process even if the request that claimed it rolls back. That
+    transaction can't start while the session has written anything, as
+    SQLite lets only one connection write at a time, so take names before
+    making other changes. Numbers left in a block when the process exits
+    are never used, which only costs names.
+    """
+
+    def __init__(self, length: int, block_size: int):
+        self.length = length
+        self.block_size = block_size
+        self._lock = Lock()
+        self._next = self._end = 0
+        self._pid = None
+
+    def allocate(self) -> str:
+        """Get a name that's never been handed out before."""
+        with self._lock:
+            # A forked worker mustn't spend its parent's block.
+            if self._next == self._end or self._pid != os.getpid():
+                self._next, self._end = self._claim()
+                self._pid = os.getpid()
+            number = self._next
+            self._next += 1
+        return encode(number, self.length)
+
+    def _claim(self) -> tuple[int, int]:
+        retries = 0
+        while True:
+            try:
+                with db.engine.begin() as conn:
+                    end = conn.scalar(
+                        update(NameSequence)
+                        .where(NameSequence.length == self.length)
+                        .values(next=NameSequence.next + self.block_size)
+                        .returning(NameSequence.next))
+                    if end is None:
+                        conn.execute(insert(NameSequence).values(
+                            length=self.length, next=self.block_size))
+                        end = self.block_size
+            except IntegrityError:
+                # Another process started the sequence first.
+                continue
+            except OperationalError as e:
+                if "database is locked" not in str(e.orig) \
+                        or retries == _claim_retries:
+                    raise
+                time.sleep(_claim_backoff * 2 ** retries)
+                retries += 1
+                continue
+            if end > len(alphabet) ** self.length:
+                raise RuntimeError(
+                    f"Out of {self.length} letter names. "
+                    "Raise FILE_NAME_LENGTH.")
+            return end - self.block_size, end
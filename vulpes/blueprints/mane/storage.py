@@ -0,0 +1,115 @@
+"""Streaming uploads to S3, sent in parts while the rest is still arriving."""
+from collections.abc import Iterator
+from concurrent.futures import Future, ThreadPoolExecutor
+from threading import BoundedSemaphore
+from typing import IO, Optional
+
+from werkzeug.exceptions import BadRequest
+from werkzeug.sansio.multipart import (
+    Epilogue,
+    Event,
+    MultipartDecoder,
+    NeedData,
+)
+
+# What's read from the request at a time, not what's sent to S3.
+CHUNK_SIZE = 64 * 1024
+
+# The most S3 takes in a single POST. Anything bigger has to be streamed.
+PRESIGNED_MAX_SIZE = 5 * 1024 ** 3
+
+
+class MultipartUpload:
+    """Write an object to S3 as a multipart upload, part by part.
+
+    Whole parts are uploaded on a small pool of threads as soon as they
+    fill up. Once `max_in_flight` parts are on their way, `write` waits for
+    one to finish, so at most ``part_size * (max_in_flight + 1)`` bytes are
+    held however big the object gets.
+    """
+
+    def __init__(self, s3, bucket: str, key: str, content_type: str,
+                 part_size: int, max_in_flight: int):
+        self.s3 = s3
+        self.bucket = bucket
+        self.key = key
+        self.part_size = part_size
+        self.size = 0
+        self._buffer = bytearray()
+        self._parts: list[Future] = []
+        self._failure: Optional[BaseException] = None
+        self._slots = BoundedSemaphore(max_in_flight)
+        self._pool = ThreadPoolExecutor(max_in_flight,
+                                        thread_name_prefix="s3-part")
+        self.upload_id = s3.create_multipart_upload(
+            Bucket=bucket, Key=key, ACL="public-read",
+            ContentType=content_type)["UploadId"]
+
+    def write(self, data: bytes) -> None:
+        """Add to the object, sending any parts that are now full."""
+        self.size += len(data)
+        self._buffer += data
+        while len(self._buffer) >= self.part_size:
+            self._send(bytes(self._buffer[:self.part_size]))
+            del self._buffer[:self.part_size]
+
+    def complete(self) -> int:
+        """Send what's left, finish the object, and return its size."""
+        # S3 wants at least one part, even if it's empty.
+        if self._buffer or not self._parts:
+            self._send(bytes(self._buffer))
+            self._buffer.clear()
+        parts = [{"ETag": part.result()["ETag"], "PartNumber": number}
+                 for number, part in enumerate(self._parts, 1)]
+        self._pool.shutdown()
+        self.s3.complete_multipart_upload(
+            Bucket=self.bucket, Key=self.key, UploadId=self.upload_id,
+            MultipartUpload={"Parts": parts})
+        return self.size
+
+    def abort(self) -> None:
+        """Give up, and have S3 throw away the parts it already has."""
+        self._pool.shutdown(cancel_futures=True)
+        self.s3.abort_multipart_upload(
+            Bucket=self.bucket, Key=self.key, UploadId=self.upload_id)
+
+    def _send(self, body: bytes) -> None:
+        self._slots.acquire()
+        # Don't keep reading a body there's no finishing.
+        if self._failure is not None:
+            self._slots.release()
+            raise self._failure
+        part = self._pool.submit(
+            self.s3.upload_part, Bucket=self.bucket, Key=self.key,
+            UploadId=self.upload_id, PartNumber=len(self._parts) + 1,
+            Body=body)
+        part.add_done_callback(self._sent)
+        self._parts.append(part)
+
+    def _sent(self, part: Future) -> None:
+        if not part.cancelled() and part.exception() is not None:
+            self._failure = part.exception()
+        self._slots.release()
+
+
+def multipart_events(stream: IO[bytes],
+                     boundary: str,
+                     max_form_memory_size: Optional[int] = None,
+) -> Iterator[Event]:
+    """Parse a multipart/form-data body as it's read, without spooling it.
+
+    Yields werkzeug's sans-io events: a `Field` or `File` starts each part,
+    and `Data` carries its contents a piece at a time.
+    """
+    decoder = MultipartDecoder(boundary.encode(), max_form_memory_size)
+    while True:
+        try:
+            event = decoder.next_event()
+        except ValueError as e:
+            raise BadRequest(str(e)) from e
+        if isinstance(event, NeedData):
+            decoder.receive_data(stream.read(CHUNK_SIZE) or None)
+        elif isinstance(event, Epilogue):
+            return
+        else:
+            yield event
@@ -0,0 +1,189 @@
+"""Send spooled uploads on to S3 in the background, retrying as needed.
+
+A file is written to the spool directory, its row committed as
+``pending``, and the request goes on its way. A worker then uploads it
+and marks it ``stored``, or ``failed`` once it runs out of attempts. A
+spooled file is locked for as long as a worker has it, so spool files
+that nothing holds when the app starts are ones a previous run never
+finished, and they're picked up again.
+"""
+import fcntl
+import logging
+import mimetypes
+import os
+import random
+import secrets
+import time
+from concurrent.futures import ThreadPoolExecutor
+from hashlib import sha256
+from threading import Lock, Timer, current_thread
+from typing import BinaryIO, Literal
+
+from boto3.exceptions import S3UploadFailedError
+from botocore.exceptions import BotoCoreError, ClientError
+from flask import Flask
+from sqlalchemy import select, update
+
+from .models import PeanutFile
+from ... import db
+
+log = logging.getLogger(__name__)
+
+# A file with no row that's younger than this, in seconds, may have only
+# just been made by another process that hasn't locked it yet.
+_young = 60
+
+
+class UploadQueue:
+    """A bounded pool of threads uploading spooled files to S3."""
+
+    def __init__(self, app: Flask, s3, spool: str, workers: int,
+                 attempts: int, backoff: float):
+        self.app = app
+        self.s3 = s3
+        """A boto3 client, shared by the workers."""
+        self.spool = spool
+        """Directory that files wait in until they're stored."""
+        self.attempts = attempts
+        """How many times to try a file before marking it failed."""
+        self.backoff = backoff
+        """Seconds to wait before the first retry, doubling each time."""
+
+        os.makedirs(spool, exist_ok=True)
+        self._pool = ThreadPoolExecutor(workers,
+                                        thread_name_prefix="s3-upload")
+        self._timers: set[Timer] = set()
+        self._lock = Lock()
+
+    def spool_file(self, source: BinaryIO) -> tuple[BinaryIO, str]:
+        """Copy an upload into the spool, hashing it on the way.
+
+        Returns the spooled file, open and locked, and its SHA-256. It's
+        spooled under a temporary name until it's given one with `keep`,
+        or thrown away with `discard`.
+        """
+        # Held open, and so locked, until a worker's done with it.
+        spooled = open(os.path.join(  # noqa: SIM115
+            self.spool, ".incoming-" + secrets.token_hex(8)), "x+b")
+        fcntl.flock(spooled, fcntl.LOCK_EX)
+        digest = sha256()
+        while chunk := source.read(64 * 1024):
+            digest.update(chunk)
+            spooled.write(chunk)
+        spooled.flush()
+        return spooled, digest.hexdigest()
+
+    def keep(self, spooled: BinaryIO, filename: str) -> None:
+        """Name a spooled file after the row it's for."""
+        os.rename(spooled.name, os.path.join(self.spool, filename))
+
+    def discard(self, spooled: BinaryIO) -> None:
+        """Throw away a spooled file that isn't needed after all."""
+        os.remove(spooled.name)
+        spooled.close()
+
+    def submit(self, filename: str, spooled: BinaryIO,
+               content_type: str) -> None:
+        """Upload a spooled file, once its row has been committed."""
+        self._pool.submit(self._upload, filename, spooled, content_type, 1)
+
+    def resume(self) -> int:
+        """Pick up the spooled files a previous run left behind.
+
+        Returns how many were queued again. Files whose rows are gone or
+        already stored are cleaned up, and failed ones are left alone, as
+        are new ones without rows that may still be on their way in.
+        """
+        resumed = 0
+        for filename in os.listdir(self.spool):
+            path = os.path.join(self.spool, filename)
+            try:
+                # Held open, and so locked, while its upload is resumed.
+                spooled = open(path, "rb")  # noqa: SIM115
+            except FileNotFoundError:
+                continue
+            try:
+                fcntl.flock(spooled, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                # Some other worker has it.
+                spooled.close()
+                continue
+
+            with self.app.app_context():
+                status = db.session.scalar(
+                    select(PeanutFile.status)
+                    .where(PeanutFile.filename == filename))
+            if status == "pending":
+                content_type = (mimetypes.guess_type(filename)[0]
+                                or "application/octet-stream")
+                self._pool.submit(self._upload, filename, spooled,
+                                  content_type, 1)
+                resumed += 1
+            else:
+                age = time.time() - os.fstat(spooled.fileno()).st_mtime
+                if status == "stored" or status is None and age >= _young:
+                    os.remove(path)
+                spooled.close()
+        return resumed
+
+    def shutdown(self) -> None:
+        """Wait for uploads in progress, and drop the retries still waiting.
+
+        Whatever's left stays spooled, to be resumed next time.
+        """
+        with self._lock:
+            for timer in self._timers:
+                timer.cancel()
+            self._timers.clear()
+        self._pool.shutdown(wait=True)
+
+    def _upload(self, filename: str, spooled: BinaryIO, content_type: str,
+                attempt: int) -> None:
+        try:
+            # boto3 closes what it's given when it fails, and `spooled`
+            # has to stay open to keep its lock.
+            with open(os.path.join(self.spool, filename), "rb") as body:
+                self.s3.upload_fileobj(
+                    body, "f.peanut.one", filename,
+                    ExtraArgs={"ACL": "public-read",
+                               "ContentType": content_type})
+        except (BotoCoreError, ClientError, S3UploadFailedError) as e:
+            if attempt >= self.attempts:
+                log.error("Giving up on uploading %s: %s", filename, e)
+                self._finish(filename, spooled, "failed")
+                return
+            # Jittered, so a burst of failures doesn't retry in lockstep.
+            delay = self.backoff * 2 ** (attempt - 1) * random.uniform(1, 2)
+            log.warning("Uploading %s failed, retrying in %.1fs: %s",
+                        filename, delay, e)
+            timer = Timer(delay, self._retry, (
+                filename, spooled, content_type, attempt + 1))
+            timer.daemon = True
+            with self._lock:
+                self._timers.add(timer)
+            timer.start()
+            return
+        except BaseException:
+            self._finish(filename, spooled, "failed")
+            raise
+        self._finish(filename, spooled, "stored")
+
+    def _retry(self, filename: str, spooled: BinaryIO, content_type: str,
+               attempt: int) -> None:
+        with self._lock:
+            self._timers.discard(current_thread())
+        self._pool.submit(self._upload, filename, spooled, content_type,
+                          attempt)
+
+    def _finish(self, filename: str, spooled: BinaryIO,
+                status: Literal["stored", "failed"]) -> None:
+        with self.app.app_context():
+            db.session.execute(
+                update(PeanutFile)
+                .where(PeanutFile.filename == filename)
+                .values(status=status))
+            db.session.commit()
+        # A failed file is kept, so nothing's lost if it's retried by hand.
+        if status == "stored":
+            os.remove(os.path.join(self.spool, filename))
+        spooled.close()
@@ -1,30 +1,128 @@
-import string
-from random import choice
+import atexit
+import os
+from datetime import datetime, timedelta, timezone
 from typing import Optional
 
 import boto3
+from botocore.exceptions import ClientError
 from flask import current_app as app
 from flask import g
 from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
 
 from .models import PeanutFile
+from .names import NameAllocator
+from .storage import PRESIGNED_MAX_SIZE
+from .uploads import UploadQueue
 from ... import db
 
 
 def randomname(ext: Optional[str] = None):
-    """Generate a new unique random short name for a file."""
-    randname = "".join([choice(string.ascii_lowercase)
-                       for _ in range(app.config["FOX"]["FILE_NAME_LENGTH"])])
+    """Get a new short name for a file, one never handed out before.
+
+    Names come from the app's `NameAllocator`, so there's nothing to look
+    up. Names picked at random before it existed can still clash, which
+    `add_file` takes care of.
+    """
+    name = get_name_allocator().allocate()
     if ext is not None:
-        randname = randname + "." + ext
+        name = name + "." + ext
+    return name
+
+
+def add_file(ext: Optional[str] = None, **columns) -> PeanutFile:
+    """Add a row for a new file under a name from `randomname`.
+
+    If the name was already taken at random, the session is rolled back
+    and the next name tried, so call this before making other changes.
+    Names are claimed on a connection of their own, which would wait on
+    the session's writes, so it raises `RuntimeError` if there are any.
+    """
+    if _writing():
+        raise RuntimeError("add_file has to come before other changes.")
+    while True:
+        file = PeanutFile(filename=randomname(ext), **columns)
+        db.session.add(file)
+        try:
+            db.session.flush()
+        except IntegrityError:
+            db.session.rollback()
+        else:
+            return file
+
+
+def _writing() -> bool:
+    """Whether the session has changes it hasn't committed."""
+    if db.session.new or db.session.dirty or db.session.deleted:
+        return True
+    # Flushed ones hold SQLite's write lock until they're committed.
+    return db.session.connection().connection.dbapi_connection.in_transaction
+
+
+def find_duplicate(sha256: str) -> Optional[str]:
+    """Get the name of a file we already have with these contents.
+
+    Only stored files count. One that's still pending might yet fail.
+    """
+    return db.session.scalars(
+        select(PeanutFile.filename)
+        .where(PeanutFile.sha256 == sha256,
+               PeanutFile.status == "stored")
+        .limit(1),
+    ).first()
+
 
-    result = db.session.execute(
+def presigned_size(s3, filename: str) -> Optional[int]:
+    """Get the size of what's been uploaded to a presigned name, if any."""
+    try:
+        head = s3.head_object(Bucket="f.peanut.one", Key=filename)
+    except ClientError as e:
+        if e.response["Error"]["Code"] in ("404", "NoSuchKey"):
+            return None
+        raise
+    return head["ContentLength"]
+
+
+def reap_presigned(s3, expires: int, limit: int = 100) -> int:
+    """Settle the presigned uploads whose forms expired unconfirmed.
+
+    Nothing more can be uploaded to those names, so each is stored if its
+    object made it to S3, and otherwise deleted, along with an object too
+    big to have been allowed. Names are never handed out twice, so one
+    that's still arriving, and lands after this, can't clash with anything.
+
+    Settles up to `limit` of them, oldest first, and returns how many.
+    """
+    cutoff = datetime.now(timezone.utc) - timedelta(seconds=expires)
+    files = db.session.scalars(
         select(PeanutFile)
-        .where(PeanutFile.filename == randname),
-    ).fetchone()
-    if result is not None:
-        return randomname(ext)
-    return randname
+        .where(PeanutFile.status == "presigned",
+               PeanutFile.tstamp < cutoff)
+        .order_by(PeanutFile.tstamp)
+        .limit(limit),
+    ).all()
+    for file in files:
+        size = presigned_size(s3, file.filename)
+        if size is not None and size <= PRESIGNED_MAX_SIZE:
+            file.size = size
+            file.status = "stored"
+            continue
+        if size is not None:
+            s3.delete_object(Bucket="f.peanut.one", Key=file.filename)
+        db.session.delete(file)
+    db.session.commit()
+    return len(files)
+
+
+def get_name_allocator() -> NameAllocator:
+    """Get the app's allocator for new file names."""
+    if "mane_names" not in app.extensions:
+        config = app.config["FOX"]
+        app.extensions.setdefault("mane_names", NameAllocator(
+            length=config["FILE_NAME_LENGTH"],
+            block_size=config.get("NAME_BLOCK_SIZE", 64),
+        ))
+    return app.extensions["mane_names"]
 
 
 def send_file(jmap_client, filename, file_data):
@@ -51,9 +149,34 @@ Filesize: {len(file_data) / 1024 / 1024:.2F}MB
 def get_amazon():
     """Get an s3 connection."""
     if "s3" not in g:
-        g.s3 = boto3.client(
-            "s3",
-            aws_access_key_id=app.config["S3"]["ACCESS_KEY"],
-            aws_secret_access_key=app.config["S3"]["SECRET_KEY"],
-        )
+        g.s3 = make_amazon()
     return g.s3
+
+
+def make_amazon():
+    """Make a new s3 connection, for use outside of a request."""
+    return boto3.client(
+        "s3",
+        aws_access_key_id=app.config["S3"]["ACCESS_KEY"],
+        aws_secret_access_key=app.config["S3"]["SECRET_KEY"],
+    )
+
+
+def get_upload_queue() -> UploadQueue:
+    """Get the app's queue of spooled uploads on their way to S3."""
+    if "mane_uploads" not in app.extensions:
+        config = app.config["S3"]
+        uploads = UploadQueue(
+            # The app itself, for the workers' threads, not the proxy.
+            app.app_context().app,
+            s3=make_amazon(),
+            spool=os.path.join(app.instance_path, "spool"),
+            workers=config.get("UPLOAD_WORKERS", 4),
+            attempts=config.get("UPLOAD_ATTEMPTS", 6),
+            backoff=config.get("UPLOAD_BACKOFF", 2),
+        )
+        if app.extensions.setdefault("mane_uploads", uploads) is uploads:
+            # Let uploads in progress finish before the process goes.
+            atexit.register(uploads.shutdown)
+            uploads.resume()
+    return app.extensions["mane_uploads"]
@@ -1,19 +1,46 @@
+import mimetypes
 from datetime import datetime, timezone
+from hashlib import sha256
 from threading import Thread
+from typing import IO
 
-from flask import Blueprint, redirect, render_template, request, url_for
+from flask import (
+    Blueprint,
+    abort,
+    current_app,
+    redirect,
+    render_template,
+    request,
+    url_for,
+)
 from sqlalchemy import select
 from werkzeug.datastructures import FileStorage
+from werkzeug.sansio.multipart import Field, File
 from werkzeug.utils import secure_filename
+from werkzeug.wsgi import get_input_stream
 
 from .jmap import get_jmap
 from .models import PeanutFile
-from .util import get_amazon, randomname, send_file
+from .storage import PRESIGNED_MAX_SIZE, MultipartUpload, multipart_events
+from .util import (
+    add_file,
+    find_duplicate,
+    get_amazon,
+    get_upload_queue,
+    presigned_size,
+    send_file,
+)
 from ... import db
 
 bp = Blueprint("mane", __name__, template_folder="templates")
 
 
+@bp.before_request
+def start_uploads():
+    """Start the upload queue, which resumes what the last run left."""
+    get_upload_queue()
+
+
 @bp.route("/")
 def main_page():
     """Get the site's homepage."""
@@ -49,21 +76,110 @@ def upload():
 
 @bp.route("/uploadbot", methods=["POST"])
 def bot_upload():
-    """Handle file upload and return a simpler response for bots."""
-    file = request.files["file"]
-    filename = perform_upload(file)
+    """Handle file upload and return a simpler response for bots.
+
+    The file goes to S3 as it arrives rather than being spooled first, so
+    it isn't held to `MAX_CONTENT_LENGTH`.
+    """
+    boundary = request.mimetype_params.get("boundary")
+    if request.mimetype != "multipart/form-data" or not boundary:
+        abort(400)
+    # `request.stream` would hold this to MAX_CONTENT_LENGTH.
+    filename = stream_upload(get_input_stream(request.environ), boundary)
     if filename is not None:
         return "http://f.peanut.one/" + filename
     return "Error, probably an empty upload field"
 
 
+@bp.route("/uploadbot/presign", methods=["POST"])
+def presign_upload():
+    """Reserve a name for a bot's file, and let it upload straight to S3.
+
+    Returns the file's link, and a form `url` and `fields` to POST the
+    file to, along with it as `file`. Once that's done, POST to `confirm`
+    to finish up. None of the file goes through here. The form lasts for
+    `PRESIGN_EXPIRES` seconds, after which a name that was never confirmed
+    is settled by ``flask mane reap-presigned``.
+    """
+    filename = secure_filename(request.form.get("filename", ""))
+    if not filename:
+        abort(400)
+    content_type = (request.form.get("content_type")
+                    or mimetypes.guess_type(filename)[0]
+                    or "application/octet-stream")
+
+    s3 = get_amazon()
+    expires = current_app.config["S3"].get("PRESIGN_EXPIRES", 3600)
+
+    # The row holds the name until the upload is confirmed, and its size
+    # is filled in, or until it's reaped once its form has expired.
+    newname = add_file(
+        _extension(filename),
+        origin_name=filename,
+        tstamp=datetime.now(timezone.utc),
+        status="presigned",
+    ).filename
+    db.session.commit()
+
+    post = s3.generate_presigned_post(
+        "f.peanut.one", newname,
+        Fields={"acl": "public-read", "Content-Type": content_type},
+        Conditions=[
+            {"acl": "public-read"},
+            {"Content-Type": content_type},
+            ["content-length-range", 0, PRESIGNED_MAX_SIZE],
+        ],
+        ExpiresIn=expires,
+    )
+    return {
+        "link": "http://f.peanut.one/" + newname,
+        "url": post["url"],
+        "fields": post["fields"],
+        "confirm": url_for("mane.confirm_upload", name=newname,
+                           _external=True),
+    }
+
+
+@bp.route("/uploadbot/confirm/<name>", methods=["POST"])
+def confirm_upload(name: str):
+    """Record a presigned upload once it's in S3, and return its link."""
+    file = db.session.scalars(
+        select(PeanutFile)
+        .where(PeanutFile.filename == name),
+    ).first()
+    if file is None:
+        abort(404)
+
+    if file.status == "presigned":
+        s3 = get_amazon()
+        size = presigned_size(s3, name)
+        if size is None:
+            abort(409, "Nothing has been uploaded to that name yet.")
+        if size > PRESIGNED_MAX_SIZE:
+            # It got around the form's limit somehow.
+            s3.delete_object(Bucket="f.peanut.one", Key=name)
+            db.session.delete(file)
+            db.session.commit()
+            abort(413)
+        file.size = size
+        file.status = "stored"
+        file.tstamp = datetime.now(timezone.utc)
+        db.session.commit()
+
+    return "http://f.peanut.one/" + name
+
+
 def perform_upload(file: FileStorage, custom_name: str | None = None):
-    """Rename and upload file to Amazon S3, returning its new name."""
+    """Rename and upload file to Amazon S3, returning its new name.
+
+    If we already have a file with the same contents, and no name was
+    asked for, that file's name is returned and nothing is uploaded.
+    """
     if file is None or file.filename is None:
         return None
 
     filename = secure_filename(file.filename)
-    ext = [x[-1] if len(x) > 1 else None for x in [filename.split(".")]][0]
+    ext = _extension(filename)
     if custom_name is not None:
         result = db.session.execute(
             select(PeanutFile)
@@ -74,24 +190,99 @@ def perform_upload(file: FileStorage, custom_name: str | None = None):
         newname = custom_name
         if ext:
             newname += "." + ext
+
+    uploads = get_upload_queue()
+    spooled, content_hash = uploads.spool_file(file)
+    if custom_name is None:
+        duplicate = find_duplicate(content_hash)
+        if duplicate is not None:
+            uploads.discard(spooled)
+            return duplicate
+
+    columns = {
+        "size": spooled.tell(),
+        "origin_name": filename,
+        "tstamp": datetime.now(timezone.utc),
+        "status": "pending",
+        "sha256": content_hash,
+    }
+    if custom_name is not None:
+        db.session.add(PeanutFile(filename=newname, **columns))
     else:
-        newname = randomname(ext)
-
-    file.seek(0, 2)
-    size = file.tell()
-    file.seek(0, 0)
-    db.session.add(
-        PeanutFile(
-            filename=newname,
-            size=size,
-            origin_name=filename,
-            tstamp=datetime.now(timezone.utc),
-        ),
-    )
+        newname = add_file(ext, **columns).filename
+
+    # The link's handed out now, and goes live once a worker has sent
+    # the file on to S3.
+    uploads.keep(spooled, newname)
     db.session.commit()
-    # amazon.upload(newname, f.stream)
-    get_amazon().upload_fileobj(
-        file, "f.peanut.one", newname,
-        ExtraArgs={"ACL": "public-read", "ContentType": file.mimetype})
+    uploads.submit(newname, spooled, file.mimetype)
 
     return newname
+
+
+def stream_upload(stream: IO[bytes], boundary: str) -> str | None:
+    """Rename and stream a form's file to S3, returning its new name.
+
+    Parts are sent while the client is still sending, a few at a time, so
+    memory use stays flat whatever the size of the file. Its size and
+    SHA-256 are worked out on the way through, and if we already have a
+    file with the same contents, that one's name is returned instead.
+    """
+    config = current_app.config["S3"]
+    file = upload = None
+    copying = False
+    digest = sha256()
+    try:
+        for event in multipart_events(stream, boundary,
+                                      request.max_form_memory_size):
+            if isinstance(event, File) and event.name == "file" \
+                    and event.filename and upload is None:
+                filename = secure_filename(event.filename)
+                # Take the name before anything is written to it.
+                file = add_file(
+                    _extension(filename),
+                    origin_name=filename,
+                    tstamp=datetime.now(timezone.utc),
+                    status="pending",
+                )
+                db.session.commit()
+                upload = MultipartUpload(
+                    get_amazon(), "f.peanut.one", file.filename,
+                    event.headers.get("Content-Type",
+                                      "application/octet-stream"),
+                    config.get("PART_SIZE", 8 << 20),
+                    config.get("PARTS_IN_FLIGHT", 4))
+                copying = True
+            elif isinstance(event, (Field, File)):
+                copying = False
+            elif copying:
+                digest.update(event.data)
+                upload.write(event.data)
+        if upload is None:
+            return None
+        duplicate = find_duplicate(digest.hexdigest())
+        if duplicate is None:
+            file.size = upload.complete()
+            file.sha256 = digest.hexdigest()
+            file.status = "stored"
+    except BaseException:
+        if upload is not None:
+            upload.abort()
+        if file is not None:
+            db.session.rollback()
+            db.session.delete(file)
+            db.session.commit()
+        raise
+
+    if duplicate is not None:
+        # We already have these bytes, so the parts sent can go.
+        upload.abort()
+        db.session.delete(file)
+        db.session.commit()
+        return duplicate
+    db.session.commit()
+    return file.filename
+
+
+def _extension(filename: str) -> str | None:
+    return [x[-1] if len(x) > 1 else None for x in [filename.split(".")]][0]
@@ -0,0 +1,238 @@
+"""In-process caches for rendered podcast feeds and auth tokens."""
+import gzip
+from collections import OrderedDict
+from datetime import datetime
+from hashlib import sha256
+from threading import Lock
+from time import monotonic
+from typing import Hashable, Iterable, Iterator, Optional
+from uuid import UUID
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+class RenderedFeed:
+    """One rendered version of a feed, plus its compressed variants.
+
+    Everything is worked out once, when the feed is stored, so serving it
+    again costs nothing but a lookup.
+    """
+
+    __slots__ = ("version", "last_modified", "body", "etag", "variants",
+                 "closed")
+
+    def __init__(self,
+                 version: Hashable,
+                 body: bytes,
+                 last_modified: Optional[datetime] = None,
+                 closed: bool = False,
+    ):
+        self.version = version
+        """What the feed was rendered from.
+
+        The podcast's `last_build_date`, or for a closed archive page, how
+        many episodes it has and when the newest of them changed.
+        """
+        self.last_modified = version if last_modified is None \
+            else last_modified
+        self.closed = closed
+        """Whether it's a closed archive page, untouched by new episodes."""
+        self.body = body
+        """The uncompressed feed."""
+        self.etag = (f"{int(self.last_modified.timestamp()):x}-"
+                     f"{sha256(body).hexdigest()[:32]}")
+        """Strong ETag of the uncompressed feed, unquoted.
+
+        Leads with the last-modified time in hex, so a client's ETag says
+        which version of the feed it has.
+        """
+        self.variants: dict[str, bytes] = {}
+        """Compressed copies of the body, by content-coding.
+
+        In order of preference, for when a client is happy with either.
+        """
+        if brotli is not None:
+            self.variants["br"] = brotli.compress(
+                body, mode=brotli.MODE_TEXT, quality=6)
+        self.variants["gzip"] = gzip.compress(body, mtime=0)
+
+    @property
+    def size(self) -> int:
+        """Bytes held by the feed and all its variants."""
+        return len(self.body) + sum(map(len, self.variants.values()))
+
+    def encoded(self, encoding: Optional[str]) -> tuple[bytes, str]:
+        """Get the body and its ETag in a content-coding, or uncompressed.
+
+        Each coding is its own representation, so gets its own ETag.
+        """
+        if encoding is None:
+            return self.body, self.etag
+        return self.variants[encoding], f"{self.etag}-{encoding}"
+
+
+class FeedCache:
+    """A bounded LRU cache of rendered feeds.
+
+    Entries are keyed on ``(podcast_uuid, page)`` and a version, usually
+    the podcast's `last_build_date`, so a feed that has been touched since
+    it was rendered simply stops matching. Only the newest version of each
+    page of each podcast is kept around. The feed itself is page None.
+
+    The cache is bounded both by number of entries and by the total size
+    of the stored feeds, evicting the least recently used feed first.
+    Feeds larger than ``max_bytes`` by themselves are never stored.
+    """
+
+    def __init__(self, max_entries: int = 64, max_bytes: int = 64 << 20):
+        self.max_entries = max_entries
+        """Maximum number of rendered feeds to keep."""
+        self.max_bytes = max_bytes
+        """Maximum total size in bytes of all rendered feeds kept."""
+
+        self._entries: OrderedDict[tuple[UUID, Optional[int]],
+                                   RenderedFeed] = OrderedDict()
+        self._size = 0
+        self._lock = Lock()
+
+    def get(self,
+            podcast_uuid: UUID,
+            version: Hashable,
+            page: Optional[int] = None,
+    ) -> Optional[RenderedFeed]:
+        """Return the cached feed for this version of a podcast, if any."""
+        with self._lock:
+            entry = self._entries.get((podcast_uuid, page))
+            if entry is None or entry.version != version:
+                return None
+            self._entries.move_to_end((podcast_uuid, page))
+            return entry
+
+    def put(self,
+            podcast_uuid: UUID,
+            version: Hashable,
+            body: bytes,
+            page: Optional[int] = None,
+            last_modified: Optional[datetime] = None,
+            closed: bool = False,
+    ) -> Optional[RenderedFeed]:
+        """Store a rendered feed, evicting old ones to make room.
+
+        Returns the stored feed, or None if it can't be stored.
+        """
+        if self.max_entries <= 0 or len(body) > self.max_bytes:
+            return None
+
+        entry = RenderedFeed(version, body, last_modified, closed)
+        with self._lock:
+            self._discard((podcast_uuid, page))
+            self._entries[podcast_uuid, page] = entry
+            self._size += entry.size
+
+            while (len(self._entries) > self.max_entries
+                   or self._size > self.max_bytes):
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= evicted.size
+        return entry
+
+    def tee(self,
+            podcast_uuid: UUID,
+            version: Hashable,
+            chunks: Iterable[str],
+            page: Optional[int] = None,
+            last_modified: Optional[datetime] = None,
+            closed: bool = False,
+    ) -> Iterator[bytes]:
+        """Pass a feed through as it renders, storing it once it's done.
+
+        Stops holding on to the pieces as soon as the feed is too big to be
+        stored anyway.
+        """
+        parts = []
+        size = 0
+        for chunk in chunks:
+            chunk = chunk.encode()
+            if parts is not None:
+                parts.append(chunk)
+                size += len(chunk)
+                if size > self.max_bytes:
+                    parts = None
+            yield chunk
+
+        if parts is not None:
+            self.put(podcast_uuid, version, b"".join(parts), page,
+                     last_modified, closed)
+
+    def invalidate(self, podcast_uuid: UUID) -> None:
+        """Drop the rendered pages of a podcast's feed that a change stales.
+
+        Closed archive pages are kept, as they go by their own version.
+        """
+        with self._lock:
+            for key in [key for key, entry in self._entries.items()
+                        if key[0] == podcast_uuid and not entry.closed]:
+                self._discard(key)
+
+    def clear(self) -> None:
+        """Drop every rendered feed."""
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def _discard(self, key: tuple[UUID, Optional[int]]) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._size -= entry.size
+
+
+class TokenCache:
+    """A bounded cache of podcasts' auth tokens, each kept for a while.
+
+    Rotating a token here invalidates it straight away. In other processes
+    the old token keeps working until it expires, so `ttl` bounds how long
+    a rotated token can go on being accepted.
+    """
+
+    def __init__(self, ttl: float = 300, max_entries: int = 1024):
+        self.ttl = ttl
+        """Seconds to trust a token for. 0 to not cache at all."""
+        self.max_entries = max_entries
+        """Maximum number of tokens to keep."""
+
+        self._entries: dict[UUID, tuple[float, str]] = {}
+        self._lock = Lock()
+
+    def get(self, podcast_uuid: UUID) -> Optional[str]:
+        """Return a podcast's token if it's cached and still fresh."""
+        with self._lock:
+            entry = self._entries.get(podcast_uuid)
+            if entry is None:
+                return None
+            if entry[0] <= monotonic():
+                del self._entries[podcast_uuid]
+                return None
+            return entry[1]
+
+    def put(self, podcast_uuid: UUID, token: str) -> None:
+        """Remember a podcast's token for `ttl` seconds."""
+        if self.ttl <= 0 or self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries.pop(podcast_uuid, None)
+            if len(self._entries) >= self.max_entries:
+                now = monotonic()
+                for key in [key for key, (expires, _) in self._entries.items()
+                            if expires <= now]:
+                    del self._entries[key]
+            while len(self._entries) >= self.max_entries:
+                # Oldest first, as dicts keep insertion order.
+                del self._entries[next(iter(self._entries))]
+            self._entries[podcast_uuid] = (monotonic() + self.ttl, token)
+
+    def invalidate(self, podcast_uuid: UUID) -> None:
+        """Forget a podcast's token, like when it's been rotated."""
+        with self._lock:
+            self._entries.pop(podcast_uuid, None)
@@ -0,0 +1,325 @@
+"""Gather what a podcast feed needs from the db, as plain render records."""
+from datetime import datetime, timezone
+from typing import Optional
+from uuid import UUID
+
+from flask import current_app, url_for
+from sqlalchemy import DateTime, Select, and_, func, or_, select, type_coerce
+from sqlalchemy.dialects import sqlite
+
+from .jxml import FeedItem, PodcastFeed
+from .models import ArchivePage, Category, Episode, Podcast
+from ... import db
+
+# Where an episode sits in a feed's order: its pub_date, then id.
+EpisodeKey = tuple[datetime, int]
+
+# Untyped, so page bounds keep the microseconds TZDateTime drops.
+_pub_date = type_coerce(Episode.pub_date, DateTime)
+
+# Only what FeedItem renders. No ORM identities get made for these.
+item_columns = (
+    Episode.title,
+    Episode.media_url,
+    Episode.media_size,
+    Episode.media_type,
+    Episode.pub_date,
+    Episode.uuid,
+    Episode.media_duration,
+    Episode.episode_type,
+    Episode.season,
+    Episode.episode,
+    Episode.subtitle,
+    Episode.description,
+    Episode.link,
+    Episode.image,
+    Episode.transcript,
+    Episode.transcript_type,
+)
+
+channel_columns = (
+    Podcast.title,
+    Podcast.description,
+    Podcast.link,
+    Podcast.image,
+    Podcast.is_serial,
+    Podcast.author,
+    Podcast.explicit,
+    Podcast.last_build_date,
+    Podcast.feed_url,
+    Podcast.copyright,
+    Podcast.language,
+    Podcast.itunes_block,
+    Podcast.new_feed_url,
+    Podcast.complete,
+)
+
+
+def load_feed(podcast_uuid: UUID,
+              page: Optional[int] = None,
+) -> Optional[PodcastFeed]:
+    """Build the render record for a podcast's feed, or None if missing.
+
+    Three narrow queries, one per table, rather than one join: joining
+    categories and episodes together would return every episode once per
+    category.
+
+    If the podcast has a `feed_window`, only that many of the latest
+    episodes make it into the feed. The rest go into RFC 5005 archive
+    pages, oldest first. Once `ARCHIVE_PAGE_SIZE` episodes have built up
+    past the last closed page, `close_archive_pages` closes them into a
+    page of their own, whose bounds are stored and never move again.
+    Deleting or backdating an episode changes the page it's on, and no
+    other. Passing `page` loads one of those instead, or None if there's
+    no such page. Nothing here writes to the db.
+    """
+    channel = _load_channel(podcast_uuid)
+    if channel is None:
+        return None
+    feed, window = channel
+    if window is None and page is not None:
+        return None  # Everything's in the feed, there are no archives.
+
+    episodes = (
+        select(*item_columns)
+        .where(Episode.podcast_uuid == podcast_uuid)
+    )
+    if window is None:
+        feed.episodes = _items(
+            episodes.order_by(Episode.pub_date, Episode.id))
+        return feed
+
+    ends = {} if page is None else _page_ends(podcast_uuid, page)
+    if page in ends:
+        feed.episodes = _items(
+            _between(episodes, ends.get(page - 1), ends[page])
+            .order_by(Episode.pub_date, Episode.id))
+        # It only changes with its episodes, so it's only as new as they are.
+        feed.last_build_date = max(
+            (item.pub_date for item in feed.episodes),
+            default=feed.last_build_date)
+        _link_archive(feed, podcast_uuid, page)
+        # The open page after the newest closed one can be empty.
+        if page + 1 in ends or _archive_state(podcast_uuid, window)[2]:
+            feed.links["next-archive"] = archive_url(podcast_uuid, page + 1)
+        return feed
+
+    closed, start, archived = _archive_state(podcast_uuid, window)
+    if page is None:
+        feed.episodes = _items(
+            episodes.order_by(Episode.pub_date.desc(), Episode.id.desc())
+            .limit(window))
+        feed.episodes.reverse()
+        if closed or archived:
+            feed.links["prev-archive"] = feed.links["next"] = archive_url(
+                podcast_uuid, closed + 1 if archived else closed)
+        return feed
+
+    # The open page, of what's been archived since the last one closed.
+    if page != closed + 1 or not (closed or archived):
+        return None
+    feed.episodes = _items(
+        _between(episodes, start, None)
+        .order_by(Episode.pub_date, Episode.id)
+        .limit(archived))
+    _link_archive(feed, podcast_uuid, page)
+    return feed
+
+
+def page_version(podcast_uuid: UUID,
+                 page: int,
+) -> Optional[tuple[int, Optional[datetime]]]:
+    """Get how many episodes a closed archive page has, and when they changed.
+
+    None if the page isn't closed, or is the newest closed page, or the
+    feed isn't windowed any more. The newest one links on to the open page
+    only while that has episodes, so it goes by the podcast's version,
+    like the open page. Episodes only leave a page by being deleted or
+    redated, which lowers the count, and any that are added or edited are
+    newer than the rest, so this changes whenever the page does.
+    """
+    ends = _page_ends(podcast_uuid, page)
+    if page + 1 not in ends:
+        return None
+    last_modified = type_coerce(Episode.last_modified, DateTime)
+    count, newest = db.session.execute(_between(
+        select(func.count(),
+               func.max(func.coalesce(last_modified, _pub_date)))
+        .where(Episode.podcast_uuid == podcast_uuid),
+        ends.get(page - 1), ends[page],
+    )).one()
+    if newest is not None:
+        newest = newest.replace(tzinfo=timezone.utc)
+    return count, newest
+
+
+def load_changes(podcast_uuid: UUID,
+                 since: datetime,
+) -> Optional[PodcastFeed]:
+    """Build a feed of only the episodes added or changed since a time.
+
+    For RFC 3229 feed deltas, so only episodes that would be in the feed
+    proper count. Episodes from before changes were tracked count as
+    changed when they were published.
+    """
+    channel = _load_channel(podcast_uuid)
+    if channel is None:
+        return None
+    feed, window = channel
+
+    episodes = (
+        select(*item_columns)
+        .where(Episode.podcast_uuid == podcast_uuid)
+        .where(func.coalesce(Episode.last_modified, Episode.pub_date)
+               >= since)
+        .order_by(Episode.pub_date, Episode.id)
+    )
+    if window is not None:
+        episodes = episodes.where(Episode.id.in_(
+            select(Episode.id)
+            .where(Episode.podcast_uuid == podcast_uuid)
+            .order_by(Episode.pub_date.desc(), Episode.id.desc())
+            .limit(window),
+        ))
+    feed.episodes = _items(episodes)
+    return feed
+
+
+def archive_url(podcast_uuid: UUID, page: int) -> str:
+    """Get the URL of an archive page of a podcast's feed."""
+    return url_for("snapcast.feed_archive",
+                   podcast_uuid=podcast_uuid, page=page, _external=True)
+
+
+def _link_archive(feed: PodcastFeed, podcast_uuid: UUID, page: int) -> None:
+    feed.archive = True
+    feed.feed_url = archive_url(podcast_uuid, page)
+    feed.links["current"] = url_for(
+        "snapcast.generate_feed", podcast_uuid=podcast_uuid, _external=True)
+    if page > 1:
+        feed.links["prev-archive"] = feed.links["next"] = \
+            archive_url(podcast_uuid, page - 1)
+
+
+def close_archive_pages(podcast_uuid: UUID) -> None:
+    """Close the archive pages that have filled up since the last change.
+
+    Goes in with the change that filled them, so call it before
+    committing. Doesn't commit.
+    """
+    window = db.session.scalar(
+        select(Podcast.feed_window)
+        .where(Podcast.uuid == podcast_uuid))
+    if window is None:
+        return
+    closed, start, archived = _archive_state(podcast_uuid, window)
+    page_size = current_app.config["SNAPCAST"]["ARCHIVE_PAGE_SIZE"]
+    if archived < page_size:
+        return
+
+    ends = db.session.execute(
+        _between(
+            select(_pub_date, Episode.id)
+            .where(Episode.podcast_uuid == podcast_uuid),
+            start, None,
+        )
+        .order_by(Episode.pub_date, Episode.id)
+        .limit(archived - archived % page_size),
+    ).all()[page_size - 1::page_size]
+    db.session.execute(
+        sqlite.insert(ArchivePage).on_conflict_do_nothing(),
+        [{"podcast_uuid": podcast_uuid, "page": closed + n,
+          "last_pub_date": pub_date, "last_id": last_id}
+         for n, (pub_date, last_id) in enumerate(ends, 1)],
+    )
+
+
+def _archive_state(
+        podcast_uuid: UUID,
+        window: int,
+) -> tuple[int, Optional[EpisodeKey], int]:
+    """Get how far a podcast's feed has been archived.
+
+    Returns how many pages are closed, the key the last one ends on, and
+    how many episodes have been archived since, which make up the open
+    page.
+    """
+    last = db.session.execute(
+        select(ArchivePage.page, ArchivePage.last_pub_date,
+               ArchivePage.last_id)
+        .where(ArchivePage.podcast_uuid == podcast_uuid)
+        .order_by(ArchivePage.page.desc())
+        .limit(1),
+    ).first()
+    closed, start = (0, None) if last is None else (last[0], last[1:])
+    archived = max(0, db.session.scalar(_between(
+        select(func.count())
+        .where(Episode.podcast_uuid == podcast_uuid),
+        start, None,
+    )) - window)
+    return closed, start, archived
+
+
+def _page_ends(podcast_uuid: UUID, page: int) -> dict[int, EpisodeKey]:
+    """Get the keys the pages either side of a page, and it, end on.
+
+    Only the ones that are closed, of a feed that's still windowed.
+    """
+    return {
+        row.page: (row.last_pub_date, row.last_id)
+        for row in db.session.execute(
+            select(ArchivePage.page, ArchivePage.last_pub_date,
+                   ArchivePage.last_id)
+            .join(Podcast, Podcast.uuid == ArchivePage.podcast_uuid)
+            .where(ArchivePage.podcast_uuid == podcast_uuid)
+            .where(ArchivePage.page.between(page - 1, page + 1))
+            .where(Podcast.feed_window.is_not(None)),
+        )
+    }
+
+
+def _between(query: Select,
+             start: Optional[EpisodeKey],
+             end: Optional[EpisodeKey],
+) -> Select:
+    """Limit a query to the episodes after `start`, up to and with `end`."""
+    if start is not None:
+        query = query.where(or_(
+            _pub_date > start[0],
+            and_(_pub_date == start[0], Episode.id > start[1]),
+        ))
+    if end is not None:
+        query = query.where(or_(
+            _pub_date < end[0],
+            and_(_pub_date == end[0], Episode.id <= end[1]),
+        ))
+    return query
+
+
+def _items(query: Select) -> list[FeedItem]:
+    return [FeedItem(**row)
+            for row in db.session.execute(query).mappings()]
+
+
+def _load_channel(
+        podcast_uuid: UUID,
+) -> Optional[tuple[PodcastFeed, Optional[int]]]:
+    """Get a feed record with no episodes yet, and the feed window."""
+    channel = db.session.execute(
+        select(Podcast.id, Podcast.feed_window, *channel_columns)
+        .where(Podcast.uuid == podcast_uuid),
+    ).mappings().first()
+    if channel is None:
+        return None
+
+    feed = PodcastFeed(**{col.key: channel[col.key]
+                          for col in channel_columns})
+    feed.categories = [
+        {"cat": cat, "sub": sub}
+        for cat, sub in db.session.execute(
+            select(Category.cat, Category.sub)
+            .where(Category.podcast_id == channel["id"])
+            .order_by(Category.id),
+        )
+    ]
+    return feed, channel["feed_window"]
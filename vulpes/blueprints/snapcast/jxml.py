@@ -1,6 +1,6 @@
 """A very small podcast RSS generator. Currently in beta."""
 from datetime import datetime, timedelta, timezone
-from typing import Optional
+from typing import Iterator, Optional
 from uuid import UUID
 from xml.etree import ElementTree as ETree
 
@@ -22,34 +22,105 @@ transcript_mime = {
 }
 
 
-class JXElement(ETree.Element):
-    """Base class for podcast types. Provides sub_element."""
+# ETree's own declaration names the locale's encoding when writing to str,
+# so both engines write this one. Feeds always go out as utf-8.
+xml_declaration = "<?xml version='1.0' encoding='utf-8'?>\n"
 
-    dt_fmt = "%a, %d %b %Y %H:%M:%S %z"
 
-    def sub_elem(self,
-                 name: str,
-                 text: Optional[str | int] = None,
-                 attrib: Optional[dict] = None,
-    ):
-        """Add a sub-element to the current element and return it.
+def _escape_text(text: str) -> str:
+    # Checking first is much quicker than replacing, for typical text.
+    if "&" in text:
+        text = text.replace("&", "&amp;")
+    if "<" in text:
+        text = text.replace("<", "&lt;")
+    if ">" in text:
+        text = text.replace(">", "&gt;")
+    return text
 
-        :param name: The tag name of the child.
-        :param attrib: A dict of attributes for the child.
-        :param text: The text for the child.
-        """
-        if attrib is None and text is None:
-            return None
-        if attrib is None:
-            attrib = {}
-        sub = ETree.SubElement(self, name, attrib=attrib)
-        if text is not None:
-            sub.text = str(text)
-        return sub
+
+def _escape_attr(value: str) -> str:
+    value = _escape_text(value)
+    if '"' in value:
+        value = value.replace('"', "&quot;")
+    if "\r" in value:
+        value = value.replace("\r", "&#13;")
+    if "\n" in value:
+        value = value.replace("\n", "&#10;")
+    if "\t" in value:
+        value = value.replace("\t", "&#09;")
+    return value
+
+
+_days = ("Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun")
+_months = ("Jan", "Feb", "Mar", "Apr", "May", "Jun",
+           "Jul", "Aug", "Sep", "Oct", "Nov", "Dec")
+
+
+def rfc822(dt: datetime) -> str:
+    """Format a datetime as `JXElement.dt_fmt` would, minus the strftime.
+
+    Falls back to strftime for anything unusual: naive datetimes, offsets
+    that aren't whole minutes and years before 1000.
+    """
+    offset = dt.utcoffset()
+    if offset is None or offset.total_seconds() % 60 or dt.year < 1000:
+        return dt.strftime(JXElement.dt_fmt)
+    minutes = int(offset.total_seconds()) // 60
+    sign = "-" if minutes < 0 else "+"
+    return (f"{_days[dt.weekday()]}, {dt.day:02} {_months[dt.month - 1]} "
+            f"{dt.year} {dt.hour:02}:{dt.minute:02}:{dt.second:02} "
+            f"{sign}{abs(minutes) // 60:02}{abs(minutes) % 60:02}")
+
+
+def _attrs(**attrib: str) -> str:
+    """Pre-render an attribute string for `_markup`."""
+    return "".join(f' {name}="{_escape_attr(value)}"'
+                   for name, value in attrib.items())
+
+
+def _markup(name: str, text: Optional[str | int] = None, attrib: str = ""):
+    """Write out a childless element exactly as ETree would serialize it."""
+    if text is None or (text := str(text)) == "":
+        return f"<{name}{attrib} />"
+    return f"<{name}{attrib}>{_escape_text(text)}</{name}>"
+
+
+def sub_elem(parent: ETree.Element,
+             name: str,
+             text: Optional[str | int] = None,
+             attrib: Optional[dict] = None,
+):
+    """Add a sub-element to an element and return it.
+
+    :param parent: The element to add the child to.
+    :param name: The tag name of the child.
+    :param attrib: A dict of attributes for the child.
+    :param text: The text for the child.
+    """
+    if attrib is None and text is None:
+        return None
+    if attrib is None:
+        attrib = {}
+    sub = ETree.SubElement(parent, name, attrib=attrib)
+    if text is not None:
+        sub.text = str(text)
+    return sub
+
+
+class JXElement:
+    """Base class for podcast types.
+
+    These are plain records of what goes into the feed. Building or
+    rendering one never changes it, so they can be kept and reused.
+    """
+
+    __slots__ = ()
+
+    dt_fmt = "%a, %d %b %Y %H:%M:%S %z"
 
 
 class FeedItem(JXElement):
-    """An ETree Element that represents an `item` tag in a podcast feed.
+    """Everything that goes into an `item` tag in a podcast feed.
 
     There are many available options, but some are more important than others.
     In approximate order of importance:
@@ -81,6 +152,13 @@ class FeedItem(JXElement):
       guidelines, to prevent the whole feed from being removed.
     """
 
+    __slots__ = (
+        "title", "media_url", "media_size", "media_type", "pub_date", "uuid",
+        "media_duration", "episode_type", "season", "episode", "subtitle",
+        "description", "link", "image", "transcript", "transcript_type",
+        "itunes_block",
+    )
+
     tag = "item"
 
     def __init__(self,
@@ -188,56 +266,98 @@ class FeedItem(JXElement):
         for kwarg in kwargs:
             setattr(self, kwarg, kwargs[kwarg])
 
-        super().__init__(self.tag, {})
-
-    def build(self):
+    def build(self) -> ETree.Element:
         """Construct and return a podcast-compatible <item> tag."""
+        item = ETree.Element(self.tag)
+
         # Required elements
-        self.sub_elem("title", self.title)
-        self.sub_elem("enclosure", attrib={
+        sub_elem(item, "title", self.title)
+        sub_elem(item, "enclosure", attrib={
             "url": self.media_url,
             "length": str(self.media_size),
             "type": self.media_type,
         })
-        self.sub_elem("pubDate", self.pub_date.strftime(self.dt_fmt))
+        sub_elem(item, "pubDate", self.pub_date.strftime(self.dt_fmt))
 
-        if self.uuid is None:
-            self.uuid = self.media_url
-        self.sub_elem("guid", str(self.uuid), {"isPermaLink": "false"})
+        uuid = self.media_url if self.uuid is None else self.uuid
+        sub_elem(item, "guid", str(uuid), {"isPermaLink": "false"})
 
         # Simple text fields
-        self.sub_elem("itunes:episodeType", self.episode_type)
-        self.sub_elem("itunes:season", self.season)
-        self.sub_elem("itunes:episode", self.episode)
-        self.sub_elem("link", self.link)
+        sub_elem(item, "itunes:episodeType", self.episode_type)
+        sub_elem(item, "itunes:season", self.season)
+        sub_elem(item, "itunes:episode", self.episode)
+        sub_elem(item, "link", self.link)
 
-        self.sub_elem("itunes:subtitle", self.subtitle)
+        sub_elem(item, "itunes:subtitle", self.subtitle)
         if self.description is not None:
-            self.sub_elem("description", self.description)
+            sub_elem(item, "description", self.description)
         else:
-            self.sub_elem("description", self.subtitle)
+            sub_elem(item, "description", self.subtitle)
 
         if self.image is not None:
-            self.sub_elem("itunes:image", attrib={"href": self.image})
+            sub_elem(item, "itunes:image", attrib={"href": self.image})
 
         # IME, apple podcats does not respect this tag at an episode level.
-        # self.sub_element("itunes:explicit",
+        # sub_elem(item, "itunes:explicit",
         #                  text="true" if self.explicit else "false")
 
         if (md := self.media_duration) is not None:
-            self.sub_elem("itunes:duration", int(md.total_seconds()))
+            sub_elem(item, "itunes:duration", int(md.total_seconds()))
 
         if self.transcript is not None and self.transcript_type is not None:
-            self.sub_elem("podcast:transcript", attrib={
+            sub_elem(item, "podcast:transcript", attrib={
                 "url": self.transcript,
                 "type": self.transcript_type,
             })
 
-        return self
+        return item
+
+    def render(self) -> str:
+        """Write out a podcast-compatible <item> tag, skipping ETree.
+
+        The result is identical to serializing what `build` returns.
+        """
+        uuid = self.media_url if self.uuid is None else self.uuid
+        description = (self.subtitle if self.description is None
+                       else self.description)
+        parts = [
+            "<item>",
+            "" if self.title is None else _markup("title", self.title),
+            _markup("enclosure", attrib=_attrs(
+                url=self.media_url,
+                length=str(self.media_size),
+                type=self.media_type,
+            )),
+            _markup("pubDate", rfc822(self.pub_date)),
+            _markup("guid", str(uuid), ' isPermaLink="false"'),
+        ]
+        for name, text in (("itunes:episodeType", self.episode_type),
+                           ("itunes:season", self.season),
+                           ("itunes:episode", self.episode),
+                           ("link", self.link),
+                           ("itunes:subtitle", self.subtitle),
+                           ("description", description)):
+            if text is not None:
+                parts.append(_markup(name, text))
+
+        if self.image is not None:
+            parts.append(_markup("itunes:image", attrib=_attrs(
+                href=self.image,
+            )))
+        if (md := self.media_duration) is not None:
+            parts.append(_markup("itunes:duration", int(md.total_seconds())))
+        if self.transcript is not None and self.transcript_type is not None:
+            parts.append(_markup("podcast:transcript", attrib=_attrs(
+                url=self.transcript,
+                type=self.transcript_type,
+            )))
+
+        parts.append("</item>")
+        return "".join(parts)
 
 
 class PodcastFeed(JXElement):
-    """An ETree Element that represents the `channel` tag in a podcast.
+    """Everything that goes into the `channel` tag in a podcast.
 
     There are many available options, but some are more important than
     others. In approximate order of importance:
@@ -287,14 +407,35 @@ class PodcastFeed(JXElement):
       again be updated, set ``complete`` to True. Specifying this indicates,
       at least to Apple Podcasts (maybe others. unknown.) that they should stop
       checking the feed for updates. Setting this is PROBABLY NOT WORTH IT.
+
+    Feeds too long to send in one go can be split up following RFC 5005:
+    set ``archive`` on the older pages, and point the pages at each other
+    with ``links``.
     """
 
+    __slots__ = (
+        "episodes", "title", "description", "link", "image", "is_serial",
+        "author", "explicit", "categories", "last_build_date", "feed_url",
+        "copyright", "language", "itunes_block", "new_feed_url", "complete",
+        "archive", "links",
+    )
+
     tag = "channel"
-    _categories = []
 
     generator: str = "JXML - The J stands for June!"
     """Identifier for the feed-generating library."""
 
+    rss_attrib = {
+        "version": "2.0",
+        "xmlns:itunes": "http://www.itunes.com/dtds/podcast-1.0.dtd",
+        "xmlns:atom": "http://www.w3.org/2005/Atom",
+        "xmlns:podcast": "https://podcastindex.org/namespace/1.0",
+    }
+    """Attributes of the root <rss> tag."""
+
+    history_namespace = "http://purl.org/syndication/history/1.0"
+    """RFC 5005's namespace, for the fh:archive tag."""
+
     def __init__(self,
                  title: str,
                  description: str,
@@ -353,75 +494,197 @@ class PodcastFeed(JXElement):
         self.complete: Optional[bool] = False
         """Flag marking the feed as complete. VERY CAREFUL."""
 
+        self.archive: bool = False
+        """Whether this is an archive page of the feed, not the feed itself.
+
+        Archive pages hold older episodes that have been left out of the
+        feed proper, and are expected not to change.
+        """
+        self.links: dict[str, str] = {}
+        """Further atom:links, by relation.
+
+        For RFC 5005, that's ``prev-archive``, ``next-archive`` and
+        ``current``. ``next`` also works for clients that page through
+        feeds instead.
+        """
+
         for kwarg in kwargs:
             setattr(self, kwarg, kwargs[kwarg])
 
-        super().__init__("channel", {})
+    def build(self, pretty=False, engine="etree") -> str:
+        """Construct a podcast RSS feed.
 
-    def build(self, pretty=False) -> str:
-        """Construct a podcast RSS feed."""
-        root = ETree.Element("rss", {
-            "version": "2.0",
-            "xmlns:itunes": "http://www.itunes.com/dtds/podcast-1.0.dtd",
-            "xmlns:atom": "http://www.w3.org/2005/Atom",
-            "xmlns:podcast": "https://podcastindex.org/namespace/1.0",
-        })
-        root.append(self)
+        :param pretty: Whether to indent the xml.
+        :param engine: ``"etree"`` to build the feed out of Elements, or
+            ``"markup"`` to write it out directly. Output is the same
+            either way, but pretty-printing always goes through ETree.
+        """
+        return "".join(self.stream(pretty=pretty, engine=engine))
+
+    def stream(self, pretty=False, engine="etree") -> Iterator[str]:
+        """Construct a podcast RSS feed a piece at a time.
+
+        Yields the document up to the end of the channel's own tags, then
+        each serialized <item> in turn, then the closing tags. Joined, the
+        pieces are identical to what `build` returns.
+        """
+        if engine not in ("etree", "markup"):
+            raise ValueError(f"Unknown feed engine {engine!r}.")
+        if engine == "markup" and not pretty:
+            return self._stream_markup()
+        return self._stream_etree(pretty)
+
+    def _root_attrib(self) -> dict:
+        if self.archive:
+            return {**self.rss_attrib, "xmlns:fh": self.history_namespace}
+        return self.rss_attrib
+
+    def _stream_etree(self, pretty: bool) -> Iterator[str]:
+        root = ETree.Element("rss", self._root_attrib())
+        channel = ETree.SubElement(root, self.tag)
 
         # Required fields.
-        self.sub_elem("title", self.title)
+        sub_elem(channel, "title", self.title)
         # Maybe this could stand to be duplicated to itunes:summary?
-        self.sub_elem("description", self.description)
+        sub_elem(channel, "description", self.description)
         if self.image:
-            self.sub_elem("itunes:image", attrib={"href": self.image})
+            sub_elem(channel, "itunes:image", attrib={"href": self.image})
 
         # Then the simple text-only elems:
-        self.sub_elem("itunes:author", self.author)
-        self.sub_elem("copyright", self.copyright)
-        self.sub_elem("link", self.link)
-        self.sub_elem("language", self.language)
-        self.sub_elem("itunes:new-feed-url", self.new_feed_url)
-        self.sub_elem("itunes:block", "Yes" if self.itunes_block else None)
-        self.sub_elem("itunes:complete", "Yes" if self.complete else None)
-        self.sub_elem("itunes:type",
-                      "serial" if self.is_serial else "episodic")
+        sub_elem(channel, "itunes:author", self.author)
+        sub_elem(channel, "copyright", self.copyright)
+        sub_elem(channel, "link", self.link)
+        sub_elem(channel, "language", self.language)
+        sub_elem(channel, "itunes:new-feed-url", self.new_feed_url)
+        sub_elem(channel, "itunes:block", "Yes" if self.itunes_block else None)
+        sub_elem(channel, "itunes:complete", "Yes" if self.complete else None)
+        sub_elem(channel, "itunes:type",
+                 "serial" if self.is_serial else "episodic")
         # Okay so the itunes podcast docs straight up lie. It says explicit
         # should be true or false, but it only accepts yes and no. How dare.
-        self.sub_elem("itunes:explicit", "yes" if self.explicit else "no")
+        sub_elem(channel, "itunes:explicit", "yes" if self.explicit else "no")
 
         # Category processing. Accept dicty object for convenience :)
-        for category in self.categories:
-            cat = sub = None
-
-            if hasattr(category, "cat") and hasattr(category, "sub"):
-                cat = category.cat
-                sub = category.sub
-            elif "cat" in category and "sub" in category:
-                cat = category["cat"]
-                sub = category["sub"]
-
-            cat_tag = self.sub_elem("itunes:category", attrib={"text": cat})
+        for cat, sub in self._category_pairs():
+            cat_tag = sub_elem(channel, "itunes:category",
+                               attrib={"text": cat})
             if cat_tag is not None and sub is not None:
                 ETree.SubElement(cat_tag, "itunes:category", {"text": sub})
 
         # Now relevant RSS elements brought forward:
         if (lbd := self.last_build_date) is None:
             lbd = datetime.now(timezone.utc)
-        self.sub_elem("lastBuildDate", lbd.strftime(self.dt_fmt))
-        self.sub_elem("generator", self.generator)
+        sub_elem(channel, "lastBuildDate", lbd.strftime(self.dt_fmt))
+        sub_elem(channel, "generator", self.generator)
 
         # Atom self-link
         if self.feed_url is not None:
-            self.sub_elem("atom:link", attrib={
+            sub_elem(channel, "atom:link", attrib={
                 "href": self.feed_url,
                 "rel": "self",
                 "type": "application/rss+xml",
             })
+        for rel, href in self.links.items():
+            sub_elem(channel, "atom:link", attrib={"href": href, "rel": rel})
+        if self.archive:
+            sub_elem(channel, "fh:archive", attrib={})
+
+        # Everything but the episodes goes out in one piece. Markup in text
+        # is escaped, so the only literal </channel> is the real one.
+        if pretty:
+            ETree.indent(root)
+        head = xml_declaration + ETree.tostring(root, encoding="unicode")
+        head, tail = head.rsplit("</channel>", 1)
+        if pretty:
+            # Drop the indent before </channel>, items bring their own.
+            head = head.removesuffix("\n  ")
+            tail = "\n  </channel>" + tail
+        else:
+            tail = "</channel>" + tail
+        yield head
 
         # Episode time!
         for episode in self.episodes:
-            self.append(episode.build())
+            item = episode.build()
+            if pretty:
+                ETree.indent(item, level=2)
+                yield "\n    "
+            yield ETree.tostring(item, encoding="unicode")
+
+        yield tail
+
+    def _stream_markup(self) -> Iterator[str]:
+        # Mirrors _stream_etree tag for tag.
+        head = [
+            xml_declaration,
+            "<rss",
+            _attrs(**self._root_attrib()),
+            "><channel>",
+        ]
+        for name, text in (("title", self.title),
+                           ("description", self.description)):
+            if text is not None:
+                head.append(_markup(name, text))
+        if self.image:
+            head.append(_markup("itunes:image", attrib=_attrs(
+                href=self.image,
+            )))
+        for name, text in (
+                ("itunes:author", self.author),
+                ("copyright", self.copyright),
+                ("link", self.link),
+                ("language", self.language),
+                ("itunes:new-feed-url", self.new_feed_url),
+                ("itunes:block", "Yes" if self.itunes_block else None),
+                ("itunes:complete", "Yes" if self.complete else None),
+                ("itunes:type", "serial" if self.is_serial else "episodic"),
+                ("itunes:explicit", "yes" if self.explicit else "no")):
+            if text is not None:
+                head.append(_markup(name, text))
+
+        for cat, sub in self._category_pairs():
+            cat_attrib = _attrs(text=cat)
+            if sub is None:
+                head.append(_markup("itunes:category", attrib=cat_attrib))
+            else:
+                head.append(f"<itunes:category{cat_attrib}>"
+                            + _markup("itunes:category", attrib=_attrs(
+                                text=sub))
+                            + "</itunes:category>")
 
-        if pretty:
-            ETree.indent(root)
-        return ETree.tostring(root, encoding="unicode", xml_declaration=True)
+        if (lbd := self.last_build_date) is None:
+            lbd = datetime.now(timezone.utc)
+        head.append(_markup("lastBuildDate", rfc822(lbd)))
+        head.append(_markup("generator", self.generator))
+        if self.feed_url is not None:
+            head.append(_markup("atom:link", attrib=_attrs(
+                href=self.feed_url,
+                rel="self",
+                type="application/rss+xml",
+            )))
+        for rel, href in self.links.items():
+            head.append(_markup("atom:link", attrib=_attrs(
+                href=href,
+                rel=rel,
+            )))
+        if self.archive:
+            head.append(_markup("fh:archive"))
+        yield "".join(head)
+
+        for episode in self.episodes:
+            yield episode.render()
+
+        yield "</channel></rss>"
+
+    def _category_pairs(self) -> Iterator[tuple[str, Optional[str]]]:
+        for category in self.categories:
+            cat = sub = None
+
+            if hasattr(category, "cat") and hasattr(category, "sub"):
+                cat = category.cat
+                sub = category.sub
+            elif "cat" in category and "sub" in category:
+                cat = category["cat"]
+                sub = category["sub"]
+
+            yield cat, sub
@@ -1,49 +1,95 @@
 from datetime import datetime, timedelta, timezone
 from functools import partial
-from typing import List, Literal, Optional
+from typing import Callable, ClassVar, Iterator, List, Literal, Optional
 from uuid import UUID, uuid4
 
-from sqlalchemy import ForeignKey
-from sqlalchemy.orm import Mapped, mapped_column, relationship
-
-from vulpes.blueprints.snapcast.jxml import FeedItem, PodcastFeed
+from sqlalchemy import DateTime, ForeignKey, Index, Result, event
+from sqlalchemy.orm import Mapped, Mapper, mapped_column, relationship
 
 from ...nitre import TZDateTime, db
 
 
+def _seconds(val: timedelta) -> int:
+    return int(val.total_seconds())
+
+
+def _isoformat(val: datetime) -> str:
+    return val.replace(tzinfo=timezone.utc).isoformat()
+
+
+# Add to the converters here for any more non-serializable data types.
+_converters = {
+    timedelta: _seconds,
+    datetime: _isoformat,
+    UUID: str,
+}
+
+
 class DatetimeFormattingModel:
     """Parent class that allows a Model to turn into a jsonify-able dictionary.
 
-    Add to the converter here for any more non-serializable data types.
+    Which columns need converting, and how, is worked out once per table
+    when its mapper is configured.
     """
 
     __table__ = None
+    _column_names: ClassVar[tuple[str, ...]] = ()
+    _column_converters: ClassVar[dict[str, Callable]] = {}
 
     def as_dict(self):
         """Create a `dict` representation off the model.
 
-        Replaces `datetime` and `timedelta` types with string
-        representations, safe to send.
+        Replaces `datetime`, `timedelta` and `UUID` types with string or
+        int representations, safe to send.
         """
-        d = {}
-        for col in self.__table__.columns:
-            val = getattr(self, col.name)
-            if isinstance(val, timedelta):
-                d[col.name] = int(val.total_seconds())
-            elif isinstance(val, datetime):
-                d[col.name] = val.replace(tzinfo=timezone.utc).isoformat()
-            else:
-                d[col.name] = val
+        d = {name: getattr(self, name) for name in self._column_names}
+        for name, convert in self._column_converters.items():
+            val = d[name]
+            if val is not None:
+                d[name] = convert(val)
         return d
 
+    @classmethod
+    def serialize(cls, result: Result) -> Iterator[dict]:
+        """Turn Core result rows from this table into dicts like `as_dict`.
 
-class Podcast(PodcastFeed, db.Model, DatetimeFormattingModel):
+        Rows can hold any selection of the table's columns, by name.
+        """
+        keys = tuple(result.keys())
+        converters = [(key, cls._column_converters[key]) for key in keys
+                      if key in cls._column_converters]
+        for row in result:
+            d = dict(zip(keys, row, strict=True))
+            for name, convert in converters:
+                val = d[name]
+                if val is not None:
+                    d[name] = convert(val)
+            yield d
+
+
+@event.listens_for(DatetimeFormattingModel, "mapper_configured",
+                   propagate=True)
+def _plan_conversion(mapper: Mapper, cls: type) -> None:
+    cls._column_names = tuple(col.name for col in cls.__table__.columns)
+    cls._column_converters = {}
+    for col in cls.__table__.columns:
+        try:
+            python_type = col.type.python_type
+        except NotImplementedError:
+            continue
+        for base, convert in _converters.items():
+            if issubclass(python_type, base):
+                cls._column_converters[col.name] = convert
+                break
+
+
+class Podcast(db.Model, DatetimeFormattingModel):
     """ORM Mapping for the database's `podcast` table."""
 
     __tablename__ = "podcast"
 
     id: Mapped[int] = mapped_column(primary_key=True)
-    uuid: Mapped[UUID] = mapped_column(default=uuid4)
+    uuid: Mapped[UUID] = mapped_column(default=uuid4, unique=True, index=True)
     title: Mapped[str]
     link: Mapped[str]
     description: Mapped[str]
@@ -61,17 +107,22 @@ class Podcast(PodcastFeed, db.Model, DatetimeFormattingModel):
     last_build_date: Mapped[datetime] = (
         mapped_column(TZDateTime, default=partial(datetime.now, timezone.utc)))
     is_serial: Mapped[bool] = mapped_column(default=False)
+    feed_window: Mapped[Optional[int]]
     episodes: Mapped[List["Episode"]] = relationship(
         back_populates="podcast", order_by="Episode.pub_date")
 
 
-class Episode(FeedItem, db.Model, DatetimeFormattingModel):
+class Episode(db.Model, DatetimeFormattingModel):
     """ORM Mapping for the database's `episode` table."""
 
     __tablename__ = "episode"
+    __table_args__ = (
+        # Feeds and episode lists, in order. Also covers podcast_uuid alone.
+        Index("ix_episode_podcast_uuid_pub_date", "podcast_uuid", "pub_date"),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True)
-    uuid: Mapped[UUID] = mapped_column(default=uuid4)
+    uuid: Mapped[UUID] = mapped_column(default=uuid4, unique=True, index=True)
     podcast_uuid = mapped_column(ForeignKey(Podcast.uuid))
     podcast: Mapped["Podcast"] = relationship(back_populates="episodes")
     title: Mapped[str]
@@ -90,6 +141,50 @@ class Episode(FeedItem, db.Model, DatetimeFormattingModel):
     episode: Mapped[Optional[int]]
     transcript: Mapped[Optional[str]]
     transcript_type: Mapped[Optional[str]]
+    last_modified: Mapped[Optional[datetime]] = mapped_column(
+        TZDateTime,
+        default=partial(datetime.now, timezone.utc),
+        onupdate=partial(datetime.now, timezone.utc),
+    )
+
+
+class EpisodeChange(db.Model, DatetimeFormattingModel):
+    """ORM Mapping for the database's `episode_change` table.
+
+    One row per episode added, changed or deleted, for mirrors to sync
+    from. `seq` only ever goes up, even across deletes.
+    """
+
+    __tablename__ = "episode_change"
+    __table_args__ = (
+        Index("ix_episode_change_podcast_uuid_seq", "podcast_uuid", "seq"),
+        {"sqlite_autoincrement": True},
+    )
+
+    seq: Mapped[int] = mapped_column(primary_key=True)
+    podcast_uuid: Mapped[UUID]
+    episode_uuid: Mapped[UUID]
+    op: Mapped[Literal["insert", "update", "delete"]]
+    changed_at: Mapped[datetime] = mapped_column(
+        TZDateTime, default=partial(datetime.now, timezone.utc))
+
+
+class ArchivePage(db.Model):
+    """ORM Mapping for the database's `archive_page` table.
+
+    Where each closed archive page of a windowed feed ends, as the
+    ``(pub_date, id)`` of its last episode. Page 1 starts at the oldest
+    episode and each page after starts where the one before ended, so
+    pages keep their episodes however the rest of the feed changes.
+    """
+
+    __tablename__ = "archive_page"
+
+    podcast_uuid: Mapped[UUID] = mapped_column(primary_key=True)
+    page: Mapped[int] = mapped_column(primary_key=True, autoincrement=False)
+    # Untyped, to keep the microseconds TZDateTime drops.
+    last_pub_date: Mapped[datetime] = mapped_column(DateTime)
+    last_id: Mapped[int]
 
 
 class Category(DatetimeFormattingModel, db.Model):
@@ -98,7 +193,8 @@ class Category(DatetimeFormattingModel, db.Model):
     __tablename__ = "category"
 
     id: Mapped[int] = mapped_column(primary_key=True)
-    podcast_id: Mapped[int] = mapped_column(ForeignKey("podcast.id"))
+    podcast_id: Mapped[int] = mapped_column(ForeignKey("podcast.id"),
+                                            index=True)
     cat: Mapped[str]
     sub: Mapped[Optional[str]]
 
@@ -0,0 +1,95 @@
+"""Render big feeds in worker processes, clear of the web workers' GIL."""
+import multiprocessing
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from threading import Lock
+from typing import Hashable, Optional
+from uuid import UUID
+
+from .cache import RenderedFeed
+from .jxml import PodcastFeed
+
+RenderKey = tuple[UUID, Hashable, Optional[int]]
+
+
+def _render(feed: PodcastFeed, pretty: bool, engine: str) -> bytes:
+    # Runs in a worker process.
+    return feed.build(pretty=pretty, engine=engine).encode()
+
+
+class FeedRenderer:
+    """A process pool for feeds too big to render in a request thread.
+
+    Feeds go over to the workers as plain render records, never ORM rows,
+    and come back as finished bytes. Requests for the same version of the
+    same feed page share one load and render, however many arrive while
+    it's running: the first to `join` leads it, and the rest wait for the
+    `RenderedFeed` it hands over.
+    """
+
+    def __init__(self, workers: int):
+        self.workers = workers
+        """Number of worker processes, started on first use."""
+
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._in_flight: dict[RenderKey, Future] = {}
+        self._lock = Lock()
+
+    def join(self, key: RenderKey) -> Optional[Future]:
+        """Wait on a render of a feed page that's running, or lead it.
+
+        `key` is ``(podcast_uuid, version, page)``, as the feed cache has
+        it. Returns the leader's future, for the `RenderedFeed` it ends up
+        with, or None to the caller that's now leading. The leader has to
+        `finish` the key however its render goes.
+        """
+        with self._lock:
+            future = self._in_flight.get(key)
+            if future is None:
+                self._in_flight[key] = Future()
+            return future
+
+    def finish(self, key: RenderKey,
+               rendered: Optional[RenderedFeed]) -> None:
+        """Hand a finished feed to the requests waiting on it.
+
+        None if there's nothing to share, like when the feed wasn't found,
+        was small enough to stream, or too big to cache, and the waiters
+        have to do their own.
+        """
+        with self._lock:
+            future = self._in_flight.pop(key)
+        future.set_result(rendered)
+
+    def render(self,
+               feed: PodcastFeed,
+               pretty: bool = False,
+               engine: str = "etree",
+    ) -> bytes:
+        """Render a feed in the pool.
+
+        Falls back to rendering here if the pool has broken.
+        """
+        try:
+            with self._lock:
+                future = self._get_pool().submit(
+                    _render, feed, pretty, engine)
+            return future.result()
+        except BrokenProcessPool:
+            with self._lock:
+                self._pool = None
+            return _render(feed, pretty, engine)
+
+    def shutdown(self) -> None:
+        """Stop the worker processes. They start again if needed."""
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(cancel_futures=True)
+                self._pool = None
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            # Forking a threaded server is asking for deadlocks.
+            self._pool = ProcessPoolExecutor(
+                self.workers, multiprocessing.get_context("spawn"))
+        return self._pool
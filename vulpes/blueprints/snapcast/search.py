@@ -0,0 +1,114 @@
+"""Full-text search over episodes, with SQLite's FTS5."""
+from typing import Optional
+from uuid import UUID
+
+from sqlalchemy import (
+    DDL,
+    Select,
+    and_,
+    column,
+    event,
+    func,
+    literal_column,
+    or_,
+    select,
+    table,
+)
+
+from .models import Episode
+
+# An external content table: the text stays in `episode`, and the index
+# is kept up to date by triggers. Transcripts are only linked to, so
+# there's no transcript text to index. The migration that adds search has
+# its own copy of these, so changing them needs a new migration that drops
+# and recreates the lot.
+episode_fts_ddl = (
+    """CREATE VIRTUAL TABLE episode_fts USING fts5(
+        title, subtitle, description,
+        content='episode', content_rowid='id'
+    )""",
+    """CREATE TRIGGER episode_fts_insert AFTER INSERT ON episode BEGIN
+        INSERT INTO episode_fts (rowid, title, subtitle, description)
+        VALUES (new.id, new.title, new.subtitle, new.description);
+    END""",
+    """CREATE TRIGGER episode_fts_delete AFTER DELETE ON episode BEGIN
+        INSERT INTO episode_fts
+            (episode_fts, rowid, title, subtitle, description)
+        VALUES ('delete', old.id, old.title, old.subtitle, old.description);
+    END""",
+    """CREATE TRIGGER episode_fts_update
+    AFTER UPDATE OF title, subtitle, description ON episode BEGIN
+        INSERT INTO episode_fts
+            (episode_fts, rowid, title, subtitle, description)
+        VALUES ('delete', old.id, old.title, old.subtitle, old.description);
+        INSERT INTO episode_fts (rowid, title, subtitle, description)
+        VALUES (new.id, new.title, new.subtitle, new.description);
+    END""",
+)
+
+# Migrations create these for real databases. This is for create_all.
+for statement in episode_fts_ddl:
+    event.listen(Episode.__table__, "after_create",
+                 DDL(statement).execute_if(dialect="sqlite"))
+
+episode_fts = table("episode_fts", column("rowid"))
+
+# A match in the title counts for more than one in the show notes.
+weights = (10.0, 5.0, 1.0)
+
+
+def fts_query(terms: str) -> Optional[str]:
+    """Turn what someone typed into an FTS5 query, or None if it's empty.
+
+    Every word is quoted, so nothing typed can be taken for query syntax,
+    and all of them have to match. A word ending in ``*`` matches as a
+    prefix.
+    """
+    words = []
+    for word in terms.split():
+        prefix = word.endswith("*")
+        word = word.rstrip("*")
+        if word:
+            words.append('"' + word.replace('"', '""') + '"'
+                         + ("*" if prefix else ""))
+    return " ".join(words) or None
+
+
+def search_episodes(podcast_uuid: UUID,
+                    query: str,
+                    after: Optional[tuple[float, int]] = None,
+) -> Select:
+    """Select a podcast's episodes matching an FTS5 query, best first.
+
+    Rows are the episode's columns plus its ``rank``, lower being better.
+    Only the podcast's own episodes are looked up in the index, so other
+    podcasts' matches are never ranked, though bm25's word frequencies
+    still come from every podcast.
+
+    `after` is the ``(rank, id)`` of the last row already seen, with the id
+    breaking ties. It's a best-effort cursor: ranks move as episodes are
+    added and edited, so paging through while that happens can skip or
+    repeat an episode.
+    """
+    hits = (
+        select(
+            episode_fts.c.rowid.label("id"),
+            func.bm25(literal_column("episode_fts"), *weights).label("rank"),
+        )
+        .where(literal_column("episode_fts").op("MATCH")(query))
+        .where(episode_fts.c.rowid.in_(
+            select(Episode.id).where(Episode.podcast_uuid == podcast_uuid)))
+        .subquery()
+    )
+    statement = (
+        select(*Episode.__table__.columns, hits.c.rank)
+        .join_from(hits, Episode, Episode.id == hits.c.id)
+        .order_by(hits.c.rank, hits.c.id)
+    )
+    if after is not None:
+        rank, episode_id = after
+        statement = statement.where(or_(
+            hits.c.rank > rank,
+            and_(hits.c.rank == rank, hits.c.id > episode_id),
+        ))
+    return statement
@@ -1,26 +1,43 @@
 from datetime import datetime, timezone
 from functools import wraps
+from hmac import compare_digest
+from typing import Iterable, Optional
+from uuid import UUID
 
-from flask import abort, request
-from sqlalchemy import select, update
+from flask import abort, current_app, request
+from sqlalchemy import insert, select, update
 
-from .models import Podcast
+from .cache import FeedCache, TokenCache
+from .feed import close_archive_pages
+from .models import EpisodeChange, Podcast
+from .render import FeedRenderer
 from ... import db
 
 
 def authorization_required(func):
-    """Check Bearer token of incoming requests, based on the podcast."""
+    """Check Bearer token of incoming requests, based on the podcast.
+
+    Tokens are cached for `AUTH_TOKEN_TTL` seconds, so most requests don't
+    touch the db for this at all.
+    """
     @wraps(func)
     def inner(*args, **kwargs):
-        if not request.authorization:
+        if not request.authorization or not request.authorization.token:
             return abort(401)  # No authentication supplied.
 
-        result = db.first_or_404(  # Invalid podcast ID.
-            select(Podcast.auth_token)
-            .where(Podcast.uuid == kwargs["podcast_uuid"]),
-        )
+        podcast_uuid = kwargs["podcast_uuid"]
+        tokens = get_token_cache()
+        token = tokens.get(podcast_uuid)
+        if token is None:
+            token = str(db.first_or_404(  # Invalid podcast ID.
+                select(Podcast.auth_token)
+                .where(Podcast.uuid == podcast_uuid),
+            ))
+            tokens.put(podcast_uuid, token)
 
-        if request.authorization.token == str(result):
+        # Constant time, so the token can't be guessed one byte at a time.
+        if compare_digest(request.authorization.token.encode(),
+                          token.encode()):
             return func(*args, **kwargs)
         return abort(401)  # Authentication not correct.
 
@@ -30,10 +47,60 @@ def authorization_required(func):
 def touch_podcast(podcast_uuid):
     """Update the last_modified field for a podcast.
 
-    Called on cache-invalidating requests.
+    Called on cache-invalidating requests, before committing. Also closes
+    the archive pages the change has filled.
     """
     db.session.execute(
         update(Podcast)
         .where(Podcast.uuid == podcast_uuid)
         .values({Podcast.last_build_date: datetime.now(timezone.utc)}),
     )
+    close_archive_pages(podcast_uuid)
+    get_feed_cache().invalidate(podcast_uuid)
+
+
+def log_changes(podcast_uuid: UUID,
+                op: str,
+                episode_uuids: Iterable[UUID],
+) -> None:
+    """Add episode changes to the podcast's change log.
+
+    Goes in with the change itself, so call it before committing.
+    """
+    now = datetime.now(timezone.utc)
+    rows = [{"podcast_uuid": podcast_uuid, "episode_uuid": episode_uuid,
+             "op": op, "changed_at": now}
+            for episode_uuid in episode_uuids]
+    if rows:
+        db.session.execute(insert(EpisodeChange), rows)
+
+
+def get_feed_cache() -> FeedCache:
+    """Get the app's rendered-feed cache."""
+    if "feed_cache" not in current_app.extensions:
+        config = current_app.config["SNAPCAST"]
+        current_app.extensions.setdefault("feed_cache", FeedCache(
+            max_entries=config["FEED_CACHE_ENTRIES"],
+            max_bytes=config["FEED_CACHE_BYTES"],
+        ))
+    return current_app.extensions["feed_cache"]
+
+
+def get_token_cache() -> TokenCache:
+    """Get the app's auth token cache."""
+    if "token_cache" not in current_app.extensions:
+        current_app.extensions.setdefault("token_cache", TokenCache(
+            ttl=current_app.config["SNAPCAST"]["AUTH_TOKEN_TTL"],
+        ))
+    return current_app.extensions["token_cache"]
+
+
+def get_feed_renderer() -> Optional[FeedRenderer]:
+    """Get the app's render pool, or None if feeds render in-thread."""
+    workers = current_app.config["SNAPCAST"]["RENDER_WORKERS"]
+    if not workers:
+        return None
+    if "feed_renderer" not in current_app.extensions:
+        current_app.extensions.setdefault(
+            "feed_renderer", FeedRenderer(workers))
+    return current_app.extensions["feed_renderer"]
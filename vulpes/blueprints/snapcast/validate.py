@@ -1,5 +1,8 @@
 from datetime import datetime, timedelta, timezone
-from typing import Any, Callable, Sequence
+from os.path import splitext
+from typing import Any, Callable, Iterable, Sequence
+from urllib.parse import urlparse
+from uuid import UUID, uuid4
 
 from .jxml import media_mime, transcript_mime
 
@@ -80,25 +83,145 @@ class Pull:
         return value
 
 
+class ValidationError(Exception):
+    """Everything wrong with one record, found in one pass."""
+
+    def __init__(self, errors: list[Exception]):
+        super().__init__("; ".join(map(str, errors)))
+        self.errors = errors
+        """ValueErrors for missing values, TypeErrors for bad ones."""
+
+    @property
+    def status(self) -> int:
+        """HTTP status to answer with: 400 if anything's missing, else 422."""
+        if any(isinstance(e, ValueError) for e in self.errors):
+            return 400
+        return 422
+
+
+def compile_pulls(pulls: Sequence[Pull]) -> Callable[[dict], dict]:
+    """Turn a spec of `Pull`s into one function that runs them all.
+
+    The function gives the same dict as running each `Pull` in turn, but
+    the loops over rules and `alongside` keys are unrolled into straight
+    line code, once. Rather than stopping at the first failure, it raises
+    a `ValidationError` with every failure in the record.
+
+    It's generated as source rather than put together from one closure
+    per `Pull`, as calling a step per field costs about what unrolling
+    saves, leaving closures no faster than `Pull.run`. ``bench.validate``
+    runs all three. Keys only go into the source through `repr`, and
+    rules, defaults and messages through the namespace, so nothing in a
+    spec is ever run as code.
+    """
+    namespace = {"ValidationError": ValidationError}
+    lines = [
+        "def validate(source):",
+        "    data = {}",
+        "    errors = []",
+    ]
+    for n, pull in enumerate(pulls):
+        key = repr(pull.from_)
+        to = repr(pull.to)
+        lines.append(f"    value = source.get({key})")
+        lines.append("    if value is None:")
+        if pull.default is not None:
+            namespace[f"default_{n}"] = pull.default
+            lines.append(f"        data[{to}] = default_{n}")
+        elif pull.required:
+            namespace[f"missing_{n}"] = f"{pull.from_} missing."
+            lines.append(f"        errors.append(ValueError(missing_{n}))")
+        else:
+            lines.append(f"        data[{to}] = None")
+
+        if pull.alongside:
+            namespace[f"alone_{n}"] = (
+                f"{pull.from_} can only be specified together with "
+                f"{_en_join_list(pull.alongside, 'and')}.")
+            absent = " or ".join(f"{other!r} not in source"
+                                 for other in pull.alongside)
+            lines.append(f"    elif {absent}:")
+            lines.append(f"        errors.append(ValueError(alone_{n}))")
+
+        lines.append("    else:")
+        lines.append("        try:")
+        for r, rule in enumerate(pull.rules):
+            namespace[f"rule_{n}_{r}"] = rule
+            lines.append(
+                f"            value = rule_{n}_{r}(value, field={key})")
+        lines.append(f"            data[{to}] = value")
+        lines.append("        except TypeError as e:")
+        lines.append("            errors.append(e)")
+    lines.append("    if errors:")
+    lines.append("        raise ValidationError(errors)")
+    lines.append("    return data")
+
+    # Named, so tracebacks through it say where it came from.
+    exec(compile("\n".join(lines), "<compile_pulls>", "exec"), namespace)
+    return namespace["validate"]
+
+
+def validate_many(validate: Callable[[Any], dict],
+                  sources: Iterable[Any],
+) -> tuple[list[dict], list[dict]]:
+    """Run a validator over a batch of records.
+
+    Returns the validated records, and every error as a dict with the
+    record's ``index`` in the batch and the ``error`` message. Sources
+    that aren't dicts are errors too, and any that are exceptions, like
+    from a failed parse, are reported as they are.
+    """
+    rows = []
+    errors = []
+    for index, source in enumerate(sources):
+        if isinstance(source, Exception):
+            errors.append({"index": index, "error": str(source)})
+        elif not isinstance(source, dict):
+            errors.append({"index": index,
+                           "error": "Record must be a JSON object."})
+        else:
+            try:
+                rows.append(validate(source))
+            except ValidationError as e:
+                errors.extend({"index": index, "error": str(error)}
+                              for error in e.errors)
+    return rows, errors
+
+
+def _string(value: Any, field: str) -> None:
+    if not isinstance(value, str):
+        raise TypeError(f"{field} must be a string")
+
+
+def _number(value: Any, field: str) -> None:
+    # bool is an int, but true isn't a size.
+    if not isinstance(value, (int, float)) or isinstance(value, bool):
+        raise TypeError(f"{field} must be a number")
+
+
 def url(value: str, field: str):  # noqa: D103
+    _string(value, field)
     if value.startswith(("http://", "https://")):
         return value
     raise TypeError(f"{field} must start with http:// or https://")
 
 
 def image(value: str, field: str):  # noqa: D103
+    _string(value, field)
     if value.endswith((".jpg", ".jpeg", ".png")):
         return value
     raise TypeError(f"{field} must end with .jpg or .png")
 
 
 def positive(value: int, field: str):  # noqa: D103
+    _number(value, field)
     if value > 0:
         return value
     raise TypeError(f"{field} must be positive")
 
 
 def non_negative(value: int, field: str):  # noqa: D103
+    _number(value, field)
     if value >= 0:
         return value
     raise TypeError(f"{field} must not be negative")
@@ -111,23 +234,88 @@ def episode_types(value: str, field: str):  # noqa: D103
     raise TypeError(f"{field} must be one of {_en_join_list(options)}")
 
 
-# noinspection PyUnusedLocal
 def as_timedelta(value: int, field: str):  # noqa: D103
-    return timedelta(seconds=value)
+    _number(value, field)
+    try:
+        return timedelta(seconds=value)
+    except (OverflowError, ValueError):
+        raise TypeError(f"{field} is out of range") from None
 
 
-# noinspection PyUnusedLocal
 def as_datetime(value: int, field: str):  # noqa: D103
-    return datetime.fromtimestamp(value, timezone.utc)
+    _number(value, field)
+    try:
+        return datetime.fromtimestamp(value, timezone.utc)
+    except (OverflowError, ValueError, OSError):
+        raise TypeError(f"{field} is out of range") from None
 
 
 def _extension_rule(extensions: tuple[str]) -> Callable[[str, str], str]:
+    # By the path's extension, as that's what the type is taken from.
     def rule(value: str, field: str):
-        if value.endswith(extensions):
+        _string(value, field)
+        try:
+            extension = splitext(urlparse(value).path)[1]
+        except ValueError:
+            raise TypeError(f"{field} must be a URL") from None
+        if extension in extensions:
             return value
         raise TypeError(f"{field} must be one of {_en_join_list(extensions)}")
     return rule
 
 
+def text(value: str, field: str):  # noqa: D103
+    _string(value, field)
+    return value
+
+
 media_exts = _extension_rule(tuple(media_mime.keys()))
 transcript_exts = _extension_rule(tuple(transcript_mime.keys()))
+
+
+# The structure of this should mimic that of the input dict.
+episode_extractors = (
+    Pull("title", text, required=True),
+    Pull("subtitle", text),
+    Pull("description", text),
+    Pull("timestamp", as_datetime, to="pub_date"),
+
+    Pull("url", url, media_exts, to="media_url", required=True),
+    Pull("size", non_negative, to="media_size", required=True),
+    Pull("duration", non_negative, as_timedelta, to="media_duration"),
+
+    Pull("link", url),
+    Pull("image", url, image),
+
+    Pull("episode_type", episode_types),
+    Pull("episode", positive),
+    Pull("season", positive),
+
+    Pull("transcript", url, transcript_exts),
+)
+
+
+validate_episode = compile_pulls(episode_extractors)
+
+
+def extract_episode(source: dict, podcast_uuid: UUID) -> dict:
+    """Check a new episode's JSON and turn it into a row for the db.
+
+    Every row has the same keys, so a batch of them can be inserted in one
+    go. Raises a ValidationError with all that's wrong with the episode.
+    """
+    data = validate_episode(source)
+
+    # Right now data has the stuff from the JSON, now we add the extra
+    # data needed for the db.
+    if data["pub_date"] is None:
+        data["pub_date"] = datetime.now(timezone.utc)
+    data["uuid"] = uuid4()
+    data["podcast_uuid"] = podcast_uuid
+    data["media_type"] = media_mime[
+        splitext(urlparse(data["media_url"]).path)[1]]
+    data["transcript_type"] = None
+    if data["transcript"] is not None:
+        data["transcript_type"] = transcript_mime[
+            splitext(urlparse(data["transcript"]).path)[1]]
+    return data
@@ -1,48 +1,225 @@
+from base64 import urlsafe_b64decode, urlsafe_b64encode
 from datetime import datetime, timedelta, timezone
-from os.path import splitext
-from urllib.parse import urlparse
+from functools import partial
+from json import loads
+from typing import Any, Callable, Iterator
 from uuid import UUID, uuid4
 
-from flask import Blueprint, Response, abort, request
-from sqlalchemy import delete, select, update
-from sqlalchemy.orm import joinedload
-
-from .jxml import media_mime, transcript_mime
-from .models import Episode, Podcast
-from .util import authorization_required, touch_podcast
-from .validate import (
-    Pull,
-    as_datetime,
-    as_timedelta,
-    episode_types,
-    image,
-    media_exts,
-    non_negative,
-    positive,
-    transcript_exts,
-    url,
+from flask import (
+    Blueprint,
+    Response,
+    abort,
+    current_app,
+    request,
+    stream_with_context,
+    url_for,
 )
+from sqlalchemy import (
+    DateTime,
+    and_,
+    bindparam,
+    delete,
+    insert,
+    or_,
+    select,
+    type_coerce,
+    update,
+)
+
+from .feed import load_changes, load_feed, page_version
+from .models import Episode, EpisodeChange, Podcast
+from .search import fts_query, search_episodes
+from .util import (
+    authorization_required,
+    get_feed_cache,
+    get_feed_renderer,
+    get_token_cache,
+    log_changes,
+    touch_podcast,
+)
+from .validate import ValidationError, extract_episode, validate_many
 from ... import db
 
 bp = Blueprint("snapcast", __name__, url_prefix="/snapcast")
 
+# What can be changed by a batch patch. Not the episode's identity.
+patchable_columns = (set(Episode.__table__.columns.keys())
+                     - {"id", "uuid", "podcast_uuid", "last_modified"})
+
 
 @bp.route("/<uuid:podcast_uuid>/feed.xml", methods=["GET"])
 def generate_feed(podcast_uuid: UUID):
-    """Pull podcast and episode data from the db and generate podcast xml."""
-    # noinspection PyTypeChecker
-    cast: Podcast = db.first_or_404(
-        select(Podcast)
-        .where(Podcast.uuid == podcast_uuid)
-        .options(joinedload("*")),
+    """Pull podcast and episode data from the db and generate podcast xml.
+
+    Rendered feeds are cached per `last_build_date`, so an unchanged feed
+    costs a single lookup. Cached feeds carry a strong `ETag` and go out
+    compressed when the client allows.
+    """
+    return _serve_feed(podcast_uuid)
+
+
+@bp.route("/<uuid:podcast_uuid>/archive/<int:page>.xml", methods=["GET"])
+def feed_archive(podcast_uuid: UUID, page: int):
+    """Generate one RFC 5005 archive page of a windowed podcast's feed.
+
+    Pages count up from the oldest episodes. A closed page only changes
+    when its own episodes do, so publishing doesn't touch its `ETag`, and
+    caches can keep it for `ARCHIVE_MAX_AGE` seconds. Its channel details
+    are as they were when it was rendered, as readers take those from the
+    feed itself.
+    """
+    return _serve_feed(podcast_uuid, page)
+
+
+def _serve_feed(podcast_uuid: UUID, page: int | None = None):
+    last_build_date: datetime = db.one_or_404(
+        select(Podcast.last_build_date)
+        .where(Podcast.uuid == podcast_uuid),
     )
 
-    if ((request.if_modified_since is not None) and
-       (cast.last_build_date <= request.if_modified_since)):
-        return Response(status=304)
+    # A closed archive page goes by its own episodes, not the podcast's.
+    closed = page is not None and (
+        version := page_version(podcast_uuid, page)) is not None
+    if closed:
+        last_modified = (version[1] or last_build_date).replace(
+            microsecond=0)
+    else:
+        version = last_modified = last_build_date
+
+    not_modified = (not request.if_none_match  # It outranks this one.
+                    and request.if_modified_since is not None
+                    and last_modified <= request.if_modified_since)
+    since = None if page is not None else _delta_base(last_build_date)
+
+    cache = get_feed_cache()
+    rendered = cache.get(podcast_uuid, version, page)
+    # With a render pool, concurrent misses share one load and render.
+    renderer = get_feed_renderer()
+    key = (podcast_uuid, version, page)
+    leading = False
+    if (rendered is None and not not_modified and since is None
+            and renderer is not None):
+        running = renderer.join(key)
+        if running is None:
+            leading = True
+        else:
+            rendered = running.result()
+
+    if rendered is not None:
+        encoding = request.accept_encodings.best_match(rendered.variants)
+        body, etag = rendered.encoded(encoding)
+        if not_modified or request.if_none_match.contains(etag):
+            response = Response(status=304)
+        elif since is not None:
+            response = _feed_delta(podcast_uuid, since)
+            # The delta is taken against the uncompressed feed.
+            etag = rendered.etag
+        else:
+            response = Response(body, mimetype="text/xml")
+            if encoding is not None:
+                response.content_encoding = encoding
+        response.set_etag(etag)
+
+    elif not_modified:
+        response = Response(status=304)
+
+    elif since is not None:
+        # The delta doesn't need the full feed, only its ETag does. Going
+        # without one, the client asks from the same base again next time.
+        response = _feed_delta(podcast_uuid, since)
+
+    else:
+        shared = None
+        try:
+            feed = load_feed(podcast_uuid, page)
+            if feed is None:
+                abort(404)
+            if not closed:
+                # Might have been touched since we looked, so key on what
+                # we built.
+                version = last_modified = feed.last_build_date
+            config = current_app.config["SNAPCAST"]
+            if (renderer is not None and len(feed.episodes)
+                    >= config["RENDER_OFFLOAD_EPISODES"]):
+                body = renderer.render(
+                    feed, pretty=config["PRETTY"], engine=config["ENGINE"])
+                shared = cache.put(podcast_uuid, version, body, page,
+                                   last_modified, closed)
+                response = Response(body, mimetype="text/xml")
+            else:
+                # Send items out as they're rendered, and cache the lot at
+                # the end. It gets its ETag and compressed variants once
+                # it's in the cache.
+                response = Response(stream_with_context(cache.tee(
+                    podcast_uuid,
+                    version,
+                    feed.stream(pretty=config["PRETTY"],
+                                engine=config["ENGINE"]),
+                    page,
+                    last_modified,
+                    closed,
+                )), mimetype="text/xml")
+        finally:
+            if leading:
+                renderer.finish(key, shared)
+
+    response.last_modified = last_modified
+    response.vary.add("Accept-Encoding")
+    if page is None:
+        response.vary.add("A-IM")
+    if closed:
+        response.cache_control.public = True
+        response.cache_control.max_age = \
+            current_app.config["SNAPCAST"]["ARCHIVE_MAX_AGE"]
+    return response
+
+
+def _delta_base(last_build_date: datetime) -> datetime | None:
+    """Find which version of the feed a client wants an RFC 3229 delta from.
+
+    Only for clients that asked with `A-IM: feed`. The version is read off
+    the build time our ETags lead with, so any older ETag of ours works,
+    whatever its content-coding. If the client has several, the newest
+    makes for the smallest delta.
+    """
+    a_im = request.headers.get("A-IM", "")
+    if "feed" not in (token.split(";")[0].strip().lower()
+                      for token in a_im.split(",")):
+        return None
+
+    newest = int(last_build_date.timestamp())
+    base = None
+    for etag in request.if_none_match.as_set():
+        try:
+            built = int(etag.split("-", 1)[0], 16)
+        except ValueError:
+            continue
+        if built < newest and (base is None or built > base):
+            base = built
+    if base is None:
+        return None
+    return datetime.fromtimestamp(base, timezone.utc)
+
 
-    response = Response(cast.build(pretty=True), mimetype="text/xml")
-    response.last_modified = cast.last_build_date
+def _feed_delta(podcast_uuid: UUID, since: datetime) -> Response:
+    """Build a `226 IM Used` feed of the episodes changed since a time.
+
+    Deletions can't be expressed in a feed, so clients only learn of those
+    from the full feed.
+    """
+    feed = load_changes(podcast_uuid, since)
+    if feed is None:
+        abort(404)
+    config = current_app.config["SNAPCAST"]
+    response = Response(
+        feed.build(pretty=config["PRETTY"], engine=config["ENGINE"]),
+        status=226,
+        mimetype="text/xml",
+    )
+    response.headers["IM"] = "feed"
+    # Caches in between mustn't hand this out as the full feed.
+    response.cache_control.no_store = True
+    response.headers["Cache-Control"] += ", im"
     return response
 
 
@@ -50,7 +227,8 @@ def generate_feed(podcast_uuid: UUID):
 def feed_head(podcast_uuid: UUID):
     """Set headers for a HEAD request to a feed.
 
-    Fill `Last-Modified` to save on data transfer.
+    Fill `Last-Modified`, and `ETag` if the feed has been rendered, to
+    save on data transfer.
     """
     last_modified: datetime = db.one_or_404(
         select(Podcast.last_build_date)
@@ -58,6 +236,15 @@ def feed_head(podcast_uuid: UUID):
     )
     response = Response()
     response.last_modified = last_modified
+    response.vary.add("Accept-Encoding")
+    response.vary.add("A-IM")
+
+    rendered = get_feed_cache().get(podcast_uuid, last_modified)
+    if rendered is not None:
+        encoding = request.accept_encodings.best_match(rendered.variants)
+        response.set_etag(rendered.encoded(encoding)[1])
+        if encoding is not None:
+            response.content_encoding = encoding
     return response
 
 
@@ -97,55 +284,81 @@ def publish_episode(podcast_uuid: UUID):
     if json is None:
         abort(400, "Missing JSON request body.")
 
-    # The structure of this should mimic that of the input dict.
-    extractors = (
-        Pull("title", required=True),
-        Pull("subtitle"),
-        Pull("description"),
-        Pull("timestamp",
-             as_datetime,
-             to="pub_date",
-             default=datetime.now(timezone.utc)),
+    try:
+        data = extract_episode(json, podcast_uuid)
+    except ValidationError as e:
+        abort(e.status, description=str(e))
+
+    db.session.add(Episode(**data))
+    log_changes(podcast_uuid, "insert", [data["uuid"]])
+    touch_podcast(podcast_uuid)
+    db.session.commit()
+    return {}
 
-        Pull("url", url, media_exts, to="media_url", required=True),
-        Pull("size", non_negative, to="media_size", required=True),
-        Pull("duration", non_negative, as_timedelta, to="media_duration"),
 
-        Pull("link", url),
-        Pull("image", url, image),
+@bp.route("/<uuid:podcast_uuid>/publish/batch", methods=["POST"])
+@authorization_required
+def publish_batch(podcast_uuid: UUID):
+    """Add many episodes to a podcast at once.
 
-        Pull("episode_type", episode_types),
-        Pull("episode", positive),
-        Pull("season", positive),
+    Takes a JSON array of episodes, each as `publish_episode` takes them,
+    or the same as newline-delimited JSON with an `application/x-ndjson`
+    content type. Every episode is checked before any are added. If any
+    fail, none are added, and the response lists each failure by its
+    index in the batch.
 
-        Pull("transcript", url, transcript_exts),
-    )
-    data = {}
-    for extractor in extractors:
+    Returns the new episodes' uuids, in order.
+    """
+    if request.mimetype == "application/x-ndjson":
+        entries = _ndjson_entries()
+    else:
+        entries = request.json
+        if not isinstance(entries, list):
+            abort(400, "Request body must be a JSON array of episodes.")
+
+    rows, errors = validate_many(
+        partial(extract_episode, podcast_uuid=podcast_uuid), entries)
+    if errors:
+        return {"errors": errors}, 422
+    if rows:
+        db.session.execute(insert(Episode), rows)
+        log_changes(podcast_uuid, "insert", [row["uuid"] for row in rows])
+        touch_podcast(podcast_uuid)
+        db.session.commit()
+    return {"episodes": [str(row["uuid"]) for row in rows]}
+
+
+def _ndjson_entries() -> Iterator[Any]:
+    """Parse the request body one line at a time, skipping blank lines.
+
+    Lines that aren't JSON come out as the error instead.
+    """
+    for line in request.stream:
+        if not line.strip():
+            continue
         try:
-            # Typeerror if a filter fails.
-            # ValueError if it's required and missing.
-            data[extractor.to] = extractor.run(json)
+            yield loads(line)
         except ValueError as e:
-            abort(400, description=str(e))
-        except TypeError as e:
-            abort(422, description=str(e))
+            yield ValueError(f"Invalid JSON: {e}")
 
-    # Right now data has the stuff from the JSON, now we add the extra
-    # data needed for the db.
-    media_ext = splitext(urlparse(data["media_url"]).path)[1]
-    ts_ext = splitext(urlparse(data["transcript"]).path)[1]
 
-    data["uuid"] = uuid4()
-    data["podcast_uuid"] = podcast_uuid
-    data["media_type"] = media_mime[media_ext]
-    if "transcript_type" in data:
-        data["transcript_type"] = transcript_mime[ts_ext]
+@bp.route("/<uuid:podcast_uuid>/token", methods=["POST"])
+@authorization_required
+def rotate_token(podcast_uuid: UUID):
+    """Replace a podcast's auth token with a new one, and return it.
 
-    db.session.add(Episode(**data))
-    touch_podcast(podcast_uuid)
+    The old token stops working here at once, and in other processes once
+    their cached copy expires.
+    """
+    token = uuid4()
+    db.session.execute(
+        update(Podcast)
+        .where(Podcast.uuid == podcast_uuid)
+        .values({Podcast.auth_token: token}),
+    )
     db.session.commit()
-    return {}
+    get_token_cache().invalidate(podcast_uuid)
+    return {"auth_token": str(token)}
 
 
 @bp.route("/<uuid:podcast_uuid>/episode/<episode_id>", methods=["GET"])
@@ -185,19 +398,22 @@ def get_episode(podcast_uuid: UUID, episode_id: str):
 def patch_episode(podcast_uuid: UUID, episode_uuid: UUID):
     """Just give it a dict with key=rowname value=newvalue. let's get naïve."""
     json = request.json
-    if json is None:
-        abort(400)
+    if not isinstance(json, dict):
+        abort(400, "Request body must be a JSON object.")
 
-    if "media_duration" in json:
-        json["media_duration"] = timedelta(seconds=json["media_duration"])
-    if "pub_date" in json:
-        json["pub_date"] = datetime.fromisoformat(json["pub_date"])
+    try:
+        values = _patch_values(json)
+    except (TypeError, ValueError) as e:
+        abort(400, description=str(e))
 
     result = db.session.execute(
         update(Episode)
         .where(Episode.uuid == episode_uuid)
-        .values(json),
+        .where(Episode.podcast_uuid == podcast_uuid)
+        .values(values),
     )
+    if result.rowcount:
+        log_changes(podcast_uuid, "update", [episode_uuid])
     touch_podcast(podcast_uuid)
     db.session.commit()
 
@@ -217,19 +433,326 @@ def delete_episode(podcast_uuid: UUID, episode_uuid: UUID):
 
     if result.rowcount == 0:
         return abort(404)
+    log_changes(podcast_uuid, "delete", [episode_uuid])
     touch_podcast(podcast_uuid)
     db.session.commit()
 
     return {}
 
 
+@bp.route("/<uuid:podcast_uuid>/episodes", methods=["PATCH"])
+@authorization_required
+def patch_episodes(podcast_uuid: UUID):
+    """Change many episodes at once.
+
+    Takes a JSON array of ``{"uuid": ..., "changes": {...}}``, with changes
+    as `patch_episode` takes them. Everything is checked first, and if
+    anything is wrong, or any episode isn't in this podcast, nothing
+    changes and the response lists each problem by its index. Otherwise
+    it all goes in one transaction, with one statement per distinct set
+    of changed columns.
+    """
+    entries = request.json
+    if not isinstance(entries, list):
+        abort(400, "Request body must be a JSON array of patches.")
+
+    patches: dict[UUID, dict] = {}
+    indexes: dict[UUID, int] = {}
+    errors = []
+    for index, entry in enumerate(entries):
+        try:
+            if not isinstance(entry, dict):
+                raise ValueError("Patch must be a JSON object.")
+            if "uuid" not in entry or "changes" not in entry:
+                raise ValueError("Patch needs a uuid and changes.")
+            episode_uuid = UUID(entry["uuid"])
+            changes = entry["changes"]
+            if not isinstance(changes, dict) or not changes:
+                raise ValueError("changes must be a non-empty object.")
+            if episode_uuid in patches:
+                raise ValueError("Episode is patched twice.")
+            patches[episode_uuid] = _patch_values(changes)
+            indexes[episode_uuid] = index
+        except (TypeError, ValueError, AttributeError) as e:
+            errors.append({"index": index, "error": str(e)})
+
+    found = set(db.session.scalars(
+        select(Episode.uuid)
+        .where(Episode.podcast_uuid == podcast_uuid)
+        .where(Episode.uuid.in_(patches)),
+    ))
+    errors.extend({"index": indexes[episode_uuid],
+                   "error": "No such episode."}
+                  for episode_uuid in patches.keys() - found)
+    if errors:
+        return {"errors": sorted(errors, key=lambda e: e["index"])}, 422
+    if not patches:
+        return {"rows": 0}
+
+    # executemany needs every row in a statement to set the same columns.
+    groups: dict[frozenset, list[dict]] = {}
+    for episode_uuid, values in patches.items():
+        # Bound names can't be column names, which SQLAlchemy keeps for
+        # itself in SET clauses.
+        groups.setdefault(frozenset(values), []).append(
+            {"episode_uuid": episode_uuid,
+             **{f"new_{column}": value for column, value in values.items()}})
+    rows = 0
+    for columns, params in groups.items():
+        rows += db.session.execute(
+            update(Episode.__table__)
+            .where(Episode.uuid == bindparam("episode_uuid"))
+            .where(Episode.podcast_uuid == podcast_uuid)
+            .values({column: bindparam(f"new_{column}")
+                     for column in columns}),
+            params,
+        ).rowcount
+    log_changes(podcast_uuid, "update", patches)
+    touch_podcast(podcast_uuid)
+    db.session.commit()
+
+    return {"rows": rows}
+
+
+@bp.route("/<uuid:podcast_uuid>/episodes", methods=["DELETE"])
+@authorization_required
+def delete_episodes(podcast_uuid: UUID):
+    """Delete many episodes at once.
+
+    Takes a JSON array of episode uuids. If any aren't in this podcast,
+    nothing is deleted and the response lists them. Otherwise they all go
+    in a single statement.
+    """
+    entries = request.json
+    if not isinstance(entries, list):
+        abort(400, "Request body must be a JSON array of episode uuids.")
+    try:
+        episode_uuids = {UUID(entry) for entry in entries}
+    except (TypeError, ValueError, AttributeError) as e:
+        abort(400, description=f"Invalid episode uuid: {e}")
+
+    deleted = set(db.session.scalars(
+        delete(Episode)
+        .where(Episode.podcast_uuid == podcast_uuid)
+        .where(Episode.uuid.in_(episode_uuids))
+        .returning(Episode.uuid),
+    ))
+    missing = episode_uuids - deleted
+    if missing:
+        db.session.rollback()
+        return {"errors": [{"uuid": str(episode_uuid),
+                            "error": "No such episode."}
+                           for episode_uuid in sorted(missing)]}, 422
+    if deleted:
+        log_changes(podcast_uuid, "delete", deleted)
+        touch_podcast(podcast_uuid)
+        db.session.commit()
+
+    return {"rows": len(deleted)}
+
+
+def _patch_values(changes: dict) -> dict:
+    """Turn a patch's JSON values into ones for the db.
+
+    Only `patchable_columns` can be changed, never an episode's identity.
+    """
+    unknown = changes.keys() - patchable_columns
+    if unknown:
+        raise ValueError(f"Can't change {', '.join(sorted(unknown))}.")
+    if "media_duration" in changes:
+        changes["media_duration"] = timedelta(
+            seconds=changes["media_duration"])
+    if "pub_date" in changes:
+        changes["pub_date"] = datetime.fromisoformat(changes["pub_date"])
+        if changes["pub_date"].tzinfo is None:
+            raise ValueError("pub_date needs a timezone.")
+    return changes
+
+
 @bp.route("/<uuid:podcast_uuid>/episodes", methods=["GET"])
 @authorization_required
 def get_all_episodes(podcast_uuid: UUID):
-    """Get all episodes for a podcast."""
-    results = db.session.scalars(
-        select(Episode)
-        .where(Episode.podcast_uuid == podcast_uuid),
+    """Get all episodes for a podcast, oldest first.
+
+    Query parameters, all optional:
+        fields: comma-separated columns to include. All of them if unset.
+        limit:  int, episodes per page. Everything at once if unset.
+        after:  cursor, from the `next` link of the page before.
+
+    When there's another page, a `Link` header points to it. Sent as one
+    JSON list, or as newline-delimited JSON streamed straight off the db
+    cursor if the client accepts `application/x-ndjson` over JSON.
+    """
+    columns = Episode.__table__.columns
+    fields = request.args.get("fields")
+    if fields is not None:
+        fields = fields.split(",")
+        unknown = [field for field in fields if field not in columns]
+        if unknown:
+            abort(400, f"Unknown fields: {', '.join(unknown)}.")
+        columns = [columns[field] for field in fields]
+
+    limit = request.args.get("limit", type=int)
+    if limit is not None and limit < 1:
+        abort(400, "limit must be positive.")
+
+    # Untyped, so the cursor keeps the microseconds TZDateTime drops.
+    pub_date = type_coerce(Episode.pub_date, DateTime)
+    query = (
+        select(*columns)
+        .where(Episode.podcast_uuid == podcast_uuid)
+        .order_by(pub_date, Episode.id)
     )
+    if "after" in request.args:
+        after_date, after_id = _parse_cursor(request.args["after"],
+                                             datetime.fromisoformat)
+        query = query.where(or_(
+            pub_date > after_date,
+            and_(pub_date == after_date, Episode.id > after_id),
+        ))
+
+    next_url = None
+    if limit is not None:
+        # Find where the next page starts before sending this one, so the
+        # link can go out ahead of a streamed body.
+        last = db.session.execute(
+            query.with_only_columns(pub_date, Episode.id)
+            .offset(limit - 1)
+            .limit(2),
+        ).all()
+        if len(last) == 2:
+            next_url = url_for(
+                request.endpoint,
+                **request.view_args,
+                **{**request.args,
+                   "after": _make_cursor(last[0][0].isoformat(), last[0][1])},
+                _external=True,
+            )
+        query = query.limit(limit)
+
+    if (request.accept_mimetypes.best_match(
+            ["application/json", "application/x-ndjson"])
+            == "application/x-ndjson"):
+        def stream() -> Iterator[str]:
+            dumps = current_app.json.dumps
+            for episode in Episode.serialize(db.session.execute(
+                    query.execution_options(yield_per=1000))):
+                yield dumps(episode) + "\n"
+        response = Response(stream_with_context(stream()),
+                            mimetype="application/x-ndjson")
+    else:
+        response = current_app.json.response(
+            list(Episode.serialize(db.session.execute(query))))
+
+    if next_url is not None:
+        response.headers["Link"] = f'<{next_url}>; rel="next"'
+    return response
+
+
+@bp.route("/<uuid:podcast_uuid>/search", methods=["GET"])
+def search(podcast_uuid: UUID):
+    """Find a podcast's episodes by their title, subtitle and description.
+
+    Query parameters:
+        q:     str, words that all have to match. End one with * to match
+               it as a prefix.
+        limit: int, optional, results per page, at most 100.
+        after: cursor, optional, from the `next` link of the page before.
+
+    Returns episodes best match first, each with its bm25 `rank`, lower
+    being better. When there's another page, a `Link` header points to it.
+    """
+    query = fts_query(request.args.get("q", ""))
+    if query is None:
+        abort(400, "Nothing to search for.")
+    limit = min(request.args.get("limit", 20, type=int), 100)
+    if limit < 1:
+        abort(400, "limit must be positive.")
+    after = None
+    if "after" in request.args:
+        after = _parse_cursor(request.args["after"], float)
+
+    results = list(Episode.serialize(db.session.execute(
+        search_episodes(podcast_uuid, query, after).limit(limit))))
+
+    response = current_app.json.response(results)
+    if len(results) == limit:
+        last = results[-1]
+        next_url = url_for(
+            request.endpoint,
+            **request.view_args,
+            **{**request.args,
+               "after": _make_cursor(repr(last["rank"]), last["id"])},
+            _external=True,
+        )
+        response.headers["Link"] = f'<{next_url}>; rel="next"'
+    return response
+
 
-    return [episode.as_dict() for episode in results]
+@bp.route("/<uuid:podcast_uuid>/changes", methods=["GET"])
+@authorization_required
+def get_changes(podcast_uuid: UUID):
+    """Get what happened to a podcast's episodes since a point in its log.
+
+    Query parameters, all optional:
+        since: int, the last `seq` already seen. 0 for the whole log.
+        limit: int, changes per page, at most 1000.
+
+    Each change carries the episode as it is now, or null if it's gone
+    since. Sync by remembering the returned `last_seq`, and passing it as
+    `since` next time. A `Link` header points to the next page, if any.
+    """
+    since = request.args.get("since", 0, type=int)
+    limit = min(request.args.get("limit", 1000, type=int), 1000)
+    if limit < 1:
+        abort(400, "limit must be positive.")
+
+    changes = list(EpisodeChange.serialize(db.session.execute(
+        select(EpisodeChange.seq,
+               EpisodeChange.episode_uuid,
+               EpisodeChange.op,
+               EpisodeChange.changed_at)
+        .where(EpisodeChange.podcast_uuid == podcast_uuid)
+        .where(EpisodeChange.seq > since)
+        .order_by(EpisodeChange.seq)
+        .limit(limit),
+    )))
+
+    uuids = {UUID(change["episode_uuid"]) for change in changes}
+    episodes = {
+        episode["uuid"]: episode
+        for episode in Episode.serialize(db.session.execute(
+            select(*Episode.__table__.columns)
+            .where(Episode.podcast_uuid == podcast_uuid)
+            .where(Episode.uuid.in_(uuids)),
+        ))
+    } if uuids else {}
+    for change in changes:
+        change["episode"] = episodes.get(change["episode_uuid"])
+
+    last_seq = changes[-1]["seq"] if changes else since
+    response = current_app.json.response(
+        {"changes": changes, "last_seq": last_seq})
+    if len(changes) == limit:
+        next_url = url_for(
+            request.endpoint,
+            **request.view_args,
+            **{**request.args, "since": last_seq},
+            _external=True,
+        )
+        response.headers["Link"] = f'<{next_url}>; rel="next"'
+    return response
+
+
+def _make_cursor(key: str, episode_id: int) -> str:
+    return urlsafe_b64encode(f"{key}/{episode_id}".encode()).decode()
+
+
+def _parse_cursor(cursor: str, key_type: Callable[[str], Any],
+) -> tuple[Any, int]:
+    try:
+        key, episode_id = (
+            urlsafe_b64decode(cursor.encode()).decode().rsplit("/", 1))
+        return key_type(key), int(episode_id)
+    except ValueError:
+        abort(400, "Invalid cursor.")
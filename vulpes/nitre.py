@@ -1,7 +1,8 @@
-from datetime import timezone
+from datetime import datetime, timezone
 
+from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
-from sqlalchemy import DateTime, TypeDecorator
+from sqlalchemy import DateTime, TypeDecorator, event, make_url
 from sqlalchemy.orm import DeclarativeBase
 
 
@@ -12,6 +13,11 @@ class TZDateTime(TypeDecorator):
     impl = DateTime
     cache_ok = True
 
+    @property
+    def python_type(self):
+        """TypeDecorators don't pass on their impl's python_type."""
+        return datetime
+
     def process_bind_param(self, value, dialect):
         """Only store aware datetimes to the db."""
         if value is not None:
@@ -35,3 +41,46 @@ class Base(DeclarativeBase):
 
 
 db = SQLAlchemy(model_class=Base)
+
+
+def init_db(app: Flask) -> None:
+    """Set up `db` for the app, with its SQLite tuning profile.
+
+    Applies the `[SQLITE]` config: pool settings sized for threaded workers,
+    and pragmas set on every new connection. Only for file databases, as
+    in-memory ones get a single shared connection anyway.
+    """
+    config = app.config["SQLITE"]
+    url = make_url(app.config["SQLALCHEMY_DATABASE_URI"])
+    tuned = (config["TUNED"]
+             and url.get_backend_name() == "sqlite"
+             and url.database not in (None, "", ":memory:"))
+
+    if tuned:
+        app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
+            "pool_size": config["POOL_SIZE"],
+            "max_overflow": config["MAX_OVERFLOW"],
+            # Waiting on the pool is waiting on the db, so give up together.
+            "pool_timeout": config["BUSY_TIMEOUT"] / 1000,
+            **app.config.get("SQLALCHEMY_ENGINE_OPTIONS", {}),
+        }
+    db.init_app(app)
+    if not tuned:
+        return
+
+    pragmas = [
+        f"PRAGMA journal_mode = {config['JOURNAL_MODE']}",
+        f"PRAGMA synchronous = {config['SYNCHRONOUS']}",
+        f"PRAGMA busy_timeout = {int(config['BUSY_TIMEOUT'])}",
+        f"PRAGMA mmap_size = {int(config['MMAP_SIZE'])}",
+        f"PRAGMA cache_size = {int(config['CACHE_SIZE'])}",
+    ]
+
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for pragma in pragmas:
+            cursor.execute(pragma)
+        cursor.close()
+
+    with app.app_context():
+        event.listen(db.engine, "connect", set_pragmas)